@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lost_kids.settings')
+# Each open live stream is a coroutine here, so the case pages may subscribe
+os.environ.setdefault('LIVE_STREAMS_ENABLED', 'True')
 
 application = get_asgi_application()
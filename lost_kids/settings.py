@@ -126,6 +126,7 @@
 import os
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -246,4 +247,145 @@ CELERY_RESULT_BACKEND = 'django-db'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = TIME_ZONE
\ No newline at end of file
+CELERY_TIMEZONE = TIME_ZONE
+# Alert delivery (missing_children.outbox): rows claimed per drainer batch
+# (one SMTP connection per email batch), drainers the relay starts per channel,
+# retry policy, and how long a claim may stay unsettled before another drainer
+# takes it over
+ALERT_EMAIL_BATCH_SIZE = config('ALERT_EMAIL_BATCH_SIZE', default=500, cast=int)
+ALERT_SMS_BATCH_SIZE = config('ALERT_SMS_BATCH_SIZE', default=200, cast=int)
+ALERT_MAX_DRAINERS = config('ALERT_MAX_DRAINERS', default=8, cast=int)
+ALERT_MAX_ATTEMPTS = config('ALERT_MAX_ATTEMPTS', default=5, cast=int)
+ALERT_RETRY_DELAY_SECONDS = config('ALERT_RETRY_DELAY_SECONDS', default=60, cast=int)
+ALERT_CLAIM_TIMEOUT_SECONDS = config('ALERT_CLAIM_TIMEOUT_SECONDS', default=600, cast=int)
+
+# Relay: picks up alert requests whose on-commit relay was lost, and due
+# retries. Digests go out at 08:00 (weekly on Mondays)
+CELERY_BEAT_SCHEDULE = {
+    'relay-alert-outbox': {
+        'task': 'missing_children.tasks.relay_alert_outbox',
+        'schedule': 60.0,
+    },
+    'send-daily-digest': {
+        'task': 'missing_children.tasks.send_daily_digest',
+        'schedule': crontab(hour=8, minute=0),
+    },
+    'send-weekly-digest': {
+        'task': 'missing_children.tasks.send_weekly_digest',
+        'schedule': crontab(hour=8, minute=0, day_of_week='mon'),
+    },
+}
+
+# SMS dispatch: provider messages-per-second, concurrent senders, throttle retries
+SMS_RATE_LIMIT_PER_SECOND = config('SMS_RATE_LIMIT_PER_SECOND', default=100, cast=float)
+SMS_MAX_WORKERS = config('SMS_MAX_WORKERS', default=32, cast=int)
+SMS_MAX_RETRIES = config('SMS_MAX_RETRIES', default=5, cast=int)
+
+# Radius targeting: grid cell size for the subscriber coverage index, and the
+# largest alert radius honoured (bounds the number of cells per subscriber)
+GEO_CELL_SIZE_DEGREES = config('GEO_CELL_SIZE_DEGREES', default=0.1, cast=float)
+GEO_MAX_RADIUS_MILES = config('GEO_MAX_RADIUS_MILES', default=100, cast=int)
+
+# Sighting clusters (missing_children.clusters): area grid size (0.05 degrees
+# is about 3.5 miles), time window, and clusters shown on the case page
+SIGHTING_CLUSTER_CELL_DEGREES = config('SIGHTING_CLUSTER_CELL_DEGREES', default=0.05, cast=float)
+SIGHTING_CLUSTER_WINDOW_HOURS = config('SIGHTING_CLUSTER_WINDOW_HOURS', default=6, cast=int)
+SIGHTING_CLUSTERS_ON_PAGE = config('SIGHTING_CLUSTERS_ON_PAGE', default=10, cast=int)
+
+# Admin changelists count exactly up to this many rows, then estimate
+ADMIN_EXACT_COUNT_LIMIT = config('ADMIN_EXACT_COUNT_LIMIT', default=10000, cast=int)
+
+# Case numbers (missing_children.case_numbers): prefix, and counters each
+# process reserves at a time from the shared per-day sequence
+CASE_NUMBER_PREFIX = config('CASE_NUMBER_PREFIX', default='MC')
+CASE_NUMBER_BLOCK_SIZE = config('CASE_NUMBER_BLOCK_SIZE', default=10, cast=int)
+
+# Digests (missing_children.digests): region grid size (1 degree is about 69
+# miles), cases listed per digest, and how long a rendered digest is reused
+DIGEST_REGION_SIZE_DEGREES = config('DIGEST_REGION_SIZE_DEGREES', default=1.0, cast=float)
+DIGEST_MAX_CASES = config('DIGEST_MAX_CASES', default=20, cast=int)
+DIGEST_CACHE_TIMEOUT = config('DIGEST_CACHE_TIMEOUT', default=60 * 60 * 6, cast=int)
+
+# Photo derivatives: widths (px) rendered for every case photo, and encoder quality
+PHOTO_DERIVATIVE_WIDTHS = [320, 640, 1280]
+PHOTO_DERIVATIVE_QUALITY = config('PHOTO_DERIVATIVE_QUALITY', default=80, cast=int)
+
+# Offline geocoder (missing_children.geocoder): GeoNames-style gazetteer file,
+# whether saves fill in missing coordinates, entries kept in each process's
+# memory cache, and the radius a location filter matches around a place
+GEOCODER_GAZETTEER_PATH = config('GEOCODER_GAZETTEER_PATH', default=str(BASE_DIR / 'missing_children' / 'data' / 'gazetteer.tsv'))
+GEOCODER_ENABLED = config('GEOCODER_ENABLED', default=True, cast=bool)
+GEOCODER_MEMORY_CACHE_SIZE = config('GEOCODER_MEMORY_CACHE_SIZE', default=10000, cast=int)
+GEOCODER_SEARCH_RADIUS_MILES = config('GEOCODER_SEARCH_RADIUS_MILES', default=15, cast=float)
+
+# Duplicate case detection (missing_children.duplicates): blocking key age
+# band and grid cell, candidates scored per report, the score that flags a
+# likely duplicate, and the distance and time at which place and date stop counting
+DUPLICATE_AGE_BAND_YEARS = config('DUPLICATE_AGE_BAND_YEARS', default=3, cast=int)
+DUPLICATE_CELL_DEGREES = config('DUPLICATE_CELL_DEGREES', default=0.25, cast=float)
+DUPLICATE_MAX_CANDIDATES = config('DUPLICATE_MAX_CANDIDATES', default=200, cast=int)
+DUPLICATE_MIN_SCORE = config('DUPLICATE_MIN_SCORE', default=0.7, cast=float)
+DUPLICATE_MATCH_LIMIT = config('DUPLICATE_MATCH_LIMIT', default=5, cast=int)
+DUPLICATE_MAX_MILES = config('DUPLICATE_MAX_MILES', default=25, cast=float)
+DUPLICATE_MAX_DAYS = config('DUPLICATE_MAX_DAYS', default=30, cast=int)
+
+# Look-alike photo matching (missing_children.photo_hashes): largest pHash
+# Hamming distance (of 64 bits) reported as a match, and matches shown
+PHOTO_MATCH_MAX_DISTANCE = config('PHOTO_MATCH_MAX_DISTANCE', default=10, cast=int)
+PHOTO_MATCH_LIMIT = config('PHOTO_MATCH_LIMIT', default=20, cast=int)
+
+# Lead evidence uploads (missing_children.uploads): streamed to a temp dir on
+# the MEDIA_ROOT volume, capped in size and restricted to sniffed types
+EVIDENCE_MAX_BYTES = config('EVIDENCE_MAX_BYTES', default=250 * 1024 * 1024, cast=int)
+EVIDENCE_ALLOWED_TYPES = [
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/heic',
+    'video/mp4', 'video/quicktime', 'video/webm', 'application/pdf',
+]
+EVIDENCE_UPLOAD_TEMP_DIR = os.path.join(MEDIA_ROOT, 'leads', '.incoming')
+EVIDENCE_THUMBNAIL_WIDTH = 320
+
+# Cache: local memory by default. Use a shared backend (file-based or Redis)
+# when running more than one process, so that signal invalidation reaches
+# every worker.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='lost-kids'),
+    }
+}
+
+# Public page cache (missing_children.page_cache): entries live until a model
+# signal invalidates them; the timeout is only a safety net. Outside DEBUG it
+# needs a shared cache backend: it is off by default with local memory, and
+# `check --deploy` fails if it is turned on anyway (missing_children.E001)
+PAGE_CACHE_ENABLED = config(
+    'PAGE_CACHE_ENABLED', cast=bool,
+    default=DEBUG or 'locmem' not in CACHES['default']['BACKEND'],
+)
+PAGE_CACHE_ALIAS = 'default'
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
+# Read-only JSON API (missing_children.api): default and largest page size
+API_PAGE_SIZE = config('API_PAGE_SIZE', default=50, cast=int)
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=200, cast=int)
+# Change feed events older than this are pruned; older cursors must resync
+CHANGE_FEED_RETENTION_DAYS = config('CHANGE_FEED_RETENTION_DAYS', default=30, cast=int)
+
+# Live SSE streams (missing_children.live): off unless served by the ASGI
+# application (lost_kids/asgi.py turns them on), since a WSGI worker would be
+# held for as long as a case page stays open. 'local' fans out within one
+# process; 'redis' shares events between ASGI workers (needs the redis package)
+LIVE_STREAMS_ENABLED = config('LIVE_STREAMS_ENABLED', default=False, cast=bool)
+LIVE_BACKEND = config('LIVE_BACKEND', default='local')
+LIVE_REDIS_URL = config('LIVE_REDIS_URL', default=CELERY_BROKER_URL)
+LIVE_QUEUE_SIZE = 100
+LIVE_HEARTBEAT_SECONDS = config('LIVE_HEARTBEAT_SECONDS', default=15, cast=int)
+LIVE_RETRY_MS = 5000
+
+# Per-request SQL profiling (missing_children.instrumentation); off by default
+SQL_INSTRUMENTATION = config('SQL_INSTRUMENTATION', default=False, cast=bool)
+SQL_QUERY_WARN_THRESHOLD = config('SQL_QUERY_WARN_THRESHOLD', default=20, cast=int)
+SQL_SLOWEST_TO_LOG = 5
+
+if SQL_INSTRUMENTATION:
+    MIDDLEWARE.insert(0, 'missing_children.instrumentation.QueryInstrumentationMiddleware')
@@ -1,47 +1,224 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import MissingChild, AbductorInformation, LocationUpdate, Lead, AlertSubscription, EmergencyContact
+from django.db.models import Q
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from .models import (
+    MissingChild, AbductorInformation, LocationUpdate, Lead, AlertSubscription, EmergencyContact,
+    AlertDelivery, DeliveryAttempt, PhotoHash, GeocodeCache,
+)
+from .forms import PhotoMatchForm
+from .pagination import EstimatedCountPaginator
+from . import metrics, search, photo_hashes, duplicates
+
+# Most cases a changelist search expands to
+ADMIN_SEARCH_CASE_LIMIT = 500
+
+
+class LargeChildTableAdmin(admin.ModelAdmin):
+    """
+    Changelist for a table of per-case rows that may hold millions of entries.
+
+    The case is joined rather than fetched per row, the count is bounded
+    (see EstimatedCountPaginator), and the case is picked with an autocomplete
+    widget. Search finds cases through the case search index, matches
+    `exact_search_fields` exactly and `prefix_search_fields` by prefix. Only
+    the row's own columns are matched with LIKE, never the joined case names.
+    """
+    list_select_related = ['child']
+    autocomplete_fields = ['child']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    exact_search_fields = []
+    prefix_search_fields = []
+    # Non-empty so the changelist shows its search box
+    search_fields = ['child__case_number']
+    
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        # Resolved up front: one indexed lookup, then an IN list on the foreign key index
+        matches = search.search_queryset(MissingChild.objects.all(), term, fields=['first_name', 'last_name', 'case_number'])
+        condition = Q(child__in=list(matches.values_list('pk', flat=True)[:ADMIN_SEARCH_CASE_LIMIT]))
+        for field in self.exact_search_fields:
+            condition |= Q(**{field: term})
+        for field in self.prefix_search_fields:
+            condition |= Q(**{f'{field}__istartswith': term})
+        return queryset.filter(condition), False
 
 @admin.register(MissingChild)
 class MissingChildAdmin(admin.ModelAdmin):
     list_display = ['case_number', 'first_name', 'last_name', 'age', 'gender', 'status', 'last_seen_date', 'reported_date']
     list_filter = ['status', 'gender', 'is_abducted', 'last_seen_date']
     search_fields = ['first_name', 'last_name', 'case_number', 'last_seen_location']
-    readonly_fields = ['case_number', 'reported_date', 'updated_at']
+    readonly_fields = ['case_number', 'reported_date', 'updated_at', 'possible_duplicates', 'alert_delivery']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Also serves the child autocomplete of the other admins
+        if not search_term.strip():
+            return queryset, False
+        return search.search_queryset(queryset, search_term, fields=self.search_fields), False
+    
+    @admin.display(description='Possible duplicates')
+    def possible_duplicates(self, obj):
+        if obj._state.adding:
+            return '-'
+        matches = duplicates.likely_duplicates(obj)
+        if not matches:
+            return 'None found'
+        return format_html_join('', '<div><a href="{}">{} {} ({})</a>: {} match</div>', (
+            (reverse('admin:missing_children_missingchild_change', args=[case['id']]),
+             case['first_name'], case['last_name'], case['case_number'], match['total'])
+            for match, case in matches
+        ))
+    
+    @admin.display(description='Alert delivery')
+    def alert_delivery(self, obj):
+        if obj.pk is None:
+            return '-'
+        channels = metrics.alert(obj.pk)['channels']
+        if not channels:
+            return 'No delivery attempts recorded'
+        return format_html_join('', '<div>{}: {} sent, {} failed, {} throttled, p50 {} ms, p95 {} ms, done in {} s</div>', (
+            (channel, m['sent'], m['failed'], m['throttled'], m['p50_ms'], m['p95_ms'], m['completed_in_seconds'])
+            for channel, m in sorted(channels.items())
+        ))
     
     def save_model(self, request, obj, form, change):
-        if not obj.case_number:
-            # Generate case number
-            import datetime
-            obj.case_number = f"MC-{datetime.datetime.now().strftime('%Y%m%d')}-{MissingChild.objects.count() + 1:04d}"
+        # The case number is allocated on save (signals.assign_case_number)
         if not obj.reported_by:
             obj.reported_by = request.user
         super().save_model(request, obj, form, change)
 
 @admin.register(AbductorInformation)
-class AbductorInformationAdmin(admin.ModelAdmin):
+class AbductorInformationAdmin(LargeChildTableAdmin):
     list_display = ['child', 'created_at', 'updated_at']
-    search_fields = ['child__first_name', 'child__last_name', 'vehicle_plate']
+    exact_search_fields = ['vehicle_plate']
+    raw_id_fields = ['added_by']
 
 @admin.register(LocationUpdate)
-class LocationUpdateAdmin(admin.ModelAdmin):
+class LocationUpdateAdmin(LargeChildTableAdmin):
     list_display = ['child', 'location', 'sighting_time', 'verified', 'reported_at']
     list_filter = ['verified', 'sighting_time']
-    search_fields = ['child__first_name', 'child__last_name', 'location']
+    prefix_search_fields = ['location']
 
 @admin.register(Lead)
-class LeadAdmin(admin.ModelAdmin):
+class LeadAdmin(LargeChildTableAdmin):
     list_display = ['child', 'reporter_name', 'status', 'created_at']
     list_filter = ['status', 'created_at']
-    search_fields = ['child__first_name', 'child__last_name', 'reporter_name', 'reporter_email']
+    exact_search_fields = ['reporter_email']
+    prefix_search_fields = ['reporter_name']
+    raw_id_fields = ['reported_by']
 
 @admin.register(AlertSubscription)
 class AlertSubscriptionAdmin(admin.ModelAdmin):
-    list_display = ['email', 'location', 'subscribed', 'verified', 'created_at']
-    list_filter = ['subscribed', 'verified']
+    list_display = ['email', 'location', 'subscribed', 'verified', 'digest_frequency', 'created_at']
+    list_filter = ['subscribed', 'verified', 'digest_frequency']
     search_fields = ['email', 'location']
 
 @admin.register(EmergencyContact)
 class EmergencyContactAdmin(admin.ModelAdmin):
     list_display = ['name', 'organization', 'phone', 'region', 'order', 'active']
     list_filter = ['active', 'region']
-    search_fields = ['name', 'organization']
\ No newline at end of file
+    search_fields = ['name', 'organization']
+
+
+@admin.register(AlertDelivery)
+class AlertDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['child', 'channel', 'recipient', 'status', 'attempts', 'sent_at']
+    list_filter = ['channel', 'status']
+    search_fields = ['recipient', 'child__case_number']
+    raw_id_fields = ['child']
+
+@admin.register(DeliveryAttempt)
+class DeliveryAttemptAdmin(admin.ModelAdmin):
+    """Raw send log, with the last hour's per-minute metrics above the list"""
+    list_display = ['attempted_at', 'kind', 'channel', 'child', 'success', 'latency_ms', 'throttled', 'error']
+    list_filter = ['kind', 'channel', 'success']
+    date_hierarchy = 'attempted_at'
+    raw_id_fields = ['child', 'delivery']
+    list_select_related = ['child']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'per_minute': metrics.per_minute()}
+        return super().changelist_view(request, extra_context)
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+    """Delete entries to have texts geocoded again against the current gazetteer"""
+    list_display = ['key', 'place', 'latitude', 'longitude', 'created_at']
+    search_fields = ['key']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+
+
+def match_rows(matches):
+    """Admin links for photo_hashes.matches() results"""
+    return format_html_join('', '<div>{} bits (dHash {}): <a href="{}">{}</a> - <a href="{}">{}</a></div>', (
+        (
+            apart, second if second is not None else '-',
+            reverse('admin:missing_children_photohash_change', args=[row.pk]), row.get_source_display(),
+            reverse('admin:missing_children_missingchild_change', args=[row.child_id]), row.child,
+        )
+        for apart, second, row in matches
+    ))
+
+@admin.register(PhotoHash)
+class PhotoHashAdmin(admin.ModelAdmin):
+    """The look-alike index; a hash's page lists similar photos of other cases"""
+    list_display = ['file', 'source', 'child', 'created_at']
+    list_filter = ['source']
+    raw_id_fields = ['child', 'lead']
+    list_select_related = ['child']
+    readonly_fields = ['preview', 'look_alikes']
+    fields = ['source', 'child', 'lead', 'file', 'preview', 'look_alikes']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    @admin.display(description='Photo')
+    def preview(self, obj):
+        return format_html('<img src="{}" style="max-width: 240px">', f"{settings.MEDIA_URL}{obj.file}")
+    
+    @admin.display(description='Look-alikes in other cases')
+    def look_alikes(self, obj):
+        matches = photo_hashes.look_alikes(obj)
+        return match_rows(matches) if matches else 'None within the match distance'
+    
+    def get_urls(self):
+        urls = [path('match/', self.admin_site.admin_view(self.match_view), name='missing_children_photohash_match')]
+        return urls + super().get_urls()
+    
+    def match_view(self, request):
+        """Upload a photo and list the indexed photos it resembles"""
+        form = PhotoMatchForm(request.POST or None, request.FILES or None)
+        matches = None
+        if request.method == 'POST' and form.is_valid():
+            values = photo_hashes.hashes(form.cleaned_data['photo'])
+            matches = match_rows(photo_hashes.matches(*values, limit=settings.PHOTO_MATCH_LIMIT))
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Find look-alike photos',
+            'form': form,
+            'matches': matches,
+        }
+        return TemplateResponse(request, 'admin/missing_children/photohash/match.html', context)
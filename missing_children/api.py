@@ -0,0 +1,272 @@
+"""
+Read-only JSON API for partners that mirror cases.
+
+    GET /api/cases/?status=missing&fields=id,first_name,updated_at&cursor=...
+    GET /api/cases/<id>/
+    GET /api/cases/<id>/sightings/
+    GET /api/contacts/
+    GET /api/changes/?cursor=...
+
+`fields` selects a subset of each object's fields, and only those columns
+are loaded from the database. Every response carries a strong ETag and a
+Last-Modified. Both come from one aggregate over the rows the response is
+built from: their latest updated_at and their count, so a deletion changes
+the ETag too. They are read from the database on every request, never from a
+per-process cache. A conditional GET for an unchanged resource therefore gets
+a 304 after that single query, whichever process served the write.
+"""
+import hashlib
+from functools import wraps
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET
+from .models import MissingChild, LocationUpdate, EmergencyContact
+from .pagination import KeysetPaginator, PrimaryKeyPaginator
+from . import changes, imaging
+
+
+def _photo_url(request, child):
+    """The largest stripped rendition; the original upload is never linked"""
+    photo = imaging.public_photo(child)
+    return request.build_absolute_uri(child.photo.storage.url(photo)) if photo else None
+
+
+def _photo_variants(request, child):
+    storage = child.photo.storage
+    return [
+        {
+            'width': variant['width'],
+            'webp': request.build_absolute_uri(storage.url(variant['webp'])),
+            'jpeg': request.build_absolute_uri(storage.url(variant['jpeg'])),
+        }
+        for variant in child.photo_variants.get('variants', [])
+    ]
+
+
+# API field -> (model fields it reads, value)
+CASE_FIELDS = {
+    'id': (['id'], lambda request, c: c.pk),
+    'url': (['id'], lambda request, c: request.build_absolute_uri(reverse('api_case_detail', args=[c.pk]))),
+    'case_number': (['case_number'], lambda request, c: c.case_number),
+    'first_name': (['first_name'], lambda request, c: c.first_name),
+    'last_name': (['last_name'], lambda request, c: c.last_name),
+    'age': (['age'], lambda request, c: c.age),
+    'gender': (['gender'], lambda request, c: c.gender),
+    'height': (['height'], lambda request, c: c.height),
+    'weight': (['weight'], lambda request, c: c.weight),
+    'eye_color': (['eye_color'], lambda request, c: c.eye_color),
+    'hair_color': (['hair_color'], lambda request, c: c.hair_color),
+    'last_seen_date': (['last_seen_date'], lambda request, c: c.last_seen_date),
+    'last_seen_location': (['last_seen_location'], lambda request, c: c.last_seen_location),
+    'last_seen_latitude': (['last_seen_latitude'], lambda request, c: c.last_seen_latitude),
+    'last_seen_longitude': (['last_seen_longitude'], lambda request, c: c.last_seen_longitude),
+    'last_seen_wearing': (['last_seen_wearing_text'], lambda request, c: c.last_seen_wearing_text),
+    'distinctive_features': (['distinctive_features_text'], lambda request, c: c.distinctive_features_text),
+    'summary': (['summary'], lambda request, c: c.summary),
+    'photo': (['photo', 'photo_variants'], _photo_url),
+    'photo_variants': (['photo', 'photo_variants'], _photo_variants),
+    'status': (['status'], lambda request, c: c.status),
+    'is_abducted': (['is_abducted'], lambda request, c: c.is_abducted),
+    'reported_date': (['reported_date'], lambda request, c: c.reported_date),
+    'updated_at': (['updated_at'], lambda request, c: c.updated_at),
+}
+# Card-sized default for lists; the detail endpoint returns every field
+CASE_LIST_DEFAULT = [
+    'id', 'url', 'case_number', 'first_name', 'last_name', 'age', 'gender', 'last_seen_date',
+    'last_seen_location', 'summary', 'photo', 'status', 'is_abducted', 'reported_date', 'updated_at',
+]
+
+SIGHTING_FIELDS = {
+    'id': (['id'], lambda request, s: s.pk),
+    'case': (['child'], lambda request, s: s.child_id),
+    'location': (['location'], lambda request, s: s.location),
+    'sighting_time': (['sighting_time'], lambda request, s: s.sighting_time),
+    'description': (['description_text'], lambda request, s: s.description_text),
+    'reported_at': (['reported_at'], lambda request, s: s.reported_at),
+}
+
+CONTACT_FIELDS = {
+    'id': (['id'], lambda request, c: c.pk),
+    'name': (['name'], lambda request, c: c.name),
+    'organization': (['organization'], lambda request, c: c.organization),
+    'phone': (['phone'], lambda request, c: c.phone),
+    'email': (['email'], lambda request, c: c.email),
+    'website': (['website'], lambda request, c: c.website),
+    'region': (['region'], lambda request, c: c.region),
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def selected_fields(request, available, default=None):
+    """Names from ?fields=a,b (in request order), validated against `available`"""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(default or available)
+    names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}")
+    return names
+
+
+def project(queryset, available, names):
+    """Load only the columns the selected fields read"""
+    columns = {column for name in names for column in available[name][0]}
+    return queryset.only(*columns)
+
+
+def serialize(request, obj, available, names):
+    return {name: available[name][1](request, obj) for name in names}
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('limit must be an integer')
+    return max(1, min(size, settings.API_MAX_PAGE_SIZE))
+
+
+def page_response(request, page, available, names):
+    next_url = None
+    if page.next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = page.next_cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return JsonResponse({
+        'results': [serialize(request, obj, available, names) for obj in page],
+        'next': next_url,
+    })
+
+
+def api_view(view_name, state):
+    """
+    GET-only JSON endpoint with conditional GET support.
+
+    `state(request, *args, **kwargs)` returns (latest updated_at, row count)
+    of the rows the response is built from. They and the full URL make up the
+    ETag; the first is also the Last-Modified.
+    """
+    def current_state(request, *args, **kwargs):
+        # condition() asks for the ETag and Last-Modified separately; one query answers both
+        if not hasattr(request, '_api_state'):
+            request._api_state = state(request, *args, **kwargs)
+        return request._api_state
+
+    def etag(request, *args, **kwargs):
+        latest, count = current_state(request, *args, **kwargs)
+        key = f"api:{view_name}:{request.get_full_path()}:{latest.isoformat() if latest else ''}:{count}"
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        return current_state(request, *args, **kwargs)[0]
+
+    def decorator(view):
+        @condition(etag_func=etag, last_modified_func=last_modified)
+        def conditional(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except BadRequest as e:
+                return JsonResponse({'error': str(e)}, status=400)
+
+        @require_GET
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            # Caches may keep the body but must revalidate it on every poll
+            patch_cache_control(response, public=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def latest_and_count(queryset):
+    """(latest updated_at, row count) of `queryset` in one query"""
+    state = queryset.order_by().aggregate(latest=Max('updated_at'), count=Count('*'))
+    return state['latest'], state['count']
+
+
+def _cases_state(request):
+    return latest_and_count(MissingChild.objects.all())
+
+
+def _case_state(request, pk):
+    return latest_and_count(MissingChild.objects.filter(pk=pk))
+
+
+def _sightings_state(request, pk):
+    return latest_and_count(LocationUpdate.objects.filter(child_id=pk, verified=True))
+
+
+def _contacts_state(request):
+    return latest_and_count(EmergencyContact.objects.filter(active=True))
+
+
+@api_view('cases', _cases_state)
+def case_list(request):
+    """Cases newest first; ?status= one of the case statuses (default missing) or `all`"""
+    names = selected_fields(request, CASE_FIELDS, CASE_LIST_DEFAULT)
+    status = request.GET.get('status', 'missing')
+    cases = MissingChild.objects.all()
+    if status != 'all':
+        if status not in dict(MissingChild.STATUS_CHOICES):
+            raise BadRequest(f'Unknown status: {status}')
+        cases = cases.filter(status=status)
+    # The keyset paginator reads reported_date and id from every row
+    cases = project(cases, CASE_FIELDS, names + ['id', 'reported_date'])
+    page = KeysetPaginator(cases, page_size(request)).get_page(request.GET.get('cursor'))
+    return page_response(request, page, CASE_FIELDS, names)
+
+
+@api_view('case', _case_state)
+def case_detail(request, pk):
+    names = selected_fields(request, CASE_FIELDS)
+    child = get_object_or_404(project(MissingChild.objects.all(), CASE_FIELDS, names), pk=pk)
+    return JsonResponse(serialize(request, child, CASE_FIELDS, names))
+
+
+@api_view('sightings', _sightings_state)
+def case_sightings(request, pk):
+    """Verified sightings of one case, oldest first"""
+    names = selected_fields(request, SIGHTING_FIELDS)
+    get_object_or_404(MissingChild.objects.only('pk'), pk=pk)
+    sightings = project(LocationUpdate.objects.filter(child_id=pk, verified=True), SIGHTING_FIELDS, names)
+    page = PrimaryKeyPaginator(sightings, page_size(request)).get_page(request.GET.get('cursor'))
+    return page_response(request, page, SIGHTING_FIELDS, names)
+
+
+@api_view('contacts', _contacts_state)
+def emergency_contacts(request):
+    names = selected_fields(request, CONTACT_FIELDS)
+    contacts = project(EmergencyContact.objects.filter(active=True), CONTACT_FIELDS, names)
+    return JsonResponse({'results': [serialize(request, c, CONTACT_FIELDS, names) for c in contacts]})
+
+
+@require_GET
+def change_feed(request):
+    """
+    Case and sighting changes after ?cursor=, oldest first (see changes.py).
+
+    ?cursor=now returns no events and a cursor at the head of the feed, for
+    replicas that have just taken a full snapshot.
+    """
+    if request.GET.get('cursor') == 'now':
+        return JsonResponse({'results': [], 'cursor': changes.head_cursor(), 'has_more': False})
+    try:
+        events, cursor, has_more = changes.read(request.GET.get('cursor'), page_size(request))
+    except BadRequest as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except changes.CursorExpired as e:
+        return JsonResponse({'error': str(e)}, status=410)
+    return JsonResponse({
+        'results': [changes.serialize(event) for event in events],
+        'cursor': cursor,
+        'has_more': has_more,
+    })
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MissingChildrenConfig(AppConfig):
     name = 'missing_children'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,208 @@
+"""
+Micro-benchmarks for the hot views and alert tasks.
+
+Each benchmark is a setup function that returns a zero-argument callable.
+The runner times that callable with the page cache off, outgoing email and
+SMS stubbed, and Celery running eagerly, so the numbers measure this code and
+the database rather than the network.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack
+from unittest import mock
+from celery import current_app
+from django.core import mail
+from django.core.cache import cache
+from django.db.models import Count
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from .fake_twilio import FakeTwilioClient
+from .instrumentation import QueryRecorder
+from .models import MissingChild, LocationUpdate, Lead, AlertSubscription, SMSSubscription, AlertDelivery
+from .pagination import KeysetPaginator
+from .sms_alert import SMSAlertSystem
+from . import tasks, views
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _get(view, path='/', params=None, **kwargs):
+    factory = RequestFactory()
+    return lambda: view(factory.get(path, params or {}), **kwargs)
+
+
+def _busiest_case():
+    row = (LocationUpdate.objects.filter(verified=True).values('child')
+           .annotate(n=Count('id')).order_by('-n').first())
+    return row['child'] if row else MissingChild.objects.values_list('pk', flat=True).first()
+
+
+@benchmark('home')
+def bench_home():
+    return _get(views.home)
+
+
+@benchmark('case_list')
+def bench_case_list():
+    return _get(views.case_list)
+
+
+@benchmark('case_list_deep_page')
+def bench_case_list_deep_page():
+    # Cursor halfway through the active cases, as if the user had paged that far
+    active = MissingChild.objects.filter(status='missing').order_by('-reported_date', '-pk')
+    middle = active[active.count() // 2:][:1].first()
+    cursor = KeysetPaginator(active, 1)._key(middle, 'next') if middle else ''
+    return _get(views.case_list, params={'cursor': cursor})
+
+
+@benchmark('case_list_query')
+def bench_case_list_query():
+    return _get(views.case_list, params={'q': 'emm'})
+
+
+@benchmark('search_cases')
+def bench_search_cases():
+    return _get(views.search_cases, params={'q': 'smith', 'age_min': 5})
+
+
+@benchmark('case_detail')
+def bench_case_detail():
+    return _get(views.case_detail, pk=_busiest_case())
+
+
+@benchmark('send_missing_child_alerts')
+def bench_send_missing_child_alerts():
+    child_id = str(MissingChild.objects.filter(status='missing').values_list('pk', flat=True).first())
+
+    def run():
+        # Clear the ledger so every run sends the full alert, not a no-op
+        AlertDelivery.objects.filter(child_id=child_id).delete()
+        tasks.send_missing_child_alerts(child_id)
+    return run
+
+
+@benchmark('send_daily_digest')
+def bench_send_daily_digest():
+    def run():
+        # Render every region from scratch, as the first run of the period does
+        cache.clear()
+        tasks.send_daily_digest()
+    return run
+
+
+def stubbed_environment():
+    """Page cache off, locmem email, in-process fake SMS provider, eager Celery"""
+    stack = ExitStack()
+    stack.enter_context(override_settings(
+        PAGE_CACHE_ENABLED=False,
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        SMS_RATE_LIMIT_PER_SECOND=1e9,
+    ))
+    stack.enter_context(mock.patch.object(
+        tasks, 'SMSAlertSystem', lambda: SMSAlertSystem(client=FakeTwilioClient(latency=0)),
+    ))
+    previous_eager = current_app.conf.task_always_eager
+    current_app.conf.task_always_eager = True
+    stack.callback(setattr, current_app.conf, 'task_always_eager', previous_eager)
+    mail.outbox = []
+    return stack
+
+
+def run(names=None, repeat=5, warmup=1, log=None):
+    log = log or (lambda message: None)
+    results = {}
+    with stubbed_environment():
+        for name in names or BENCHMARKS:
+            try:
+                fn = BENCHMARKS[name]()
+                for _ in range(warmup):
+                    fn()
+                timings = []
+                for _ in range(repeat):
+                    mail.outbox = []
+                    with QueryRecorder() as queries:
+                        started = time.perf_counter()
+                        fn()
+                        timings.append(time.perf_counter() - started)
+            except Exception as e:
+                results[name] = {'error': f'{type(e).__name__}: {e}'}
+                log(f'{name}: ERROR {e}')
+                continue
+            results[name] = {
+                'runs': repeat,
+                'min_ms': round(min(timings) * 1000, 3),
+                'median_ms': round(statistics.median(timings) * 1000, 3),
+                'mean_ms': round(statistics.mean(timings) * 1000, 3),
+                'max_ms': round(max(timings) * 1000, 3),
+                'queries': queries.count,
+            }
+            log(f"{name}: median {results[name]['median_ms']}ms, {queries.count} queries")
+    return results
+
+
+def dataset_size():
+    return {
+        'cases': MissingChild.objects.count(),
+        'sightings': LocationUpdate.objects.count(),
+        'leads': Lead.objects.count(),
+        'email_subscribers': AlertSubscription.objects.count(),
+        'sms_subscribers': SMSSubscription.objects.count(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def report(results):
+    return {
+        'created_at': timezone.now().isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'dataset': dataset_size(),
+        'results': results,
+    }
+
+
+def compare(current, previous, threshold=0.2):
+    """Benchmarks whose median got slower than `threshold` (0.2 = 20%) versus `previous`"""
+    regressions = []
+    for name, result in current['results'].items():
+        before = previous.get('results', {}).get(name)
+        if not before or 'median_ms' not in before or 'median_ms' not in result:
+            continue
+        ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else 1.0
+        if ratio > 1 + threshold:
+            regressions.append({
+                'name': name,
+                'previous_ms': before['median_ms'],
+                'current_ms': result['median_ms'],
+                'ratio': round(ratio, 2),
+            })
+    return regressions
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(data, path):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
@@ -0,0 +1,109 @@
+"""
+Case number allocation.
+
+Case numbers look like MC-20261017-0042: a prefix, a scope and a counter. By
+default the scope is the local date. An optional region code can be added in
+front of it (MC-IL-20261017-0007), for example for imports from a partner
+agency. Each scope has one CaseNumberSequence row. A reservation bumps that
+row with a single conditional UPDATE, so concurrent writers on different
+processes can never be handed the same counter.
+
+Each process reserves CASE_NUMBER_BLOCK_SIZE counters at a time and hands
+them out from memory, so a bulk import touches the sequence row once per
+block instead of once per case. A reservation made inside a transaction
+only caches its spare counters once that transaction commits; a rollback
+undoes the UPDATE and leaves nothing in the cache. Counters are unique but
+not gap-free: a process that exits leaves the rest of its block unused.
+"""
+import os
+import re
+import threading
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import CaseNumberSequence
+
+# Numbers issued by the old count()-based admin code, used to seed the sequences
+LEGACY_PATTERN = re.compile(r'^MC-(\d{8})-(\d+)$')
+
+_blocks = {}
+_lock = threading.Lock()
+
+
+def scope_for(day=None, region=None):
+    day = day or timezone.localdate()
+    return f'{region.upper()}-{day:%Y%m%d}' if region else f'{day:%Y%m%d}'
+
+
+def format_number(scope, value):
+    return f'{settings.CASE_NUMBER_PREFIX}-{scope}-{value:04d}'
+
+
+def reserve(scope, count):
+    """First of `count` consecutive counters taken from the shared sequence of `scope`"""
+    bump = CaseNumberSequence.objects.filter(scope=scope)
+    with transaction.atomic():
+        if not bump.update(next_value=F('next_value') + count):
+            try:
+                with transaction.atomic():
+                    CaseNumberSequence.objects.create(scope=scope, next_value=1 + count)
+                return 1
+            except IntegrityError:
+                # Another process created the row first
+                bump.update(next_value=F('next_value') + count)
+        # The UPDATE holds the row lock until commit, so this reads our own bump
+        end = bump.values_list('next_value', flat=True).get()
+    return end - count
+
+
+def _keep(scope, block):
+    with _lock:
+        _blocks[scope] = block
+
+
+def _take(scope):
+    with _lock:
+        block = _blocks.get(scope)
+        if block is None:
+            return None
+        value = block[0]
+        block[0] += 1
+        if block[0] >= block[1]:
+            del _blocks[scope]
+        return value
+
+
+def allocate(day=None, region=None):
+    """Next case number for the scope, from this process's block when it has one"""
+    scope = scope_for(day, region)
+    value = _take(scope)
+    if value is not None:
+        return format_number(scope, value)
+
+    size = max(settings.CASE_NUMBER_BLOCK_SIZE, 1)
+    value = reserve(scope, size)
+    if size > 1:
+        spare = [value + 1, value + size]
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: _keep(scope, spare))
+        else:
+            _keep(scope, spare)
+    return format_number(scope, value)
+
+
+def allocate_many(count, day=None, region=None):
+    """`count` case numbers from one reservation, for bulk imports"""
+    scope = scope_for(day, region)
+    first = reserve(scope, count)
+    return [format_number(scope, value) for value in range(first, first + count)]
+
+
+def reset():
+    """Forget this process's reserved blocks (tests, or after a fork)"""
+    with _lock:
+        _blocks.clear()
+
+
+# A forked worker must not hand out the blocks its parent holds
+os.register_at_fork(after_in_child=reset)
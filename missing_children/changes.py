@@ -0,0 +1,158 @@
+"""
+Replication feed of case and sighting changes.
+
+Model signals append a ChangeEvent for every change a mirror needs to apply:
+
+- case `upsert` with a snapshot of the public fields, and `status` for
+  every status transition
+- case `delete` tombstone when a case is deleted or marked found
+- sighting `upsert` while it is verified, and a `delete` tombstone when a
+  verified sighting is deleted or unverified
+
+Events are read in primary key (sequence) order, so each page is a range
+scan and a replica's work grows with the number of changes rather than the
+number of cases. A cursor carries the sequence number of the last event a
+client received. Replaying from an old cursor only repeats idempotent events,
+so resuming after a disconnect is always safe. Pruning deletes events older
+than CHANGE_FEED_RETENTION_DAYS but always keeps the newest one, so sequence
+numbers never restart; a cursor from before the oldest remaining event may
+have missed pruned history and is rejected, and the client must then resync
+from the API. An idle feed never expires its cursors.
+
+Bulk writes (bulk_create, QuerySet.update) bypass signals and are not journaled.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import ChangeEvent, MissingChild, LocationUpdate
+from .pagination import encode_cursor, decode_cursor
+from . import imaging
+
+# Statuses that remove a case from mirrors of active cases
+CLOSED_STATUSES = {'found'}
+
+# Field whose previous value post_save needs, per journaled model
+TRACKED_FIELDS = {MissingChild: 'status', LocationUpdate: 'verified'}
+
+CASE_SNAPSHOT_FIELDS = [
+    'case_number', 'first_name', 'last_name', 'age', 'gender', 'height', 'weight', 'eye_color',
+    'hair_color', 'last_seen_date', 'last_seen_location', 'last_seen_latitude', 'last_seen_longitude',
+    'summary', 'status', 'is_abducted', 'reported_date', 'updated_at',
+]
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def previous_value(instance):
+    """Stored value of the tracked field, or None for a new row"""
+    if instance._state.adding:
+        return None
+    field = TRACKED_FIELDS[type(instance)]
+    return type(instance).objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+
+def case_snapshot(child):
+    data = {field: getattr(child, field) for field in CASE_SNAPSHOT_FIELDS}
+    data['id'] = child.pk
+    photo = imaging.public_photo(child)
+    data['photo'] = child.photo.storage.url(photo) if photo else None
+    return data
+
+
+def sighting_snapshot(sighting):
+    return {
+        'id': sighting.pk,
+        'case': sighting.child_id,
+        'location': sighting.location,
+        'sighting_time': sighting.sighting_time,
+        'description': sighting.description_text,
+        'reported_at': sighting.reported_at,
+    }
+
+
+def record(kind, object_id, action, data=None):
+    return ChangeEvent.objects.create(
+        kind=kind, object_id=str(object_id), action=action, changed_at=timezone.now(), data=data or {},
+    )
+
+
+def record_case(child, previous_status):
+    if previous_status is not None and previous_status != child.status:
+        record('case', child.pk, 'status', {'from': previous_status, 'to': child.status})
+    if child.status in CLOSED_STATUSES:
+        if previous_status is not None and previous_status not in CLOSED_STATUSES:
+            record('case', child.pk, 'delete', {'reason': child.status})
+        return
+    record('case', child.pk, 'upsert', case_snapshot(child))
+
+
+def record_case_deleted(child):
+    record('case', child.pk, 'delete', {'reason': 'deleted'})
+
+
+def record_sighting(sighting, was_verified):
+    if sighting.verified:
+        record('sighting', sighting.pk, 'upsert', sighting_snapshot(sighting))
+    elif was_verified:
+        record('sighting', sighting.pk, 'delete', {'reason': 'unverified', 'case': sighting.child_id})
+
+
+def record_sighting_deleted(sighting):
+    if sighting.verified:
+        record('sighting', sighting.pk, 'delete', {'reason': 'deleted', 'case': sighting.child_id})
+
+
+def make_cursor(seq):
+    return encode_cursor({'s': seq})
+
+
+def head_cursor():
+    """Cursor just past the newest event: start here after taking a full snapshot"""
+    last = ChangeEvent.objects.order_by('-id').values_list('id', flat=True).first()
+    return make_cursor(last or 0)
+
+
+def retention_cutoff():
+    return timezone.now() - timedelta(days=settings.CHANGE_FEED_RETENTION_DAYS)
+
+
+def read(cursor=None, limit=100):
+    """(events, next cursor, has_more) for the events after `cursor`"""
+    payload = decode_cursor(cursor) or {}
+    seq = payload.get('s', 0)
+    if not isinstance(seq, int) or seq < 0:
+        seq = 0
+    # Events between the cursor and the oldest retained one may have been pruned
+    oldest = ChangeEvent.objects.order_by('id').values_list('id', flat=True).first()
+    if seq and oldest is not None and seq < oldest - 1:
+        raise CursorExpired('Cursor is older than the change feed retention; resync from the API')
+
+    events = list(ChangeEvent.objects.filter(id__gt=seq).order_by('id')[:limit + 1])
+    has_more = len(events) > limit
+    events = events[:limit]
+    cursor = make_cursor(events[-1].id if events else seq)
+    return events, cursor, has_more
+
+
+def serialize(event):
+    return {
+        'seq': event.id,
+        'kind': event.kind,
+        'id': event.object_id,
+        'action': event.action,
+        'changed_at': event.changed_at,
+        'data': event.data,
+    }
+
+
+def prune(before=None):
+    """Delete events older than the retention window, except the newest; returns the number removed"""
+    newest = ChangeEvent.objects.order_by('-id').values_list('id', flat=True).first()
+    if newest is None:
+        return 0
+    # Keeping the newest event stops ids restarting (SQLite reuses them) and anchors cursor expiry
+    old = ChangeEvent.objects.filter(changed_at__lt=before or retention_cutoff(), id__lt=newest)
+    deleted, _ = old.delete()
+    return deleted
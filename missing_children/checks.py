@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Cache backends private to one process: a version bumped by a write in one
+# worker (or a Celery task) is never seen by the others
+PROCESS_LOCAL_CACHES = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+@register(Tags.caches, deploy=True)
+def check_page_cache_backend(app_configs, **kwargs):
+    """The page cache invalidates by bumping versions, so every process must share its cache"""
+    backend = settings.CACHES.get(settings.PAGE_CACHE_ALIAS, {}).get('BACKEND')
+    if settings.PAGE_CACHE_ENABLED and backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f'PAGE_CACHE_ENABLED with the process-local cache {backend}',
+            hint='Set CACHE_BACKEND to a shared backend (Redis, Memcached, database or file-based), '
+                 'or turn PAGE_CACHE_ENABLED off.',
+            id='missing_children.E001',
+        )]
+    return []
@@ -0,0 +1,178 @@
+"""
+Per-case sighting clusters, maintained incrementally.
+
+A verified sighting belongs to one cluster of its case, keyed by area and time
+window:
+
+- area is the grid cell (SIGHTING_CLUSTER_CELL_DEGREES) of the sighting's
+  coordinates, or its normalised location text when it has none
+- the window is a SIGHTING_CLUSTER_WINDOW_HOURS slice of time, aligned to the
+  epoch
+
+Verifying a sighting folds it into its cluster with one conditional UPDATE:
+the count and coordinate sums go up, and first/last seen widen. Rarer
+changes (unverifying, deleting, or moving a verified sighting) rebuild only
+the clusters they touched, from the sightings in those windows. Pages read
+the clusters instead of the sightings, so their cost does not depend on how
+many sightings a case has.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest, Least
+from .models import LocationUpdate, SightingCluster
+from . import geo
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def area_for(location, lat, lng):
+    if lat is not None and lng is not None:
+        return f'cell:{geo.cell_for(lat, lng, settings.SIGHTING_CLUSTER_CELL_DEGREES)}'
+    return f"place:{' '.join(location.lower().split())}"[:100]
+
+
+def window_for(moment):
+    size = timedelta(hours=settings.SIGHTING_CLUSTER_WINDOW_HOURS)
+    return EPOCH + (moment - EPOCH) // size * size
+
+
+def key_for(sighting):
+    """(area, window start) of a sighting"""
+    return area_for(sighting.location, sighting.latitude, sighting.longitude), window_for(sighting.sighting_time)
+
+
+def fold(sighting):
+    """Add one newly verified sighting to its cluster"""
+    area, window = key_for(sighting)
+    moment = sighting.sighting_time
+    located = sighting.latitude is not None and sighting.longitude is not None
+    with transaction.atomic():
+        cluster, _ = SightingCluster.objects.get_or_create(
+            child_id=sighting.child_id, area=area, window_start=window,
+            defaults={'location': sighting.location, 'first_seen': moment, 'last_seen': moment},
+        )
+        # Every right-hand side reads the row as it was before this UPDATE
+        SightingCluster.objects.filter(pk=cluster.pk).update(
+            count=F('count') + 1,
+            first_seen=Least('first_seen', Value(moment)),
+            last_seen=Greatest('last_seen', Value(moment)),
+            location=Case(When(last_seen__lte=moment, then=Value(sighting.location)), default=F('location')),
+            located=F('located') + int(located),
+            latitude_sum=F('latitude_sum') + (sighting.latitude if located else 0),
+            longitude_sum=F('longitude_sum') + (sighting.longitude if located else 0),
+        )
+
+
+def group(rows):
+    """Cluster fields keyed by (area, window) for (location, sighting_time, lat, lng) rows"""
+    clusters = {}
+    for location, moment, lat, lng in rows:
+        key = (area_for(location, lat, lng), window_for(moment))
+        cluster = clusters.get(key)
+        if cluster is None:
+            cluster = clusters[key] = {
+                'location': location, 'count': 0, 'first_seen': moment, 'last_seen': moment,
+                'located': 0, 'latitude_sum': 0.0, 'longitude_sum': 0.0,
+            }
+        cluster['count'] += 1
+        cluster['first_seen'] = min(cluster['first_seen'], moment)
+        if moment >= cluster['last_seen']:
+            cluster['last_seen'] = moment
+            cluster['location'] = location
+        if lat is not None and lng is not None:
+            cluster['located'] += 1
+            cluster['latitude_sum'] += lat
+            cluster['longitude_sum'] += lng
+    return clusters
+
+
+def rebuild(child_id, keys=None):
+    """
+    Recompute the clusters of a case from its verified sightings.
+
+    With `keys`, only those (area, window) clusters are rebuilt, reading just
+    the sightings in their windows. Returns the number of clusters written.
+    """
+    sightings = LocationUpdate.objects.filter(child_id=child_id, verified=True)
+    clusters = SightingCluster.objects.filter(child_id=child_id)
+    if keys is not None:
+        keys = set(keys)
+        if not keys:
+            return 0
+        size = timedelta(hours=settings.SIGHTING_CLUSTER_WINDOW_HOURS)
+        in_windows = Q()
+        for window in {window for _, window in keys}:
+            in_windows |= Q(sighting_time__gte=window, sighting_time__lt=window + size)
+        sightings = sightings.filter(in_windows)
+        selected = Q()
+        for area, window in keys:
+            selected |= Q(area=area, window_start=window)
+        clusters = clusters.filter(selected)
+
+    rows = sightings.order_by().values_list('location', 'sighting_time', 'latitude', 'longitude')
+    grouped = group(rows.iterator(chunk_size=2000))
+    if keys is not None:
+        grouped = {key: fields for key, fields in grouped.items() if key in keys}
+    with transaction.atomic():
+        clusters.delete()
+        SightingCluster.objects.bulk_create([
+            SightingCluster(child_id=child_id, area=area, window_start=window, **fields)
+            for (area, window), fields in grouped.items()
+        ])
+    return len(grouped)
+
+
+def rebuild_all():
+    """Rebuild the clusters of every case with verified sightings; returns the number of clusters"""
+    children = LocationUpdate.objects.filter(verified=True).order_by().values_list('child_id', flat=True).distinct()
+    return sum(rebuild(child_id) for child_id in list(children))
+
+
+def previous_key(sighting):
+    """(child id, cluster key) the stored row counts towards, or None if it is new or unverified"""
+    if sighting._state.adding:
+        return None
+    row = LocationUpdate.objects.filter(pk=sighting.pk, verified=True).values_list(
+        'child_id', 'location', 'sighting_time', 'latitude', 'longitude',
+    ).first()
+    if row is None:
+        return None
+    child_id, location, moment, lat, lng = row
+    return child_id, (area_for(location, lat, lng), window_for(moment))
+
+
+def sighting_saved(sighting, previous):
+    """Keep clusters in step with a saved sighting; `previous` is from previous_key()"""
+    current = (sighting.child_id, key_for(sighting)) if sighting.verified else None
+    if current == previous:
+        if current is not None:
+            # Same cluster, but its times or position may have changed
+            rebuild(current[0], {current[1]})
+        return
+    if previous is None:
+        fold(sighting)
+        return
+    affected = defaultdict(set)
+    for child_id, key in filter(None, [previous, current]):
+        affected[child_id].add(key)
+    for child_id, keys in affected.items():
+        rebuild(child_id, keys)
+
+
+def for_case(child_id, limit=None):
+    """Clusters of a case, most recent first"""
+    clusters = SightingCluster.objects.filter(child_id=child_id).order_by('-last_seen', '-id')
+    return clusters[:limit] if limit else clusters
+
+
+def sightings_in(cluster):
+    """The verified sightings folded into `cluster`, newest first"""
+    size = timedelta(hours=settings.SIGHTING_CLUSTER_WINDOW_HOURS)
+    sightings = LocationUpdate.objects.filter(
+        child_id=cluster.child_id, verified=True,
+        sighting_time__gte=cluster.window_start, sighting_time__lt=cluster.window_start + size,
+    ).order_by('-sighting_time')
+    return [s for s in sightings if area_for(s.location, s.latitude, s.longitude) == cluster.area]
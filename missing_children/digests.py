@@ -0,0 +1,150 @@
+"""
+Daily and weekly digests of new cases, grouped by region.
+
+Subscribers who opt into a digest are bucketed by `digest_region`. That is a
+coarse grid cell of DIGEST_REGION_SIZE_DEGREES around their location, or
+null (nationwide) if they gave none. A region's digest lists the new cases
+last seen in its cell or the eight cells around it, plus the cases with no
+known location. The nationwide digest lists every new case.
+
+Each (frequency, region, period) digest is rendered once and cached for
+DIGEST_CACHE_TIMEOUT, so every recipient batch on either channel reuses the
+same text. tasks.send_digests finds the regions that have subscribers with an
+indexed DISTINCT and queues one task per recipient batch. The work therefore
+grows with regions times batches, not with one render per subscriber.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import MissingChild, AlertSubscription, SMSSubscription
+from . import geo, outbox
+
+PERIODS = {'daily': timedelta(days=1), 'weekly': timedelta(days=7)}
+
+TITLES = {'daily': 'Daily Missing Children Digest', 'weekly': 'Weekly Missing Children Summary'}
+
+# channel -> (model, recipient filter, address field)
+CHANNELS = {
+    'email': (AlertSubscription, {'subscribed': True, 'verified': True}, 'email'),
+    'sms': (SMSSubscription, {'verified': True, 'active': True}, 'phone_number'),
+}
+
+CASE_FIELDS = [
+    'id', 'case_number', 'first_name', 'last_name', 'age', 'last_seen_location',
+    'last_seen_latitude', 'last_seen_longitude', 'is_abducted',
+]
+
+SMS_MAX_LENGTH = 1600
+
+
+def region_for(lat, lng):
+    """Digest region of a point, or None (nationwide) without one"""
+    if lat is None or lng is None:
+        return None
+    return geo.cell_for(lat, lng, settings.DIGEST_REGION_SIZE_DEGREES)
+
+
+def period_end(now=None):
+    """Digests cover whole hours, so a retried run renders the same period"""
+    return (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+def subscribers(channel, frequency):
+    model, filters, _ = CHANNELS[channel]
+    return model.objects.filter(digest_frequency=frequency, **filters)
+
+
+def regions(frequency):
+    """Regions with at least one digest subscriber on any channel"""
+    found = set()
+    for channel in CHANNELS:
+        found.update(
+            subscribers(channel, frequency).order_by().values_list('digest_region', flat=True).distinct()
+        )
+    return found
+
+
+def new_cases(frequency, until):
+    """Rows of the active cases reported during the period ending at `until`"""
+    return list(
+        MissingChild.objects.filter(
+            status='missing', reported_date__gte=until - PERIODS[frequency], reported_date__lt=until,
+        ).order_by('-reported_date').values(*CASE_FIELDS)
+    )
+
+
+def cases_in(region, cases):
+    if region is None:
+        return cases
+    nearby = geo.neighbours(region, settings.DIGEST_REGION_SIZE_DEGREES) | {None}
+    return [
+        case for case in cases
+        if region_for(case['last_seen_latitude'], case['last_seen_longitude']) in nearby
+    ]
+
+
+def render(frequency, cases):
+    """Subject, email body and SMS text listing `cases`"""
+    shown = cases[:settings.DIGEST_MAX_CASES]
+    more = len(cases) - len(shown)
+
+    email = [f'{TITLES[frequency]}\n']
+    sms = [f'📋 {TITLES[frequency]}\n']
+    for case in shown:
+        name = f"{case['first_name']} {case['last_name']}"
+        flag = ' (suspected abduction)' if case['is_abducted'] else ''
+        email.append(
+            f"• {name}, {case['age']}{flag}\n"
+            f"  Missing from: {case['last_seen_location']}\n"
+            f"  Case #{case['case_number']}\n"
+        )
+        sms.append(f"• {name}, {case['age']} - {case['last_seen_location']} (#{case['case_number']})")
+    if more:
+        email.append(f'...and {more} more new cases.\n')
+        sms.append(f'+{more} more')
+    email.append('Stay vigilant in your community.\nReport sightings to 911.')
+    sms.append('\nReport sightings to 911.')
+
+    sms = '\n'.join(sms)
+    if len(sms) > SMS_MAX_LENGTH:
+        sms = sms[:SMS_MAX_LENGTH - 3] + '...'
+    count = len(cases)
+    return {
+        'subject': f"{TITLES[frequency]}: {count} new case{'s' if count != 1 else ''}",
+        'email': '\n'.join(email),
+        'sms': sms,
+    }
+
+
+def cache_key(frequency, region, until):
+    return f"digest:{frequency}:{'all' if region is None else region}:{until:%Y%m%d%H}"
+
+
+def digest(frequency, region, until, cases=None):
+    """
+    Rendered digest of one region, or None if it has no new cases.
+
+    Cached, so only the first batch of a region pays for the query and render.
+    """
+    key = cache_key(frequency, region, until)
+    rendered = cache.get(key)
+    if rendered is None:
+        if cases is None:
+            cases = new_cases(frequency, until)
+        regional = cases_in(region, cases)
+        # An empty dict caches "nothing to send" as well
+        rendered = render(frequency, regional) if regional else {}
+        cache.set(key, rendered, settings.DIGEST_CACHE_TIMEOUT)
+    return rendered or None
+
+
+def recipient_batches(channel, frequency, region, batch_size):
+    """Addresses of a region's digest subscribers, in primary key chunks"""
+    _, _, field = CHANNELS[channel]
+    queryset = subscribers(channel, frequency)
+    if region is None:
+        queryset = queryset.filter(digest_region__isnull=True)
+    else:
+        queryset = queryset.filter(digest_region=region)
+    return outbox.iter_values(queryset, field, batch_size)
@@ -0,0 +1,210 @@
+"""
+Duplicate case detection: blocking keys, then a fuzzy score.
+
+Each case is stored under a few blocking keys (DuplicateKey rows). These are
+coarse descriptions that a second report of the same child is likely to
+share even when names are misspelt or the age is off by a year:
+
+- name:  Soundex of the last and first names
+- last:  Soundex of the last name, age band
+- first: Soundex of the first name, age band, gender
+- area:  grid cell of the last-seen point (or the normalised location text),
+  age band, gender
+
+A new report's keys are looked up with one indexed IN query. Cases sharing
+the most keys come first, and the list is capped at DUPLICATE_MAX_CANDIDATES
+cases, so a common surname can't crowd out a case matching on the full name. Only those candidates are scored, on name
+similarity, age, place and date last seen; a different gender or first name
+halves the score. The cost is set by how many cases share a key, not by the
+size of the case table.
+"""
+import re
+from difflib import SequenceMatcher
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from .models import MissingChild, DuplicateKey
+from . import geo
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+# Words that say nothing about where a child was seen
+LOCATION_STOP_WORDS = {'the', 'of', 'at', 'near', 'by', 'and', 'in', 'on'}
+
+# (component, weight) of the score
+WEIGHTS = {'name': 0.45, 'age': 0.15, 'place': 0.2, 'date': 0.2}
+
+# Siblings reported together share everything but the first name
+MIN_FIRST_NAME_SIMILARITY = 0.5
+
+CANDIDATE_FIELDS = [
+    'id', 'case_number', 'first_name', 'last_name', 'age', 'gender', 'status', 'last_seen_date',
+    'last_seen_location', 'last_seen_latitude', 'last_seen_longitude',
+]
+
+
+def soundex(name):
+    letters = re.sub('[^a-z]', '', (name or '').lower())
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+        # h and w don't separate letters with the same code; vowels do
+        if letter not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def location_tokens(location):
+    words = re.findall('[a-z0-9]+', (location or '').lower())
+    return [word for word in words if word not in LOCATION_STOP_WORDS]
+
+
+def age_band(age):
+    return age // settings.DUPLICATE_AGE_BAND_YEARS
+
+
+def place_key(location, lat, lng):
+    if lat is not None and lng is not None:
+        return f'cell{geo.cell_for(lat, lng, settings.DUPLICATE_CELL_DEGREES)}'
+    return ' '.join(location_tokens(location))[:40]
+
+
+def keys_for(first_name, last_name, age, gender, location, lat, lng, ages=None):
+    """
+    Blocking keys of a case.
+
+    `ages` widens the age-banded keys to several ages; lookups pass the
+    reported age plus and minus one so a band boundary doesn't hide a match.
+    """
+    first, last = soundex(first_name), soundex(last_name)
+    place = place_key(location, lat, lng)
+    keys = set()
+    if first and last:
+        keys.add(f'name:{last}:{first}')
+    for band in {age_band(a) for a in (ages or [age]) if a is not None and a >= 0}:
+        if last:
+            keys.add(f'last:{last}:{band}')
+        if first:
+            keys.add(f'first:{first}:{band}:{gender}')
+        if place:
+            keys.add(f'area:{place}:{band}:{gender}'[:100])
+    return keys
+
+
+def child_keys(child, widen=False):
+    ages = [child.age - 1, child.age, child.age + 1] if widen and child.age is not None else None
+    return keys_for(
+        child.first_name, child.last_name, child.age, child.gender, child.last_seen_location,
+        child.last_seen_latitude, child.last_seen_longitude, ages=ages,
+    )
+
+
+def index_child(child):
+    """Replace the stored blocking keys of a saved case"""
+    keys = child_keys(child)
+    with transaction.atomic():
+        DuplicateKey.objects.filter(child_id=child.pk).delete()
+        DuplicateKey.objects.bulk_create([DuplicateKey(child_id=child.pk, key=key) for key in sorted(keys)])
+    return len(keys)
+
+
+def rebuild_all(batch_size=1000):
+    """Recompute every case's keys; returns the number of keys written"""
+    written = 0
+    with transaction.atomic():
+        DuplicateKey.objects.all().delete()
+        rows = MissingChild.objects.order_by().values_list(
+            'pk', 'first_name', 'last_name', 'age', 'gender', 'last_seen_location',
+            'last_seen_latitude', 'last_seen_longitude',
+        )
+        batch = []
+        for pk, *fields in rows.iterator(chunk_size=batch_size):
+            batch.extend(DuplicateKey(child_id=pk, key=key) for key in sorted(keys_for(*fields)))
+            if len(batch) >= batch_size:
+                written += len(DuplicateKey.objects.bulk_create(batch))
+                batch = []
+        written += len(DuplicateKey.objects.bulk_create(batch))
+    return written
+
+
+def candidates(child):
+    """Pks of the cases sharing blocking keys with `child`, most keys first, at most DUPLICATE_MAX_CANDIDATES"""
+    matching = DuplicateKey.objects.filter(key__in=child_keys(child, widen=True))
+    if child.pk is not None and not child._state.adding:
+        matching = matching.exclude(child_id=child.pk)
+    ranked = matching.values('child_id').annotate(matches=Count('id')).order_by('-matches', 'child_id')
+    return [row['child_id'] for row in ranked[:settings.DUPLICATE_MAX_CANDIDATES]]
+
+
+def similarity(a, b):
+    a, b = (a or '').strip().lower(), (b or '').strip().lower()
+    if not a or not b:
+        return 0.0
+    ratio = SequenceMatcher(None, a, b).ratio()
+    # Names that sound alike ("Katelyn", "Caitlin") count as close
+    return max(ratio, 0.85) if soundex(a) == soundex(b) else ratio
+
+
+def place_score(child, other):
+    lat, lng = child.last_seen_latitude, child.last_seen_longitude
+    other_lat, other_lng = other['last_seen_latitude'], other['last_seen_longitude']
+    if None not in (lat, lng, other_lat, other_lng):
+        miles = geo.distance_miles(lat, lng, other_lat, other_lng)
+        return max(0.0, 1 - miles / settings.DUPLICATE_MAX_MILES)
+    mine, theirs = set(location_tokens(child.last_seen_location)), set(location_tokens(other['last_seen_location']))
+    if not mine or not theirs:
+        return 0.0
+    return len(mine & theirs) / len(mine | theirs)
+
+
+def date_score(child, other):
+    if child.last_seen_date is None or other['last_seen_date'] is None:
+        return 0.0
+    days = abs((child.last_seen_date - other['last_seen_date']).total_seconds()) / 86400
+    return max(0.0, 1 - days / settings.DUPLICATE_MAX_DAYS)
+
+
+def score(child, other):
+    """{component: 0..1, 'total': weighted sum} comparing a case with a candidate row"""
+    age_gap = abs(child.age - other['age']) if child.age is not None else None
+    first = similarity(child.first_name, other['first_name'])
+    parts = {
+        'name': (first + similarity(child.last_name, other['last_name'])) / 2,
+        'age': {0: 1.0, 1: 0.7, 2: 0.3}.get(age_gap, 0.0),
+        'place': place_score(child, other),
+        'date': date_score(child, other),
+    }
+    total = sum(parts[name] * weight for name, weight in WEIGHTS.items())
+    if child.gender != other['gender'] and 'O' not in (child.gender, other['gender']):
+        total /= 2
+    if first < MIN_FIRST_NAME_SIMILARITY:
+        total /= 2
+    parts['total'] = round(total, 3)
+    return parts
+
+
+def likely_duplicates(child, limit=None, min_score=None):
+    """
+    [(score, candidate row)] for the cases `child` most likely duplicates, best first.
+
+    Works on unsaved cases, so a report can be checked before it is stored.
+    """
+    min_score = settings.DUPLICATE_MIN_SCORE if min_score is None else min_score
+    pks = candidates(child)
+    if not pks:
+        return []
+    rows = MissingChild.objects.filter(pk__in=pks).values(*CANDIDATE_FIELDS)
+    scored = [(score(child, row), row) for row in rows]
+    found = sorted(
+        ((parts, row) for parts, row in scored if parts['total'] >= min_score),
+        key=lambda match: -match[0]['total'],
+    )
+    return found[:limit or settings.DUPLICATE_MATCH_LIMIT]
@@ -0,0 +1,59 @@
+import threading
+import time
+import uuid
+from collections import deque
+from twilio.base.exceptions import TwilioRestException
+
+
+class FakeMessage:
+    def __init__(self, sid, to, body):
+        self.sid = sid
+        self.to = to
+        self.body = body
+        self.status = 'queued'
+
+
+class FakeMessages:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, body, from_, to):
+        return self.client.create_message(body, from_, to)
+
+
+class FakeTwilioClient:
+    """
+    In-process stand-in for `twilio.rest.Client` for tests and benchmarks.
+
+    Each create() sleeps `latency` seconds like a network round trip and answers
+    429 when more than `max_per_second` messages arrive within one second, the
+    way the real API throttles a sender. Nothing leaves the machine.
+    """
+
+    def __init__(self, latency=0.05, max_per_second=None, fail_numbers=()):
+        self.latency = latency
+        self.max_per_second = max_per_second
+        self.fail_numbers = set(fail_numbers)
+        self.messages = FakeMessages(self)
+        self.sent = []
+        self.throttled = 0
+        self._window = deque()
+        self._lock = threading.Lock()
+
+    def create_message(self, body, from_, to):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.max_per_second:
+                now = time.monotonic()
+                while self._window and now - self._window[0] >= 1:
+                    self._window.popleft()
+                if len(self._window) >= self.max_per_second:
+                    self.throttled += 1
+                    raise TwilioRestException(429, '/Messages.json', 'Too Many Requests', code=20429, method='POST')
+                self._window.append(now)
+            if to in self.fail_numbers:
+                raise TwilioRestException(400, '/Messages.json', 'Invalid To number', code=21211, method='POST')
+            message = FakeMessage(f'SM{uuid.uuid4().hex}', to, body)
+            self.sent.append(message)
+        return message
@@ -8,10 +8,13 @@ class MissingChildForm(forms.ModelForm):
         fields = [
             'first_name', 'last_name', 'age', 'gender', 'height', 'weight',
             'eye_color', 'hair_color', 'last_seen_date', 'last_seen_location',
+            'last_seen_latitude', 'last_seen_longitude',
             'last_seen_wearing', 'distinctive_features', 'photo', 'is_abducted'
         ]
         widgets = {
             'last_seen_date': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+            'last_seen_latitude': forms.HiddenInput(),
+            'last_seen_longitude': forms.HiddenInput(),
         }
 
 class LeadForm(forms.ModelForm):
@@ -22,14 +25,27 @@ class LeadForm(forms.ModelForm):
 class AlertSubscriptionForm(forms.ModelForm):
     class Meta:
         model = AlertSubscription
-        fields = ['email', 'location']
+        fields = ['email', 'location', 'latitude', 'longitude', 'digest_frequency']
+        widgets = {
+            'latitude': forms.HiddenInput(),
+            'longitude': forms.HiddenInput(),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['digest_frequency'].required = False
+
+    def clean_digest_frequency(self):
+        return self.cleaned_data.get('digest_frequency') or 'none'
 
 class LocationUpdateForm(forms.ModelForm):
     class Meta:
         model = LocationUpdate
-        fields = ['location', 'sighting_time', 'reported_by', 'contact_number', 'description']
+        fields = ['location', 'latitude', 'longitude', 'sighting_time', 'reported_by', 'contact_number', 'description']
         widgets = {
             'sighting_time': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+            'latitude': forms.HiddenInput(),
+            'longitude': forms.HiddenInput(),
         }
 
 class SearchForm(forms.Form):
@@ -38,4 +54,7 @@ class SearchForm(forms.Form):
     age_max = forms.IntegerField(required=False, min_value=0, max_value=18, label='Max Age')
     gender = forms.ChoiceField(required=False, choices=[('', 'All')] + MissingChild.GENDER_CHOICES)
     status = forms.ChoiceField(required=False, choices=[('', 'All')] + MissingChild.STATUS_CHOICES)
-    location = forms.CharField(required=False, max_length=100)
\ No newline at end of file
+    location = forms.CharField(required=False, max_length=100)
+
+class PhotoMatchForm(forms.Form):
+    photo = forms.ImageField(help_text='Compared against every indexed case photo and lead image')
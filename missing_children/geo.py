@@ -0,0 +1,118 @@
+"""
+Grid-cell spatial index for radius-targeted alerts.
+
+The globe is cut into square cells of GEO_CELL_SIZE_DEGREES. Each subscriber
+with coordinates is written into every cell its alert radius touches, so
+"which subscribers cover this point" becomes one indexed lookup on the cell
+containing the point, followed by an exact distance check on that small
+candidate set. Subscribers without coordinates are written into the single
+UNPLACED_CELL instead, so finding them is an indexed lookup too.
+"""
+import math
+from django.conf import settings
+from django.db import transaction
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+# Coverage cell of subscribers with no location; real cell ids are never negative
+UNPLACED_CELL = -1
+
+
+def cell_size():
+    return settings.GEO_CELL_SIZE_DEGREES
+
+
+def _columns(size=None):
+    return int(math.ceil(360 / (size or cell_size())))
+
+
+def cell_for(lat, lng, size=None):
+    """Integer id of the grid cell containing (lat, lng); `size` overrides GEO_CELL_SIZE_DEGREES"""
+    size = size or cell_size()
+    columns = _columns(size)
+    row = int(math.floor((min(max(lat, -90.0), 90.0) + 90) / size))
+    col = int(math.floor((lng + 180) / size)) % columns
+    return row * columns + col
+
+
+def neighbours(cell, size=None):
+    """The cell and the (up to) eight cells around it"""
+    columns = _columns(size)
+    rows = int(math.ceil(180 / (size or cell_size())))
+    row, col = divmod(cell, columns)
+    return {
+        r * columns + (col + dc) % columns
+        for r in range(max(row - 1, 0), min(row + 1, rows - 1) + 1)
+        for dc in (-1, 0, 1)
+    }
+
+
+def cells_covering(lat, lng, radius_miles):
+    """Ids of every cell intersecting the bounding box of the radius circle"""
+    size = cell_size()
+    columns = _columns()
+    radius_miles = min(radius_miles, settings.GEO_MAX_RADIUS_MILES)
+
+    dlat = radius_miles / MILES_PER_DEGREE_LAT
+    min_row = int(math.floor((max(lat - dlat, -90.0) + 90) / size))
+    max_row = int(math.floor((min(lat + dlat, 90.0) + 90) / size))
+
+    cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 89.9)))
+    dlng = radius_miles / (MILES_PER_DEGREE_LAT * cos_lat)
+    if dlng >= 180:
+        cols = range(columns)
+    else:
+        first = int(math.floor((lng - dlng + 180) / size))
+        last = int(math.floor((lng + dlng + 180) / size))
+        cols = sorted({c % columns for c in range(first, last + 1)})
+
+    return [row * columns + col for row in range(min_row, max_row + 1) for col in cols]
+
+
+def distance_miles(lat1, lng1, lat2, lng2):
+    """Great-circle distance (haversine)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def index_subscription(subscription):
+    """Rewrite the coverage cells of an AlertSubscription or SMSSubscription"""
+    cell_model = subscription.coverage_cells.model
+    with transaction.atomic():
+        subscription.coverage_cells.all().delete()
+        if subscription.latitude is None or subscription.longitude is None:
+            cells = [UNPLACED_CELL]
+        else:
+            cells = cells_covering(subscription.latitude, subscription.longitude, subscription.radius_miles)
+        cell_model.objects.bulk_create([
+            cell_model(subscription=subscription, cell=cell) for cell in cells
+        ])
+    return len(cells)
+
+
+def unplaced(queryset):
+    """Subscribers in `queryset` without a location, who get every alert"""
+    return queryset.filter(coverage_cells__cell=UNPLACED_CELL)
+
+
+def candidates(queryset, lat, lng, field='pk'):
+    """(`field`, latitude, longitude, radius) of the subscribers registered in the point's cell"""
+    return queryset.filter(coverage_cells__cell=cell_for(lat, lng)).values_list(
+        field, 'latitude', 'longitude', 'radius_miles'
+    )
+
+
+def subscribers_covering(queryset, lat, lng, field='pk'):
+    """
+    `field` values of subscribers in `queryset` whose alert radius contains the point.
+
+    Only subscribers registered in the point's cell are loaded, so the cost
+    follows the number of nearby subscribers rather than the table size.
+    """
+    return [
+        value for value, sub_lat, sub_lng, radius in candidates(queryset, lat, lng, field)
+        if distance_miles(lat, lng, sub_lat, sub_lng) <= min(radius, settings.GEO_MAX_RADIUS_MILES)
+    ]
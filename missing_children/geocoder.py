@@ -0,0 +1,330 @@
+"""
+Offline geocoding of free-text locations against a local gazetteer.
+
+The gazetteer is a GeoNames-style tab-separated file (GEOCODER_GAZETTEER_PATH;
+a small US city list ships with the app, and a full GeoNames dump works as
+is). It is loaded on first use into a compact index: one dict from
+normalised name (and alternate names) to row numbers, plus parallel arrays of
+coordinates, populations and region codes.
+
+Text is normalised before lookup:
+
+- lower case, accents stripped
+- ZIP codes dropped
+- "st"/"ft"/"mt" expanded as in place names
+- a trailing state (code or name) taken as the region
+
+Then the longest place name found in the text wins, scanning from the end
+because the city usually follows the street. A region narrows ambiguous
+names, and otherwise the most populous place wins.
+
+Results are cached in two tiers: an LRU dict in each process
+(GEOCODER_MEMORY_CACHE_SIZE) and the GeocodeCache table, which is shared by
+every process and survives restarts. Misses are cached too. Repeated lookups
+therefore cost a dict access, or one indexed query in a fresh process, and
+the gazetteer is only loaded when a new text turns up.
+"""
+import csv
+import math
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.db.models import Q
+from .models import MissingChild, LocationUpdate, AlertSubscription, SMSSubscription, GeocodeCache
+
+Place = namedtuple('Place', 'latitude longitude name')
+
+# model -> (text field, latitude field, longitude field)
+LOCATION_FIELDS = {
+    MissingChild: ('last_seen_location', 'last_seen_latitude', 'last_seen_longitude'),
+    LocationUpdate: ('location', 'latitude', 'longitude'),
+    AlertSubscription: ('location', 'latitude', 'longitude'),
+    SMSSubscription: ('location', 'latitude', 'longitude'),
+}
+
+US_STATES = {
+    'al': 'alabama', 'ak': 'alaska', 'az': 'arizona', 'ar': 'arkansas', 'ca': 'california',
+    'co': 'colorado', 'ct': 'connecticut', 'de': 'delaware', 'dc': 'district of columbia',
+    'fl': 'florida', 'ga': 'georgia', 'hi': 'hawaii', 'id': 'idaho', 'il': 'illinois',
+    'in': 'indiana', 'ia': 'iowa', 'ks': 'kansas', 'ky': 'kentucky', 'la': 'louisiana',
+    'me': 'maine', 'md': 'maryland', 'ma': 'massachusetts', 'mi': 'michigan', 'mn': 'minnesota',
+    'ms': 'mississippi', 'mo': 'missouri', 'mt': 'montana', 'ne': 'nebraska', 'nv': 'nevada',
+    'nh': 'new hampshire', 'nj': 'new jersey', 'nm': 'new mexico', 'ny': 'new york',
+    'nc': 'north carolina', 'nd': 'north dakota', 'oh': 'ohio', 'ok': 'oklahoma', 'or': 'oregon',
+    'pa': 'pennsylvania', 'ri': 'rhode island', 'sc': 'south carolina', 'sd': 'south dakota',
+    'tn': 'tennessee', 'tx': 'texas', 'ut': 'utah', 'vt': 'vermont', 'va': 'virginia',
+    'wa': 'washington', 'wv': 'west virginia', 'wi': 'wisconsin', 'wy': 'wyoming',
+}
+STATE_CODES = {name: code for code, name in US_STATES.items()}
+
+ABBREVIATIONS = {'st': 'saint', 'ste': 'sainte', 'ft': 'fort', 'mt': 'mount'}
+
+_ZIP = re.compile(r'^\d{5}(?:\d{4})?$')
+_WORD = re.compile(r'[a-z0-9]+')
+
+# GeoNames columns
+NAME, ASCII_NAME, ALTERNATE_NAMES, LATITUDE, LONGITUDE = 1, 2, 3, 4, 5
+COUNTRY, ADMIN1, POPULATION = 8, 10, 14
+
+
+def words(text, expand=True):
+    """Lower-case ASCII words of `text` without ZIP codes, with place-name abbreviations expanded"""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode().lower()
+    tokens = [word for word in _WORD.findall(text.replace("'", '')) if not _ZIP.match(word)]
+    return _expand(tokens) if expand else tokens
+
+
+def _expand(tokens):
+    return [ABBREVIATIONS.get(word, word) for word in tokens]
+
+
+def normalize(text):
+    """(words, region code or None): a trailing US state is split off as the region"""
+    # States are matched before expansion, so "MT" stays Montana
+    tokens = words(text, expand=False)
+    for size in (3, 2, 1):
+        if len(tokens) > size:
+            tail = ' '.join(tokens[-size:])
+            if tail in STATE_CODES:
+                return _expand(tokens[:-size]), STATE_CODES[tail].upper()
+    if len(tokens) > 1 and tokens[-1] in US_STATES:
+        return _expand(tokens[:-1]), tokens[-1].upper()
+    return _expand(tokens), None
+
+
+def cache_key(text):
+    tokens, region = normalize(text)
+    return f"{' '.join(tokens)}|{region or ''}"[:255]
+
+
+class Gazetteer:
+    """Compact name index over a GeoNames-style file"""
+
+    def __init__(self):
+        self.names = {}
+        self.display = []
+        self.regions = []
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.populations = array('q')
+        self.longest = 1
+
+    @classmethod
+    def load(cls, path):
+        gazetteer = cls()
+        with open(path, encoding='utf-8', newline='') as f:
+            for row in csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE):
+                if not row or row[0].startswith('#') or len(row) <= POPULATION:
+                    continue
+                gazetteer.add(row)
+        return gazetteer
+
+    def add(self, row):
+        index = len(self.display)
+        region = sys.intern(row[ADMIN1] or row[COUNTRY])
+        self.display.append(f'{row[NAME]}, {region}' if region else row[NAME])
+        self.regions.append(region)
+        self.latitudes.append(float(row[LATITUDE]))
+        self.longitudes.append(float(row[LONGITUDE]))
+        self.populations.append(int(row[POPULATION] or 0))
+        names = {row[NAME], row[ASCII_NAME], *row[ALTERNATE_NAMES].split(',')}
+        for name in names:
+            key = ' '.join(words(name))
+            if not key:
+                continue
+            self.names[key] = self.names.get(key, ()) + (index,)
+            self.longest = max(self.longest, key.count(' ') + 1)
+
+    def best(self, indexes, region=None):
+        if region:
+            indexes = [i for i in indexes if self.regions[i] == region] or indexes
+        return max(indexes, key=lambda i: self.populations[i])
+
+    def lookup(self, tokens, region=None):
+        """Place for the longest gazetteer name in `tokens`, preferring the last occurrence"""
+        for size in range(min(self.longest, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size, -1, -1):
+                indexes = self.names.get(' '.join(tokens[start:start + size]))
+                if indexes:
+                    i = self.best(indexes, region)
+                    return Place(self.latitudes[i], self.longitudes[i], self.display[i])
+        return None
+
+    def __len__(self):
+        return len(self.display)
+
+
+class LRUCache:
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Marks a cached miss in the memory tier
+MISS = Place(None, None, '')
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+_memory = LRUCache(settings.GEOCODER_MEMORY_CACHE_SIZE)
+
+
+def gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.load(settings.GEOCODER_GAZETTEER_PATH)
+    return _gazetteer
+
+
+def reset():
+    """Forget the loaded gazetteer and the memory tier (after changing the file or in tests)"""
+    global _gazetteer
+    _gazetteer = None
+    _memory.clear()
+
+
+def resolve(text):
+    """Gazetteer lookup with no caching"""
+    tokens, region = normalize(text)
+    index = gazetteer()
+    return index.lookup(tokens, region) or (index.lookup(words(text)) if region else None)
+
+
+def _from_row(latitude, longitude, place):
+    return MISS if latitude is None else Place(latitude, longitude, place)
+
+
+def geocode_many(texts):
+    """
+    {text: Place or None} for many texts at once.
+
+    Memory hits cost nothing; the remaining keys are read from GeocodeCache
+    in one query, and only texts seen for the first time reach the gazetteer.
+    """
+    keys = {text: cache_key(text) for text in set(texts) if text and text.strip()}
+    found = {}
+    for key in set(keys.values()):
+        cached = _memory.get(key)
+        if cached is not None:
+            found[key] = cached
+
+    missing = set(keys.values()) - found.keys()
+    if missing:
+        rows = GeocodeCache.objects.filter(key__in=missing).values_list('key', 'latitude', 'longitude', 'place')
+        for key, latitude, longitude, place in rows:
+            found[key] = _from_row(latitude, longitude, place)
+            _memory.put(key, found[key])
+
+    new = {}
+    for text, key in keys.items():
+        if key not in found and key not in new:
+            new[key] = resolve(text) or MISS
+    if new:
+        GeocodeCache.objects.bulk_create([
+            GeocodeCache(key=key, latitude=place.latitude, longitude=place.longitude, place=place.name)
+            for key, place in new.items()
+        ], ignore_conflicts=True)
+        for key, place in new.items():
+            _memory.put(key, place)
+        found.update(new)
+
+    return {text: None if found[key] is MISS else found[key] for text, key in keys.items()}
+
+
+def geocode(text):
+    """Place for one free-text location, or None"""
+    return geocode_many([text]).get(text)
+
+
+def fill_coordinates(instance):
+    """Set a model instance's coordinates from its location text if it has none; True if set"""
+    text_field, lat_field, lng_field = LOCATION_FIELDS[type(instance)]
+    if not settings.GEOCODER_ENABLED:
+        return False
+    if getattr(instance, lat_field) is not None and getattr(instance, lng_field) is not None:
+        return False
+    place = geocode(getattr(instance, text_field))
+    if place is None:
+        return False
+    setattr(instance, lat_field, place.latitude)
+    setattr(instance, lng_field, place.longitude)
+    return True
+
+
+def near(text, lat_field, lng_field, miles=None):
+    """Q for points within `miles` of where `text` geocodes to, or None if it doesn't"""
+    place = geocode(text)
+    if place is None:
+        return None
+    miles = miles or settings.GEOCODER_SEARCH_RADIUS_MILES
+    dlat = miles / 69.0
+    dlng = miles / max(69.0 * math.cos(math.radians(place.latitude)), 1e-6)
+    return Q(**{
+        f'{lat_field}__range': (place.latitude - dlat, place.latitude + dlat),
+        f'{lng_field}__range': (place.longitude - dlng, place.longitude + dlng),
+    })
+
+
+def backfill(model, batch_size=1000):
+    """
+    Geocode every row of `model` that has location text but no coordinates.
+
+    Each distinct text is geocoded once. Sightings, the large table, are
+    updated in bulk and the clusters of their cases rebuilt. Cases and
+    subscriptions are saved row by row, so the signals that follow their
+    coordinates (change feed, page cache, duplicate keys, digest regions,
+    coverage cells) run as for any edit. Returns (rows updated, texts not found).
+    """
+    from . import clusters
+
+    text_field, lat_field, lng_field = LOCATION_FIELDS[model]
+    pending = model.objects.filter(**{f'{lat_field}__isnull': True}).exclude(**{text_field: ''})
+    texts = list(pending.order_by().values_list(text_field, flat=True).distinct())
+    update_fields = [lat_field, lng_field]
+    if model in (AlertSubscription, SMSSubscription):
+        update_fields.append('digest_region')
+
+    updated = not_found = 0
+    for start in range(0, len(texts), batch_size):
+        places = geocode_many(texts[start:start + batch_size])
+        not_found += sum(1 for place in places.values() if place is None)
+        for text, place in places.items():
+            if place is None:
+                continue
+            rows = pending.filter(**{text_field: text})
+            if model is LocationUpdate:
+                child_ids = set(rows.filter(verified=True).values_list('child_id', flat=True))
+                updated += rows.update(**{lat_field: place.latitude, lng_field: place.longitude})
+                for child_id in child_ids:
+                    clusters.rebuild(child_id)
+                continue
+            for instance in rows.iterator(chunk_size=batch_size):
+                setattr(instance, lat_field, place.latitude)
+                setattr(instance, lng_field, place.longitude)
+                instance.save(update_fields=update_fields)
+                updated += 1
+    return updated, not_found
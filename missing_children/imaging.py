@@ -0,0 +1,123 @@
+import io
+import os
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+from .models import MissingChild
+from . import page_cache
+
+FORMATS = {
+    'webp': ('WEBP', {'method': 4}),
+    'jpeg': ('JPEG', {'optimize': True, 'progressive': True}),
+}
+
+
+def load_normalized(fileobj):
+    """Open an upload, apply its EXIF orientation and return an RGB copy with no metadata"""
+    with Image.open(fileobj) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            rgba = image.convert('RGBA')
+            background.paste(rgba, mask=rgba.split()[-1])
+            image = background
+        clean = Image.new(image.mode, image.size)
+        clean.paste(image)
+    return clean.convert('RGB')
+
+
+def derivative_name(source_name, width, fmt):
+    """`missing_children/anna.jpg` -> `missing_children/anna_w320.webp`"""
+    stem, _ = os.path.splitext(source_name)
+    ext = 'jpg' if fmt == 'jpeg' else fmt
+    return f'{stem}_w{width}.{ext}'
+
+
+def render(image, width, fmt):
+    if image.width > width:
+        height = round(image.height * width / image.width)
+        image = image.resize((width, height), Image.LANCZOS)
+    pil_format, options = FORMATS[fmt]
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, quality=settings.PHOTO_DERIVATIVE_QUALITY, **options)
+    return image.width, buffer.getvalue()
+
+
+def replace_original(photo, image, source_format):
+    """Store the normalized image over the upload, in its own format where Pillow can write it; returns the name"""
+    pil_format = source_format if source_format in Image.SAVE else 'JPEG'
+    options = {'quality': 95} if pil_format in ('JPEG', 'WEBP') else {}
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    storage = photo.storage
+    storage.delete(photo.name)
+    return storage.save(photo.name, ContentFile(buffer.getvalue()))
+
+
+def build_derivatives(photo):
+    """
+    Strip the uploaded original and write resized WebP and JPEG renditions next to it.
+
+    The original is rewritten without EXIF (GPS, device) or other metadata.
+    Returns the value stored in MissingChild.photo_variants. Widths larger than
+    the original are skipped, except the smallest, so there is always a thumbnail.
+    """
+    storage = photo.storage
+    with storage.open(photo.name, 'rb') as source:
+        with Image.open(source) as original:
+            source_format = original.format
+        source.seek(0)
+        image = load_normalized(source)
+    name = replace_original(photo, image, source_format)
+
+    widths = sorted(settings.PHOTO_DERIVATIVE_WIDTHS)
+    wanted = [w for w in widths if w <= image.width] or widths[:1]
+
+    variants = []
+    for width in wanted:
+        entry = {}
+        for fmt in FORMATS:
+            actual_width, data = render(image, width, fmt)
+            variant_name = derivative_name(name, width, fmt)
+            if storage.exists(variant_name):
+                storage.delete(variant_name)
+            entry[fmt] = storage.save(variant_name, ContentFile(data))
+        entry['width'] = actual_width
+        variants.append(entry)
+
+    return {'source': name, 'variants': variants}
+
+
+def needs_derivatives(child):
+    return bool(child.photo) and child.photo_variants.get('source') != child.photo.name
+
+
+def public_photo(child):
+    """Storage name of the largest JPEG rendition, or None until the stripped renditions exist"""
+    if not child.photo or needs_derivatives(child):
+        return None
+    return child.photo_variants['variants'][-1]['jpeg']
+
+
+def refresh_child_photo(child_id, force=False):
+    """Build derivatives for one case and record them; returns the number of widths written"""
+    from . import changes
+
+    child = MissingChild.objects.get(pk=child_id)
+    if not child.photo or not (force or needs_derivatives(child)):
+        return 0
+    previous_name = child.photo.name
+    variants = build_derivatives(child.photo)
+    child.photo.name = variants['source']
+    child.photo_variants = variants
+    child.updated_at = timezone.now()
+    # update() rather than save(): no signals, so no new derivatives task. updated_at
+    # is bumped for the API ETag, and the journal gets the case with its public photo
+    updated = MissingChild.objects.filter(pk=child.pk, photo=previous_name).update(
+        photo=child.photo.name, photo_variants=variants, updated_at=child.updated_at,
+    )
+    if updated:
+        changes.record_case(child, child.status)
+    page_cache.invalidate(page_cache.CASES, page_cache.case_group(child.pk))
+    return len(variants['variants'])
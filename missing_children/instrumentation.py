@@ -0,0 +1,121 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('missing_children.sql')
+
+# Collapse literals so "WHERE id = 1" and "WHERE id = 2" group as one N+1 shape
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def _shape(sql):
+    return _LITERALS.sub('?', sql)
+
+
+class QueryRecorder:
+    """
+    Record every SQL statement run on all database connections in a block.
+
+        with QueryRecorder() as queries:
+            ...
+        queries.count, queries.total_time, queries.duplicates(), queries.slowest()
+
+    Uses connection.execute_wrapper, so it works with DEBUG off.
+    """
+
+    def __init__(self, using=None):
+        self.aliases = [using] if using else list(connections)
+        self.queries = []
+        self._stack = None
+
+    def _wrapper(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append({
+                    'alias': alias,
+                    'sql': sql,
+                    'params': repr(params),
+                    'time': time.perf_counter() - started,
+                })
+        return wrapper
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in self.aliases:
+            self._stack.enter_context(connections[alias].execute_wrapper(self._wrapper(alias)))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        return False
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(q['time'] for q in self.queries)
+
+    def duplicates(self):
+        """Statements run more than once with identical SQL and parameters: {sql: times}"""
+        counts = Counter((q['sql'], q['params']) for q in self.queries)
+        return {sql: n for (sql, params), n in counts.items() if n > 1}
+
+    def similar(self):
+        """Statement shapes repeated with different parameters, the usual N+1 signature"""
+        counts = Counter(_shape(q['sql']) for q in self.queries)
+        return {sql: n for sql, n in counts.items() if n > 1}
+
+    def slowest(self, n=5):
+        return sorted(self.queries, key=lambda q: q['time'], reverse=True)[:n]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'time_ms': round(self.total_time * 1000, 2),
+            'duplicates': sum(n - 1 for n in self.duplicates().values()),
+            'similar': sum(n - 1 for n in self.similar().values()),
+        }
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Opt-in per-request SQL profile (enable with SQL_INSTRUMENTATION = True).
+
+    Adds X-SQL-Count, X-SQL-Time-Ms and X-SQL-Duplicates headers and logs the
+    slowest and repeated statements of each view to the `missing_children.sql`
+    logger. Requests above SQL_QUERY_WARN_THRESHOLD log at WARNING.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as queries:
+            response = self.get_response(request)
+
+        summary = queries.summary()
+        response['X-SQL-Count'] = str(summary['count'])
+        response['X-SQL-Time-Ms'] = str(summary['time_ms'])
+        response['X-SQL-Duplicates'] = str(summary['duplicates'])
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else request.path
+        level = logging.WARNING if summary['count'] > settings.SQL_QUERY_WARN_THRESHOLD else logging.INFO
+        if logger.isEnabledFor(level):
+            lines = [f"{view}: {summary['count']} queries in {summary['time_ms']}ms, "
+                     f"{summary['duplicates']} duplicate, {summary['similar']} similar"]
+            for q in queries.slowest(settings.SQL_SLOWEST_TO_LOG):
+                lines.append(f"  {q['time'] * 1000:.2f}ms {q['sql']}")
+            for sql, n in queries.similar().items():
+                lines.append(f"  x{n} {sql}")
+            logger.log(level, '\n'.join(lines))
+        return response
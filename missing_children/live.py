@@ -0,0 +1,197 @@
+"""
+In-process fan-out of live case events to Server-Sent Events streams.
+
+Each ASGI process keeps one Hub. Every connected client has a small queue in
+it, registered under the topics it follows: `case:<id>` for one case, or the
+geo cells (see geo.py) covering a region. A published message is copied into
+the queues of its topics, so idle listeners cost no database work at all.
+
+Messages come from a backend:
+
+- LocalBackend (LIVE_BACKEND = 'local') hands them straight to this process's
+  hub. It stands in for the broker in tests and single-process servers.
+- RedisBackend (LIVE_BACKEND = 'redis') publishes to a Redis channel. One
+  listener task per process feeds the hub, so every worker sees every event.
+  It needs the `redis` package.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import MissingChild
+from . import geo
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'missing_children.live'
+
+
+def case_topic(child_id):
+    return f'case:{child_id}'
+
+
+def cell_topic(cell):
+    return f'cell:{cell}'
+
+
+class Hub:
+    """Topic -> client queues, owned by one event loop"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.topics = defaultdict(set)
+        self.loop = None
+
+    def subscribe(self, topics):
+        self.loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.queue_size)
+        for topic in topics:
+            self.topics[topic].add(queue)
+        return queue
+
+    def unsubscribe(self, queue, topics):
+        for topic in topics:
+            listeners = self.topics.get(topic)
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    del self.topics[topic]
+
+    @property
+    def listener_count(self):
+        return len({queue for listeners in self.topics.values() for queue in listeners})
+
+    def dispatch(self, message):
+        queues = set()
+        for topic in message['topics']:
+            queues.update(self.topics.get(topic, ()))
+        for queue in queues:
+            if queue.full():
+                # A stalled client loses its oldest event rather than blocking everyone
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def dispatch_threadsafe(self, message):
+        """Deliver from any thread, e.g. a sync view running in a worker thread"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.dispatch(message)
+        else:
+            loop.call_soon_threadsafe(self.dispatch, message)
+
+
+class LocalBackend:
+    """Stand-in broker: publish into this process's hub only"""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, message):
+        self.hub.dispatch_threadsafe(message)
+
+    async def start(self):
+        pass
+
+
+class RedisBackend:
+    """Publish through a Redis channel; one listener task per process fans out locally"""
+
+    def __init__(self, hub, url, channel=CHANNEL):
+        self.hub = hub
+        self.url = url
+        self.channel = channel
+        self.task = None
+
+    def publish(self, message):
+        import redis
+
+        client = redis.Redis.from_url(self.url)
+        try:
+            client.publish(self.channel, json.dumps(message, cls=DjangoJSONEncoder))
+        finally:
+            client.close()
+
+    async def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for item in pubsub.listen():
+                if item['type'] == 'message':
+                    self.hub.dispatch(json.loads(item['data']))
+        finally:
+            await pubsub.close()
+            await client.aclose()
+
+
+hub = Hub(settings.LIVE_QUEUE_SIZE)
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if settings.LIVE_BACKEND == 'redis':
+                _backend = RedisBackend(hub, settings.LIVE_REDIS_URL)
+            else:
+                _backend = LocalBackend(hub)
+        return _backend
+
+
+def publish(message):
+    try:
+        backend().publish(message)
+    except Exception as e:
+        # Live updates are best effort; the change feed is the durable record
+        logger.warning(f"Could not publish live event {message.get('id')}: {e}")
+
+
+def message_for(event):
+    """
+    Live message for a ChangeEvent, or None if it is not pushed.
+
+    Pushed: newly verified sightings and case status changes. Topics are the
+    case and the geo cell of the case's last known position.
+    """
+    if event.kind == 'sighting' and event.action == 'upsert':
+        child_id = event.data['case']
+        name = 'sighting'
+    elif event.kind == 'case' and event.action == 'status':
+        child_id = event.object_id
+        name = 'status'
+    else:
+        return None
+
+    point = MissingChild.objects.filter(pk=child_id).values_list(
+        'last_seen_latitude', 'last_seen_longitude'
+    ).first()
+    topics = [case_topic(child_id)]
+    if point and None not in point:
+        topics.append(cell_topic(geo.cell_for(*point)))
+    else:
+        point = None
+    return {
+        'id': event.id,
+        'event': name,
+        'case': str(child_id),
+        'point': point,
+        'topics': topics,
+        'data': event.data,
+    }
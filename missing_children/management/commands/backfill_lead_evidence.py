@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from missing_children.models import Lead
+from missing_children import uploads
+
+
+class Command(BaseCommand):
+    help = 'Thumbnail and describe lead evidence whose processing task never ran'
+
+    def handle(self, *args, **options):
+        queryset = Lead.objects.exclude(evidence_file='').exclude(evidence_file__isnull=True).filter(evidence_metadata={})
+        done = failed = 0
+        for lead_id in queryset.values_list('pk', flat=True).iterator():
+            try:
+                uploads.process_evidence(lead_id)
+            except (Lead.DoesNotExist, OSError) as e:
+                failed += 1
+                self.stderr.write(f'{lead_id}: {e}')
+            else:
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {done} evidence files, {failed} failed'))
@@ -0,0 +1,47 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections
+from missing_children.models import MissingChild
+from missing_children import imaging
+
+
+def _process(child_id, force):
+    # Each worker opens its own database connection on first use
+    try:
+        return child_id, imaging.refresh_child_photo(child_id, force=force), None
+    except Exception as e:
+        return child_id, 0, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails and WebP/JPEG variants for existing case photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--force', action='store_true', help='Rebuild variants that already exist')
+
+    def handle(self, *args, **options):
+        queryset = MissingChild.objects.exclude(photo='')
+        if not options['force']:
+            queryset = queryset.filter(photo_variants={})
+        child_ids = list(queryset.values_list('pk', flat=True))
+        if not child_ids:
+            self.stdout.write('No photos to process')
+            return
+
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [pool.submit(_process, child_id, options['force']) for child_id in child_ids]
+            for future in as_completed(futures):
+                child_id, widths, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{child_id}: {error}')
+                else:
+                    done += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {done} photos, {failed} failed'))
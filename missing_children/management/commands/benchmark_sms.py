@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from missing_children.fake_twilio import FakeTwilioClient
+from missing_children.sms_alert import SMSDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Measure SMS dispatch throughput against the local fake Twilio client'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=10000)
+        parser.add_argument('--rate', type=float, default=100, help='Dispatcher token-bucket rate (msg/s)')
+        parser.add_argument('--provider-limit', type=int, default=None, help='Fake provider msg/s before 429s')
+        parser.add_argument('--latency', type=float, default=0.05, help='Simulated provider latency (s)')
+        parser.add_argument('--workers', type=int, default=32)
+
+    def handle(self, *args, **options):
+        client = FakeTwilioClient(latency=options['latency'], max_per_second=options['provider_limit'])
+        dispatcher = SMSDispatcher(
+            client, '+15550000000',
+            rate_per_second=options['rate'],
+            max_workers=options['workers'],
+        )
+        phones = [f'+1555{i:07d}' for i in range(options['recipients'])]
+
+        started = time.monotonic()
+        results = dispatcher.send('Benchmark alert', phones)
+        elapsed = time.monotonic() - started
+
+        sent = len([r for r in results if r['success']])
+        throttled = sum(r['throttled'] for r in results)
+        self.stdout.write(
+            f'{sent}/{len(phones)} sent in {elapsed:.2f}s '
+            f'({sent / elapsed:.1f} msg/s), {throttled} throttled retries'
+        )
+        if options['recipients']:
+            projected = 100000 / (sent / elapsed) if sent else float('inf')
+            self.stdout.write(f'Projected time for 100k recipients: {projected / 60:.1f} min')
@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+from missing_children.models import MissingChild, Lead, PhotoHash
+from missing_children import photo_hashes
+
+
+def _hash(name):
+    # Workers only read files; the parent writes the rows
+    try:
+        return photo_hashes.hash_file(name, default_storage), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _pending(force):
+    """(source, child id, lead id, file name) of every photo to hash"""
+    cases = MissingChild.objects.exclude(photo='').values_list('pk', 'photo')
+    leads = Lead.objects.filter(evidence_content_type__startswith='image/').exclude(
+        evidence_content_type='image/heic',
+    ).exclude(evidence_file='').exclude(evidence_file__isnull=True).values_list('pk', 'child_id', 'evidence_file')
+    if not force:
+        cases = cases.exclude(pk__in=PhotoHash.objects.filter(source='case').values('child_id'))
+        leads = leads.exclude(pk__in=PhotoHash.objects.filter(source='lead').values('lead_id'))
+    return (
+        [('case', child_id, None, name) for child_id, name in cases.iterator()]
+        + [('lead', child_id, lead_id, name) for lead_id, child_id, name in leads.iterator()]
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compute perceptual hashes for case photos and lead images missing from the look-alike index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per INSERT')
+        parser.add_argument('--force', action='store_true', help='Rehash photos that are already indexed')
+
+    def handle(self, *args, **options):
+        pending = _pending(options['force'])
+        if not pending:
+            self.stdout.write('No photos to index')
+            return
+        if options['force']:
+            PhotoHash.objects.all().delete()
+
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+
+        done = failed = 0
+        batch = []
+        names = [name for _, _, _, name in pending]
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            results = pool.map(_hash, names, chunksize=64)
+            for (source, child_id, lead_id, name), (values, error) in zip(pending, results):
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                    continue
+                batch.append(PhotoHash(
+                    source=source, child_id=child_id, lead_id=lead_id, file=name,
+                    **photo_hashes.hash_fields(*values),
+                ))
+                if len(batch) >= options['batch_size']:
+                    done += len(PhotoHash.objects.bulk_create(batch))
+                    batch = []
+        done += len(PhotoHash.objects.bulk_create(batch))
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {done} photos, {failed} failed'))
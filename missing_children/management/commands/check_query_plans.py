@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from missing_children import query_plans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every registered hot queryset and fail if any of them scans a whole table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Only check these entries')
+        parser.add_argument('--show-plans', action='store_true', help='Print every plan, not just failures')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(query_plans.HOT_QUERIES)
+        if unknown:
+            raise CommandError(f"Unknown queries: {', '.join(sorted(unknown))}")
+
+        failures = 0
+        for name, plan, scans in query_plans.check(options['names'] or None):
+            if scans:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"FULL SCAN {name}: {', '.join(scans)}"))
+            else:
+                self.stdout.write(f'ok {name}')
+            if scans or options['show_plans']:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if failures:
+            raise CommandError(f'{failures} hot queries scan whole tables; add or fix their indexes')
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index'))
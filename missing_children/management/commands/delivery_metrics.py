@@ -0,0 +1,71 @@
+import json
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from missing_children import metrics
+from missing_children.models import MissingChild
+
+
+def _ms(value):
+    return '-' if value is None else f'{value}ms'
+
+
+class Command(BaseCommand):
+    help = 'Show SMS/email delivery metrics: per minute, or for one case alert'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--case', help='Case id (or case number) to report the alert of')
+        parser.add_argument('--minutes', type=int, default=60, help='Window for the per-minute report')
+        parser.add_argument('--channel', choices=['email', 'sms'])
+        parser.add_argument('--kind', choices=['alert', 'digest'])
+        parser.add_argument('--json', action='store_true', help='Print raw JSON')
+
+    def handle(self, *args, **options):
+        if options['case']:
+            report = metrics.alert(self._case_id(options['case']))
+        else:
+            report = metrics.per_minute(
+                since=timezone.now() - timedelta(minutes=options['minutes']),
+                channel=options['channel'], kind=options['kind'],
+            )
+        if options['json']:
+            self.stdout.write(json.dumps(report, cls=DjangoJSONEncoder, indent=2))
+        elif options['case']:
+            self._write_alert(report)
+        else:
+            self._write_minutes(report)
+
+    def _case_id(self, value):
+        try:
+            child = MissingChild.objects.filter(pk=value).values_list('pk', flat=True).first()
+        except ValidationError:
+            child = None
+        child = child or MissingChild.objects.filter(case_number=value).values_list('pk', flat=True).first()
+        if child is None:
+            raise CommandError(f'No case {value}')
+        return child
+
+    def _write_alert(self, report):
+        self.stdout.write(f"Alert for case {report['child_id']}, requested {report['requested_at'] or 'never'}")
+        if not report['channels']:
+            self.stdout.write('No delivery attempts recorded')
+        for channel, m in sorted(report['channels'].items()):
+            done = '-' if m['completed_in_seconds'] is None else f"{m['completed_in_seconds']:.1f}s"
+            self.stdout.write(
+                f"  {channel:<5} sent {m['sent']}  failed {m['failed']}  throttled {m['throttled']}  "
+                f"p50 {_ms(m['p50_ms'])}  p95 {_ms(m['p95_ms'])}  done in {done}  ({m['per_minute'] or '-'}/min)"
+            )
+
+    def _write_minutes(self, report):
+        if not report:
+            self.stdout.write('No delivery attempts in this window')
+            return
+        self.stdout.write(f"{'minute':<17} {'channel':<7} {'sent':>6} {'failed':>6} {'thrott':>6} {'p50':>8} {'p95':>8}")
+        for row in report:
+            minute = timezone.localtime(row['minute']).strftime('%Y-%m-%d %H:%M')
+            self.stdout.write(
+                f"{minute:<17} {row['channel']:<7} {row['sent']:>6} {row['failed']:>6} {row['throttled']:>6} "
+                f"{_ms(row['p50_ms']):>8} {_ms(row['p95_ms']):>8}"
+            )
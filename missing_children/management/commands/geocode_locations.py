@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from missing_children import geocoder
+
+
+class Command(BaseCommand):
+    help = 'Fill in missing coordinates of cases, sightings and subscriptions from their location text'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Distinct texts geocoded per cache query')
+        parser.add_argument(
+            '--model', action='append', choices=[model.__name__ for model in geocoder.LOCATION_FIELDS],
+            help='Only these models (repeatable); all by default',
+        )
+
+    def handle(self, *args, **options):
+        for model in geocoder.LOCATION_FIELDS:
+            if options['model'] and model.__name__ not in options['model']:
+                continue
+            updated, not_found = geocoder.backfill(model, batch_size=options['batch_size'])
+            self.stdout.write(f'{model.__name__}: {updated} rows geocoded, {not_found} locations not found')
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from missing_children.models import AlertSubscription, SMSSubscription
+from missing_children import geo
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the grid-cell coverage index for email and SMS subscribers'
+
+    def handle(self, *args, **options):
+        for model in (AlertSubscription, SMSSubscription):
+            subscribers = 0
+            cells = 0
+            for subscription in model.objects.iterator():
+                cells += geo.index_subscription(subscription)
+                subscribers += 1
+            self.stdout.write(f'{model.__name__}: {subscribers} subscribers in {cells} cells')
+        self.stdout.write(self.style.SUCCESS('Coverage index rebuilt'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from missing_children import duplicates
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the blocking keys used to detect duplicate case reports'
+
+    def handle(self, *args, **options):
+        count = duplicates.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Built {count} duplicate detection keys'))
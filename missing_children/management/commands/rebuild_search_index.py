@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from missing_children.models import MissingChild
+from missing_children import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for missing child cases'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING('Full-text index is only available on SQLite; nothing to do.'))
+            return
+        count = search.rebuild_index(MissingChild.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} cases'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from missing_children import clusters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-case sighting clusters from the verified sightings'
+
+    def handle(self, *args, **options):
+        count = clusters.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Built {count} sighting clusters'))
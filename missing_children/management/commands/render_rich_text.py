@@ -0,0 +1,23 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from missing_children import richtext
+
+
+class Command(BaseCommand):
+    help = 'Re-sanitize every RichText field into its _html, _text and snippet columns (after changing the allowlist)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per UPDATE')
+        parser.add_argument(
+            '--model', action='append', choices=list(richtext.FIELDS),
+            help='Only these models (repeatable); all by default',
+        )
+
+    def handle(self, *args, **options):
+        for name in richtext.FIELDS:
+            if options['model'] and name not in options['model']:
+                continue
+            model = apps.get_model('missing_children', name)
+            count = richtext.backfill(model, batch_size=options['batch_size'])
+            self.stdout.write(f'{name}: {count} rows rendered')
+        self.stdout.write(self.style.SUCCESS('Done'))
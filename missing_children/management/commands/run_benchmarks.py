@@ -0,0 +1,52 @@
+import os
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from missing_children import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Time the hot views and alert tasks and save the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Subset to run: {', '.join(benchmarks.BENCHMARKS)}")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--output-dir', default=os.path.join(settings.BASE_DIR, 'benchmarks'))
+        parser.add_argument('--compare', help="Earlier results file, or 'latest' for the newest in --output-dir")
+        parser.add_argument('--threshold', type=float, default=0.2, help='Slowdown ratio flagged as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(benchmarks.BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+        output_dir = options['output_dir']
+        os.makedirs(output_dir, exist_ok=True)
+        previous_path = options['compare']
+        if previous_path == 'latest':
+            files = sorted(f for f in os.listdir(output_dir) if f.endswith('.json'))
+            previous_path = os.path.join(output_dir, files[-1]) if files else None
+
+        results = benchmarks.run(
+            options['names'] or None, repeat=options['repeat'], warmup=options['warmup'],
+            log=self.stdout.write,
+        )
+        data = benchmarks.report(results)
+        path = os.path.join(output_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.json")
+        benchmarks.save(data, path)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {path}'))
+
+        if not previous_path:
+            return
+        regressions = benchmarks.compare(data, benchmarks.load(previous_path), options['threshold'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {previous_path}'))
+            return
+        for r in regressions:
+            self.stdout.write(self.style.ERROR(
+                f"REGRESSION {r['name']}: {r['previous_ms']}ms -> {r['current_ms']}ms (x{r['ratio']})"
+            ))
+        if options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} benchmark(s) regressed')
@@ -0,0 +1,136 @@
+"""
+Delivery attempts and the metrics built from them.
+
+Every provider send (an SMS through the dispatcher, or an email handed to the
+SMTP connection) becomes one DeliveryAttempt. The send paths collect a batch's
+attempts and write them with a single bulk_create, so recording costs one
+INSERT per batch. The metrics are computed from those rows:
+
+- alert(child_id): sent, failed, throttling and provider latency for one
+  case's alert, plus how long it took from the request to the last send
+- per_minute(since): the same counters bucketed by minute, for throughput
+
+Counters and nearest-rank latency percentiles are aggregated in the database,
+so a report never loads the attempt rows themselves.
+"""
+from datetime import timedelta, timezone as dt_timezone
+from django.db.models import Count, F, Max, Q, Sum, Window
+from django.db.models.functions import Coalesce, RowNumber, TruncMinute
+from django.utils import timezone
+from .models import DeliveryAttempt, AlertOutbox
+
+
+def attempt(channel, success, latency=None, kind='alert', child_id=None, delivery_id=None,
+            throttled=0, provider_id='', error=''):
+    """Unsaved DeliveryAttempt; `latency` is in seconds"""
+    return DeliveryAttempt(
+        kind=kind, channel=channel, child_id=child_id, delivery_id=delivery_id, success=success,
+        latency_ms=None if latency is None else round(latency * 1000),
+        throttled=throttled, provider_id=(provider_id or '')[:64], error=(error or '')[:200],
+        attempted_at=timezone.now(),
+    )
+
+
+def sms_attempt(result, **kwargs):
+    """DeliveryAttempt from an SMSDispatcher result dict"""
+    return attempt(
+        'sms', result['success'], result.get('latency'), throttled=result.get('throttled', 0),
+        provider_id=result.get('message_sid', ''), error=result.get('error', ''), **kwargs,
+    )
+
+
+def record(attempts):
+    return DeliveryAttempt.objects.bulk_create(attempts) if attempts else []
+
+
+def percentiles(attempts, fields, quantiles=(50, 95)):
+    """
+    {group: {q: nearest-rank q-th percentile latency}} for `attempts` grouped by `fields`.
+
+    The q-th percentile of n latencies is the one at position ceil(q * n / 100)
+    in ascending order. A single pass numbers each group's rows and counts the
+    group with window functions and keeps only those positions, so every
+    quantile comes from the same scan and no other rows leave the database.
+    """
+    found = {}
+    for row in percentile_rows(attempts, fields, quantiles):
+        group = found.setdefault(tuple(row[field] for field in fields), {})
+        for q in quantiles:
+            if row['position'] == nearest_rank(q, row['total']):
+                group[q] = row['latency_ms']
+    return found
+
+
+def nearest_rank(q, total):
+    return (total * q + 99) // 100
+
+
+def percentile_rows(attempts, fields, quantiles=(50, 95)):
+    """The query behind percentiles(): each group's rows at the quantiles' positions"""
+    at_rank = Q()
+    for q in quantiles:
+        at_rank |= Q(position=(F('total') * q + 99) / 100)
+    return ranked_latencies(attempts, fields).filter(at_rank).values(*fields, 'latency_ms', 'position', 'total')
+
+
+def ranked_latencies(attempts, fields):
+    """`attempts` with their latency's `position` within their group and the group's `total`"""
+    partition = [F(field) for field in fields]
+    return attempts.exclude(latency_ms=None).order_by().annotate(
+        position=Window(RowNumber(), partition_by=partition, order_by=F('latency_ms').asc()),
+        total=Window(Count('*'), partition_by=partition),
+    )
+
+
+def summarize(attempts, fields, **annotations):
+    """{group: counters} for `attempts` grouped by `fields` (which may name `annotations`), aggregated in SQL"""
+    attempts = attempts.annotate(**annotations).order_by()
+    rows = attempts.values(*fields).annotate(
+        sent=Count('pk', filter=Q(success=True)),
+        failed=Count('pk', filter=Q(success=False)),
+        throttled=Coalesce(Sum('throttled'), 0),
+        last_sent=Max('attempted_at', filter=Q(success=True)),
+    )
+    groups = {
+        tuple(row[field] for field in fields): {name: row[name] for name in ('sent', 'failed', 'throttled', 'last_sent')}
+        for row in rows
+    }
+    found = percentiles(attempts, fields)
+    for group, summary in groups.items():
+        for q in (50, 95):
+            summary[f'p{q}_ms'] = found.get(group, {}).get(q)
+    return groups
+
+
+def alert(child_id):
+    """Per-channel metrics for one case's alert, and how fast it went out"""
+    attempts = DeliveryAttempt.objects.filter(child_id=child_id, kind='alert')
+    requested_at = AlertOutbox.objects.filter(child_id=child_id).order_by('created_at').values_list(
+        'created_at', flat=True,
+    ).first()
+    metrics = {'child_id': str(child_id), 'requested_at': requested_at, 'channels': {}}
+    for (channel,), summary in summarize(attempts, ['channel']).items():
+        done = summary.pop('last_sent')
+        elapsed = (done - requested_at).total_seconds() if done and requested_at else None
+        summary['completed_in_seconds'] = elapsed
+        summary['per_minute'] = round(summary['sent'] / elapsed * 60, 1) if elapsed else None
+        metrics['channels'][channel] = summary
+    return metrics
+
+
+def per_minute(since=None, until=None, channel=None, kind=None):
+    """[{minute, channel, sent, failed, throttled, p50_ms, p95_ms}] oldest first"""
+    until = until or timezone.now()
+    since = since or until - timedelta(hours=1)
+    attempts = DeliveryAttempt.objects.filter(attempted_at__gte=since, attempted_at__lt=until)
+    if channel:
+        attempts = attempts.filter(channel=channel)
+    if kind:
+        attempts = attempts.filter(kind=kind)
+
+    grouped = summarize(attempts, ['minute', 'channel'], minute=TruncMinute('attempted_at', tzinfo=dt_timezone.utc))
+    rows = []
+    for (minute, row_channel), summary in sorted(grouped.items()):
+        summary.pop('last_sent')
+        rows.append({'minute': minute, 'channel': row_channel, **summary})
+    return rows
@@ -0,0 +1,56 @@
+from html import unescape
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# Frozen copy of the index layout in search.py as of this migration
+SEARCH_TABLE = 'missing_children_casesearch'
+SEARCH_COLUMNS = ['first_name', 'last_name', 'case_number', 'last_seen_location', 'distinctive_features']
+RANK_WEIGHTS = (0.0, 10.0, 10.0, 8.0, 4.0, 1.0)
+
+
+def plain_text(html):
+    if not html:
+        return ''
+    return ' '.join(unescape(strip_tags(html)).split())
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    MissingChild = apps.get_model('missing_children', 'MissingChild')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            f"child_id UNINDEXED, {', '.join(SEARCH_COLUMNS)}, "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+        )
+        weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES ('rank', %s)",
+            [f'bm25({weights})'],
+        )
+        rows = MissingChild.objects.order_by().values_list(
+            'pk', 'first_name', 'last_name', 'case_number', 'last_seen_location', 'distinctive_features',
+        )
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE}(child_id, {', '.join(SEARCH_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s)",
+            [(pk.hex, *fields, plain_text(features)) for pk, *fields, features in rows.iterator(chunk_size=1000)],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0002_smssubscription'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
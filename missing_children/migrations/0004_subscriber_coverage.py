@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0003_case_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertsubscription',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alertsubscription',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alertsubscription',
+            name='radius_miles',
+            field=models.IntegerField(default=10),
+        ),
+        migrations.AddField(
+            model_name='missingchild',
+            name='last_seen_latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='missingchild',
+            name='last_seen_longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='smssubscription',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='smssubscription',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='EmailCoverageCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.BigIntegerField()),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coverage_cells', to='missing_children.alertsubscription')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cell', 'subscription'], name='missing_chi_cell_333860_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SMSCoverageCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.BigIntegerField()),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coverage_cells', to='missing_children.smssubscription')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cell', 'subscription'], name='missing_chi_cell_7082e1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0004_subscriber_coverage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='missingchild',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
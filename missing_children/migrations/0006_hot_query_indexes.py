@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0005_missingchild_photo_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alertsubscription',
+            index=models.Index(condition=models.Q(('subscribed', True), ('verified', True)), fields=['id'], name='alertsub_recipients_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alertsubscription',
+            index=models.Index(fields=['verification_token'], name='missing_chi_verific_3084af_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locationupdate',
+            index=models.Index(condition=models.Q(('verified', True)), fields=['child', 'sighting_time'], name='sighting_verified_child_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missingchild',
+            index=models.Index(condition=models.Q(('is_abducted', True)), fields=['status', 'reported_date'], name='child_abducted_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missingchild',
+            index=models.Index(fields=['status', 'reported_date', 'id'], name='missing_chi_status_e421f0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missingchild',
+            index=models.Index(fields=['reported_date', 'id'], name='missing_chi_reporte_5e1986_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smssubscription',
+            index=models.Index(condition=models.Q(('active', True), ('verified', True)), fields=['created_at'], name='smssub_recipients_idx'),
+        ),
+    ]
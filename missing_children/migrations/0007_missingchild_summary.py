@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:06
+
+from html import unescape
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+SUMMARY_LENGTH = 160
+
+
+def snippet(html):
+    """Frozen copy of search.snippet as of this migration"""
+    text = ' '.join(unescape(strip_tags(html)).split()) if html else ''
+    return Truncator(text).chars(SUMMARY_LENGTH)
+
+
+def fill_summaries(apps, schema_editor):
+    MissingChild = apps.get_model('missing_children', 'MissingChild')
+    batch = []
+    for child in MissingChild.objects.only('pk', 'distinctive_features').iterator(chunk_size=1000):
+        child.summary = snippet(child.distinctive_features)
+        batch.append(child)
+        if len(batch) >= 1000:
+            MissingChild.objects.bulk_update(batch, ['summary'])
+            batch = []
+    if batch:
+        MissingChild.objects.bulk_update(batch, ['summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0006_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='missingchild',
+            name='summary',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0007_missingchild_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='missingchild',
+            index=models.Index(fields=['updated_at'], name='missing_chi_updated_872b3e_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:10
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0008_missingchild_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('case', 'Case'), ('sighting', 'Sighting')], max_length=10)),
+                ('object_id', models.CharField(max_length=36)),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('status', 'Status changed'), ('delete', 'Deleted or closed')], max_length=10)),
+                ('changed_at', models.DateTimeField()),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['changed_at'], name='missing_chi_changed_e7f6b0_idx')],
+            },
+        ),
+    ]
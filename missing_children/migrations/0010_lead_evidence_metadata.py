@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0009_changeevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='evidence_content_type',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='evidence_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='evidence_sha256',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='evidence_size',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
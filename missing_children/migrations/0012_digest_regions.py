@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:21
+
+import math
+from django.conf import settings
+from django.db import migrations, models
+
+
+def cell_for(lat, lng, size):
+    """Frozen copy of geo.cell_for as of this migration"""
+    columns = int(math.ceil(360 / size))
+    row = int(math.floor((min(max(lat, -90.0), 90.0) + 90) / size))
+    col = int(math.floor((lng + 180) / size)) % columns
+    return row * columns + col
+
+
+def fill_digest_regions(apps, schema_editor):
+    size = settings.DIGEST_REGION_SIZE_DEGREES
+    for name in ['AlertSubscription', 'SMSSubscription']:
+        model = apps.get_model('missing_children', name)
+        located = model.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        batch = []
+        for subscription in located.only('pk', 'latitude', 'longitude').iterator(chunk_size=1000):
+            subscription.digest_region = cell_for(subscription.latitude, subscription.longitude, size)
+            batch.append(subscription)
+            if len(batch) >= 1000:
+                model.objects.bulk_update(batch, ['digest_region'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['digest_region'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0011_alert_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertsubscription',
+            name='digest_frequency',
+            field=models.CharField(choices=[('none', 'No digest'), ('daily', 'Daily digest'), ('weekly', 'Weekly summary')], default='none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='alertsubscription',
+            name='digest_region',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='smssubscription',
+            name='digest_frequency',
+            field=models.CharField(choices=[('none', 'No digest'), ('daily', 'Daily digest'), ('weekly', 'Weekly summary')], default='none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='smssubscription',
+            name='digest_region',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='alertsubscription',
+            index=models.Index(fields=['digest_frequency', 'digest_region', 'id'], name='alertsub_digest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smssubscription',
+            index=models.Index(fields=['digest_frequency', 'digest_region', 'id'], name='smssub_digest_idx'),
+        ),
+        migrations.RunPython(fill_digest_regions, migrations.RunPython.noop),
+    ]
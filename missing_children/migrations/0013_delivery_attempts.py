@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0012_digest_regions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('alert', 'Alert'), ('digest', 'Digest')], default='alert', max_length=6)),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('sms', 'SMS')], max_length=5)),
+                ('success', models.BooleanField()),
+                ('latency_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('throttled', models.PositiveSmallIntegerField(default=0)),
+                ('provider_id', models.CharField(blank=True, max_length=64)),
+                ('error', models.CharField(blank=True, max_length=200)),
+                ('attempted_at', models.DateTimeField()),
+                ('child', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='delivery_attempts', to='missing_children.missingchild')),
+                ('delivery', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='provider_attempts', to='missing_children.alertdelivery')),
+            ],
+            options={
+                'ordering': ['-attempted_at'],
+                'indexes': [models.Index(fields=['attempted_at'], name='missing_chi_attempt_d5e0f5_idx'), models.Index(fields=['child', 'attempted_at'], name='missing_chi_child_i_b419d9_idx')],
+            },
+        ),
+    ]
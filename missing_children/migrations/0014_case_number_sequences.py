@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:26
+
+import re
+from django.db import migrations, models
+
+# Numbers issued by the old count()-based code: MC-YYYYMMDD-N
+LEGACY_PATTERN = re.compile(r'^MC-(\d{8})-(\d+)$')
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each day's sequence after the numbers the old count()-based code issued"""
+    MissingChild = apps.get_model('missing_children', 'MissingChild')
+    CaseNumberSequence = apps.get_model('missing_children', 'CaseNumberSequence')
+    highest = {}
+    numbers = MissingChild.objects.filter(case_number__startswith='MC-').values_list('case_number', flat=True)
+    for number in numbers.iterator(chunk_size=2000):
+        match = LEGACY_PATTERN.match(number)
+        if match:
+            day, value = match.group(1), int(match.group(2))
+            highest[day] = max(highest.get(day, 0), value)
+    CaseNumberSequence.objects.bulk_create([
+        CaseNumberSequence(scope=day, next_value=value + 1) for day, value in highest.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0013_delivery_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=40, unique=True)),
+                ('next_value', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0014_case_number_sequences'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='abductorinformation',
+            name='vehicle_plate',
+            field=models.CharField(blank=True, db_index=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['created_at', 'id'], name='missing_chi_created_f8b1f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='missing_chi_status_2961f8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['reporter_email'], name='missing_chi_reporte_a17b65_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locationupdate',
+            index=models.Index(fields=['sighting_time', 'id'], name='missing_chi_sightin_0f9c57_idx'),
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:30
+
+import math
+from datetime import datetime, timedelta, timezone
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def cell_for(lat, lng, size):
+    """Frozen copy of geo.cell_for as of this migration"""
+    columns = int(math.ceil(360 / size))
+    row = int(math.floor((min(max(lat, -90.0), 90.0) + 90) / size))
+    col = int(math.floor((lng + 180) / size)) % columns
+    return row * columns + col
+
+
+def group(rows):
+    """Frozen copy of clusters.group (with area_for and window_for) as of this migration"""
+    size = timedelta(hours=settings.SIGHTING_CLUSTER_WINDOW_HOURS)
+    clusters = {}
+    for location, moment, lat, lng in rows:
+        if lat is not None and lng is not None:
+            area = f'cell:{cell_for(lat, lng, settings.SIGHTING_CLUSTER_CELL_DEGREES)}'
+        else:
+            area = f"place:{' '.join(location.lower().split())}"[:100]
+        key = (area, EPOCH + (moment - EPOCH) // size * size)
+        cluster = clusters.get(key)
+        if cluster is None:
+            cluster = clusters[key] = {
+                'location': location, 'count': 0, 'first_seen': moment, 'last_seen': moment,
+                'located': 0, 'latitude_sum': 0.0, 'longitude_sum': 0.0,
+            }
+        cluster['count'] += 1
+        cluster['first_seen'] = min(cluster['first_seen'], moment)
+        if moment >= cluster['last_seen']:
+            cluster['last_seen'] = moment
+            cluster['location'] = location
+        if lat is not None and lng is not None:
+            cluster['located'] += 1
+            cluster['latitude_sum'] += lat
+            cluster['longitude_sum'] += lng
+    return clusters
+
+
+def build_clusters(apps, schema_editor):
+    LocationUpdate = apps.get_model('missing_children', 'LocationUpdate')
+    SightingCluster = apps.get_model('missing_children', 'SightingCluster')
+    verified = LocationUpdate.objects.filter(verified=True)
+    for child_id in list(verified.order_by().values_list('child_id', flat=True).distinct()):
+        rows = verified.filter(child_id=child_id).values_list('location', 'sighting_time', 'latitude', 'longitude')
+        SightingCluster.objects.bulk_create([
+            SightingCluster(child_id=child_id, area=area, window_start=window, **fields)
+            for (area, window), fields in group(rows.iterator(chunk_size=2000)).items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0015_admin_scale_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='locationupdate',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='locationupdate',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SightingCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('area', models.CharField(max_length=100)),
+                ('window_start', models.DateTimeField()),
+                ('location', models.CharField(max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('located', models.PositiveIntegerField(default=0)),
+                ('latitude_sum', models.FloatField(default=0)),
+                ('longitude_sum', models.FloatField(default=0)),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sighting_clusters', to='missing_children.missingchild')),
+            ],
+            options={
+                'ordering': ['-last_seen'],
+                'indexes': [models.Index(fields=['child', 'last_seen'], name='missing_chi_child_i_d29d9f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('child', 'area', 'window_start'), name='sightingcluster_unique_key')],
+            },
+        ),
+        migrations.RunPython(build_clusters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0016_sighting_clusters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('case', 'Case photo'), ('lead', 'Lead evidence')], max_length=4)),
+                ('file', models.CharField(max_length=255)),
+                ('phash', models.BigIntegerField()),
+                ('dhash', models.BigIntegerField()),
+                ('band0', models.PositiveIntegerField()),
+                ('band1', models.PositiveIntegerField()),
+                ('band2', models.PositiveIntegerField()),
+                ('band3', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photo_hashes', to='missing_children.missingchild')),
+                ('lead', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='photo_hashes', to='missing_children.lead')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['band0'], name='missing_chi_band0_02504b_idx'), models.Index(fields=['band1'], name='missing_chi_band1_3039b9_idx'), models.Index(fields=['band2'], name='missing_chi_band2_664ca5_idx'), models.Index(fields=['band3'], name='missing_chi_band3_4a4fc3_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('source', 'case')), fields=('child',), name='photohash_unique_case'), models.UniqueConstraint(condition=models.Q(('source', 'lead')), fields=('lead',), name='photohash_unique_lead')],
+            },
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:40
+
+import math
+import re
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of the blocking keys in duplicates.py as of this migration
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+LOCATION_STOP_WORDS = {'the', 'of', 'at', 'near', 'by', 'and', 'in', 'on'}
+
+
+def cell_for(lat, lng, size):
+    """Frozen copy of geo.cell_for as of this migration"""
+    columns = int(math.ceil(360 / size))
+    row = int(math.floor((min(max(lat, -90.0), 90.0) + 90) / size))
+    col = int(math.floor((lng + 180) / size)) % columns
+    return row * columns + col
+
+
+def soundex(name):
+    letters = re.sub('[^a-z]', '', (name or '').lower())
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+        if letter not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def keys_for(first_name, last_name, age, gender, location, lat, lng):
+    first, last = soundex(first_name), soundex(last_name)
+    if lat is not None and lng is not None:
+        place = f'cell{cell_for(lat, lng, settings.DUPLICATE_CELL_DEGREES)}'
+    else:
+        words = re.findall('[a-z0-9]+', (location or '').lower())
+        place = ' '.join(word for word in words if word not in LOCATION_STOP_WORDS)[:40]
+    keys = set()
+    if first and last:
+        keys.add(f'name:{last}:{first}')
+    if age is not None and age >= 0:
+        band = age // settings.DUPLICATE_AGE_BAND_YEARS
+        if last:
+            keys.add(f'last:{last}:{band}')
+        if first:
+            keys.add(f'first:{first}:{band}:{gender}')
+        if place:
+            keys.add(f'area:{place}:{band}:{gender}'[:100])
+    return keys
+
+
+def build_keys(apps, schema_editor):
+    MissingChild = apps.get_model('missing_children', 'MissingChild')
+    DuplicateKey = apps.get_model('missing_children', 'DuplicateKey')
+    rows = MissingChild.objects.order_by().values_list(
+        'pk', 'first_name', 'last_name', 'age', 'gender', 'last_seen_location',
+        'last_seen_latitude', 'last_seen_longitude',
+    )
+    DuplicateKey.objects.bulk_create(
+        (DuplicateKey(child_id=pk, key=key) for pk, *fields in rows.iterator(chunk_size=1000)
+         for key in sorted(keys_for(*fields))),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0017_photo_hashes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_keys', to='missing_children.missingchild')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'child'], name='missing_chi_key_11fd81_idx')],
+            },
+        ),
+        migrations.RunPython(build_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,240 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:50
+
+import re
+from html import escape
+from html.parser import HTMLParser
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+# Frozen copy of richtext.py as of this migration
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'caption', 'code', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr',
+    'i', 'li', 'ol', 'p', 'pre', 's', 'strike', 'strong', 'sub', 'sup', 'table', 'tbody', 'td',
+    'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'ol': {'start'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+ALLOWED_SCHEMES = {'http', 'https', 'mailto', 'tel'}
+VOID_TAGS = {'br', 'hr'}
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'svg', 'math', 'textarea'}
+BLOCK_TAGS = {
+    'blockquote', 'br', 'caption', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'ol', 'p',
+    'pre', 'table', 'td', 'th', 'tr', 'ul',
+}
+SCHEME_RE = re.compile(r'^([a-z][a-z0-9+.-]*):', re.IGNORECASE)
+URL_NOISE_RE = re.compile(r'[\x00-\x20\x7f]+')
+
+FIELDS = {
+    'MissingChild': ['last_seen_wearing', 'distinctive_features'],
+    'AbductorInformation': ['description', 'known_associates'],
+    'LocationUpdate': ['description'],
+    'Lead': ['information'],
+}
+SNIPPETS = {
+    'MissingChild': ('distinctive_features', 'summary', 160),
+    'LocationUpdate': ('description', 'description_snippet', 100),
+}
+
+# Frozen copy of the search index layout as of this migration
+SEARCH_TABLE = 'missing_children_casesearch'
+SEARCH_COLUMNS = ['first_name', 'last_name', 'case_number', 'last_seen_location', 'distinctive_features']
+
+
+def safe_url(url):
+    match = SCHEME_RE.match(URL_NOISE_RE.sub('', url))
+    return match is None or match.group(1).lower() in ALLOWED_SCHEMES
+
+
+class Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        kept = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name == 'href' and not safe_url(value):
+                continue
+            kept.append(f' {name}="{escape(value)}"')
+        if tag == 'a':
+            kept.append(' rel="nofollow noopener"')
+        self.html.append(f'<{tag}{"".join(kept)}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping -= 1
+        elif tag in self.open_tags and tag == self.open_tags[-1]:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in self.open_tags:
+            return
+        while self.open_tags:
+            current = self.open_tags.pop()
+            self.html.append(f'</{current}>')
+            if current == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def result(self):
+        self.close()
+        self.html.extend(f'</{tag}>' for tag in reversed(self.open_tags))
+        return ''.join(self.html).strip(), ' '.join(''.join(self.text).split())
+
+
+def render(html):
+    if not html:
+        return '', ''
+    parser = Sanitizer()
+    parser.feed(html)
+    return parser.result()
+
+
+def prerender(apps, schema_editor):
+    for name, fields in FIELDS.items():
+        model = apps.get_model('missing_children', name)
+        updated = [f'{field}_{kind}' for field in fields for kind in ('html', 'text')]
+        if name in SNIPPETS:
+            updated.append(SNIPPETS[name][1])
+        batch = []
+        for row in model.objects.order_by('pk').only('pk', *fields).iterator(chunk_size=500):
+            rendered = {field: render(getattr(row, field)) for field in fields}
+            for field, (html, text) in rendered.items():
+                setattr(row, f'{field}_html', html)
+                setattr(row, f'{field}_text', text)
+            if name in SNIPPETS:
+                field, snippet_field, length = SNIPPETS[name]
+                setattr(row, snippet_field, Truncator(rendered[field][1]).chars(length))
+            batch.append(row)
+            if len(batch) >= 500:
+                model.objects.bulk_update(batch, updated)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, updated)
+
+
+def reindex_search(apps, schema_editor):
+    """Re-index cases from the plain-text column, which strips more than the 0003 index did"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    MissingChild = apps.get_model('missing_children', 'MissingChild')
+    rows = MissingChild.objects.order_by().values_list(
+        'pk', 'first_name', 'last_name', 'case_number', 'last_seen_location', 'distinctive_features_text',
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE}(child_id, {', '.join(SEARCH_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s)",
+            [(pk.hex, *fields) for pk, *fields in rows.iterator(chunk_size=1000)],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0019_geocode_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='abductorinformation',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='abductorinformation',
+            name='description_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='abductorinformation',
+            name='known_associates_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='abductorinformation',
+            name='known_associates_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='information_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='information_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='locationupdate',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='locationupdate',
+            name='description_snippet',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='locationupdate',
+            name='description_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='missingchild',
+            name='distinctive_features_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='missingchild',
+            name='distinctive_features_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='missingchild',
+            name='last_seen_wearing_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='missingchild',
+            name='last_seen_wearing_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(prerender, migrations.RunPython.noop),
+        migrations.RunPython(reindex_search, migrations.RunPython.noop),
+    ]
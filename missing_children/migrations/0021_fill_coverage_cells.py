@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:12
+
+import math
+from django.conf import settings
+from django.db import migrations
+
+MILES_PER_DEGREE_LAT = 69.0
+
+
+def cells_covering(lat, lng, radius_miles):
+    """Frozen copy of geo.cells_covering as of this migration"""
+    size = settings.GEO_CELL_SIZE_DEGREES
+    columns = int(math.ceil(360 / size))
+    radius_miles = min(radius_miles, settings.GEO_MAX_RADIUS_MILES)
+
+    dlat = radius_miles / MILES_PER_DEGREE_LAT
+    min_row = int(math.floor((max(lat - dlat, -90.0) + 90) / size))
+    max_row = int(math.floor((min(lat + dlat, 90.0) + 90) / size))
+
+    cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 89.9)))
+    dlng = radius_miles / (MILES_PER_DEGREE_LAT * cos_lat)
+    if dlng >= 180:
+        cols = range(columns)
+    else:
+        first = int(math.floor((lng - dlng + 180) / size))
+        last = int(math.floor((lng + dlng + 180) / size))
+        cols = sorted({c % columns for c in range(first, last + 1)})
+
+    return [row * columns + col for row in range(min_row, max_row + 1) for col in cols]
+
+
+def fill_coverage_cells(apps, schema_editor):
+    """Index subscriptions that have coordinates but were never written into the coverage cells"""
+    for name, cell_name in [('AlertSubscription', 'EmailCoverageCell'), ('SMSSubscription', 'SMSCoverageCell')]:
+        model = apps.get_model('missing_children', name)
+        cell_model = apps.get_model('missing_children', cell_name)
+        indexed = cell_model.objects.values('subscription_id')
+        unindexed = model.objects.filter(latitude__isnull=False, longitude__isnull=False).exclude(pk__in=indexed)
+        rows = unindexed.values_list('pk', 'latitude', 'longitude', 'radius_miles')
+        cell_model.objects.bulk_create(
+            (cell_model(subscription_id=pk, cell=cell) for pk, lat, lng, radius in rows.iterator(chunk_size=1000)
+             for cell in cells_covering(lat, lng, radius)),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0020_rich_text_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_coverage_cells, migrations.RunPython.noop),
+    ]
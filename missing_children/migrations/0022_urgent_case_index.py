@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0021_fill_coverage_cells'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='missingchild',
+            name='child_abducted_status_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='missingchild',
+            index=models.Index(condition=models.Q(('is_abducted', True)), fields=['status', '-reported_date'], name='child_urgent_date_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:40
+
+from django.db import migrations
+
+# Frozen copy of geo.UNPLACED_CELL as of this migration
+UNPLACED_CELL = -1
+
+
+def index_unplaced(apps, schema_editor):
+    """Register subscribers without coordinates under the unplaced cell, so alerts find them by index"""
+    for name, cell_name in [('AlertSubscription', 'EmailCoverageCell'), ('SMSSubscription', 'SMSCoverageCell')]:
+        model = apps.get_model('missing_children', name)
+        cell_model = apps.get_model('missing_children', cell_name)
+        unplaced = model.objects.filter(latitude__isnull=True) | model.objects.filter(longitude__isnull=True)
+        cell_model.objects.filter(subscription__in=unplaced).delete()
+        cell_model.objects.bulk_create(
+            (cell_model(subscription_id=pk, cell=UNPLACED_CELL)
+             for pk in unplaced.values_list('pk', flat=True).iterator(chunk_size=1000)),
+            batch_size=1000,
+        )
+
+
+def unindex_unplaced(apps, schema_editor):
+    for cell_name in ['EmailCoverageCell', 'SMSCoverageCell']:
+        apps.get_model('missing_children', cell_name).objects.filter(cell=UNPLACED_CELL).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0022_urgent_case_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_unplaced, unindex_unplaced),
+    ]
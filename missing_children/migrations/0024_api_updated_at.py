@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0023_unplaced_coverage_cells'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emergencycontact',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='locationupdate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
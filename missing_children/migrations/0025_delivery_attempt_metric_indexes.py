@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missing_children', '0024_api_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='deliveryattempt',
+            name='missing_chi_attempt_d5e0f5_idx',
+        ),
+        migrations.AddIndex(
+            model_name='deliveryattempt',
+            index=models.Index(fields=['attempted_at', 'channel'], name='missing_chi_attempt_3b027e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryattempt',
+            index=models.Index(fields=['child', 'kind', 'channel', 'latency_ms'], name='missing_chi_child_i_fa8e71_idx'),
+        ),
+    ]
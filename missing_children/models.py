@@ -1,8 +1,21 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from ckeditor.fields import RichTextField 
 import uuid
 
+class MissingChildQuerySet(models.QuerySet):
+    # What the list pages (cards) and the keyset paginator read
+    CARD_FIELDS = (
+        'id', 'case_number', 'first_name', 'last_name', 'age', 'gender', 'last_seen_date',
+        'last_seen_location', 'summary', 'photo', 'photo_variants', 'status', 'is_abducted',
+        'reported_date',
+    )
+
+    def cards(self):
+        """Load only the card fields, leaving the RichText blobs in the database"""
+        return self.only(*self.CARD_FIELDS)
+
 class MissingChild(models.Model):
     STATUS_CHOICES = [
         ('missing', 'Missing'),
@@ -28,17 +41,47 @@ class MissingChild(models.Model):
     hair_color = models.CharField(max_length=50, blank=True)
     last_seen_date = models.DateTimeField()
     last_seen_location = models.CharField(max_length=255)
+    last_seen_latitude = models.FloatField(null=True, blank=True)
+    last_seen_longitude = models.FloatField(null=True, blank=True)
     last_seen_wearing = RichTextField(blank=True)
     distinctive_features = RichTextField(blank=True)
+    # Sanitized HTML and plain text of the RichText fields, set on save (see richtext.py)
+    last_seen_wearing_html = models.TextField(blank=True, editable=False)
+    last_seen_wearing_text = models.TextField(blank=True, editable=False)
+    distinctive_features_html = models.TextField(blank=True, editable=False)
+    distinctive_features_text = models.TextField(blank=True, editable=False)
+    # Plain-text snippet of distinctive_features for list cards, set on save
+    summary = models.CharField(max_length=200, blank=True, editable=False)
     photo = models.ImageField(upload_to='missing_children/')
+    # Resized, EXIF-free renditions of `photo`, filled in by tasks.generate_photo_derivatives
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='missing')
     is_abducted = models.BooleanField(default=False)
     reported_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='reported_cases')
     reported_date = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = MissingChildQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-reported_date']
+        indexes = [
+            # home: urgent cases, WHERE is_abducted AND status = %s ORDER BY
+            # reported_date DESC. Boolean filters compile to a bare column test,
+            # which only a partial index with the same condition can serve; the
+            # status stays a key column because SQLite can't match a bound
+            # parameter against a literal in an index condition.
+            models.Index(
+                fields=['status', '-reported_date'], condition=models.Q(is_abducted=True),
+                name='child_urgent_date_idx',
+            ),
+            # case_list keyset pages over active cases
+            models.Index(fields=['status', 'reported_date', 'id']),
+            # search_cases browsing across every status
+            models.Index(fields=['reported_date', 'id']),
+            # API Last-Modified: latest updated_at
+            models.Index(fields=['updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.case_number}"
@@ -47,9 +90,14 @@ class AbductorInformation(models.Model):
     child = models.OneToOneField(MissingChild, on_delete=models.CASCADE, related_name='abductor')
     description = RichTextField()
     vehicle_description = models.CharField(max_length=255, blank=True)
-    vehicle_plate = models.CharField(max_length=50, blank=True)
+    vehicle_plate = models.CharField(max_length=50, blank=True, db_index=True)
     last_seen_direction = models.CharField(max_length=255, blank=True)
     known_associates = RichTextField(blank=True)
+    # Sanitized HTML and plain text of the RichText fields, set on save
+    description_html = models.TextField(blank=True, editable=False)
+    description_text = models.TextField(blank=True, editable=False)
+    known_associates_html = models.TextField(blank=True, editable=False)
+    known_associates_text = models.TextField(blank=True, editable=False)
     added_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -57,15 +105,32 @@ class AbductorInformation(models.Model):
 class LocationUpdate(models.Model):
     child = models.ForeignKey(MissingChild, on_delete=models.CASCADE, related_name='location_updates')
     location = models.CharField(max_length=255)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     sighting_time = models.DateTimeField()
     reported_by = models.CharField(max_length=100)
     contact_number = models.CharField(max_length=20, blank=True)
     description = RichTextField()
+    # Sanitized HTML, plain text and table snippet of description, set on save
+    description_html = models.TextField(blank=True, editable=False)
+    description_text = models.TextField(blank=True, editable=False)
+    description_snippet = models.CharField(max_length=100, blank=True, editable=False)
     verified = models.BooleanField(default=False)
     reported_at = models.DateTimeField(auto_now_add=True)
+    # API ETag and Last-Modified of a case's sightings
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-sighting_time']
+        indexes = [
+            # case_detail: verified sightings of one case, newest first
+            models.Index(
+                fields=['child', 'sighting_time'], condition=models.Q(verified=True),
+                name='sighting_verified_child_idx',
+            ),
+            # Admin changelist order
+            models.Index(fields=['sighting_time', 'id']),
+        ]
 
 class Lead(models.Model):
     STATUS_CHOICES = [
@@ -82,21 +147,58 @@ class Lead(models.Model):
     reporter_email = models.EmailField()
     reporter_phone = models.CharField(max_length=20)
     information = RichTextField()
+    # Sanitized HTML and plain text of information, set on save
+    information_html = models.TextField(blank=True, editable=False)
+    information_text = models.TextField(blank=True, editable=False)
     evidence_file = models.FileField(upload_to='leads/', blank=True, null=True)
+    # Filled in while the upload streams (see uploads.py) or by tasks.process_lead_evidence
+    evidence_sha256 = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    evidence_size = models.BigIntegerField(null=True, blank=True, editable=False)
+    evidence_content_type = models.CharField(max_length=100, blank=True, editable=False)
+    evidence_metadata = models.JSONField(default=dict, blank=True, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='new')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Admin changelist order, unfiltered and by status; exact reporter lookups
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['status', 'created_at', 'id']),
+            models.Index(fields=['reporter_email']),
+        ]
+
+DIGEST_FREQUENCY_CHOICES = [
+    ('none', 'No digest'),
+    ('daily', 'Daily digest'),
+    ('weekly', 'Weekly summary'),
+]
 
 class AlertSubscription(models.Model):
     email = models.EmailField(unique=True)
     location = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    radius_miles = models.IntegerField(default=10)
     subscribed = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     verification_token = models.CharField(max_length=100, blank=True)
     verified = models.BooleanField(default=False)
+    digest_frequency = models.CharField(max_length=10, choices=DIGEST_FREQUENCY_CHOICES, default='none')
+    # Coarse grid cell the digest is rendered for (see digests.py); null without a location
+    digest_region = models.IntegerField(null=True, blank=True, editable=False)
+    
+    class Meta:
+        indexes = [
+            # Alert recipients, walked in primary key order
+            models.Index(
+                fields=['id'], condition=models.Q(subscribed=True, verified=True),
+                name='alertsub_recipients_idx',
+            ),
+            models.Index(fields=['verification_token']),
+            models.Index(fields=['digest_frequency', 'digest_region', 'id'], name='alertsub_digest_idx'),
+        ]
 
 class EmergencyContact(models.Model):
     name = models.CharField(max_length=100)
@@ -107,6 +209,8 @@ class EmergencyContact(models.Model):
     region = models.CharField(max_length=100)
     order = models.IntegerField(default=0)
     active = models.BooleanField(default=True)
+    # API ETag and Last-Modified of the contact list
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order', 'name']
@@ -117,12 +221,246 @@ class SMSSubscription(models.Model):
     verification_code = models.CharField(max_length=6, blank=True)
     verification_sent_at = models.DateTimeField(null=True, blank=True)
     location = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     radius_miles = models.IntegerField(default=10)
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    digest_frequency = models.CharField(max_length=10, choices=DIGEST_FREQUENCY_CHOICES, default='none')
+    # Coarse grid cell the digest is rendered for (see digests.py); null without a location
+    digest_region = models.IntegerField(null=True, blank=True, editable=False)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['created_at'], condition=models.Q(verified=True, active=True),
+                name='smssub_recipients_idx',
+            ),
+            models.Index(fields=['digest_frequency', 'digest_region', 'id'], name='smssub_digest_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.phone_number} - {'Verified' if self.verified else 'Pending'}"
+
+class EmailCoverageCell(models.Model):
+    """Grid cell covered by an email subscriber's alert radius (see geo.py)"""
+    subscription = models.ForeignKey(AlertSubscription, on_delete=models.CASCADE, related_name='coverage_cells')
+    cell = models.BigIntegerField()
+    
+    class Meta:
+        indexes = [models.Index(fields=['cell', 'subscription'])]
+
+class SMSCoverageCell(models.Model):
+    """Grid cell covered by an SMS subscriber's alert radius (see geo.py)"""
+    subscription = models.ForeignKey(SMSSubscription, on_delete=models.CASCADE, related_name='coverage_cells')
+    cell = models.BigIntegerField()
+    
+    class Meta:
+        indexes = [models.Index(fields=['cell', 'subscription'])]
+
+class DuplicateKey(models.Model):
+    """Blocking key of a case for duplicate detection (see duplicates.py)"""
+    child = models.ForeignKey(MissingChild, on_delete=models.CASCADE, related_name='duplicate_keys')
+    key = models.CharField(max_length=100)
+    
+    class Meta:
+        indexes = [models.Index(fields=['key', 'child'])]
+
+class GeocodeCache(models.Model):
+    """Persistent tier of the geocoder cache (see geocoder.py); null coordinates record a miss"""
+    # Normalised location text and region, as built by geocoder.cache_key
+    key = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # Gazetteer entry the text resolved to, e.g. "Springfield, IL"
+    place = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.key} -> {self.place or 'not found'}"
+
+class ChangeEvent(models.Model):
+    """Append-only journal of case and sighting changes behind the replication feed (see changes.py)"""
+    KIND_CHOICES = [
+        ('case', 'Case'),
+        ('sighting', 'Sighting'),
+    ]
+    
+    ACTION_CHOICES = [
+        ('upsert', 'Created or updated'),
+        ('status', 'Status changed'),
+        ('delete', 'Deleted or closed'),
+    ]
+    
+    # The primary key is the feed's sequence number
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.CharField(max_length=36)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField()
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['changed_at'])]
+
+class AlertOutbox(models.Model):
+    """Request to alert subscribers about a case, written in the same transaction as the case (see outbox.py)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('expanded', 'Recipients listed'),
+    ]
+    
+    child = models.ForeignKey(MissingChild, on_delete=models.CASCADE, related_name='alert_outbox')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expanded_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'id'])]
+
+class AlertDelivery(models.Model):
+    """Delivery ledger: one row per case, channel and recipient"""
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    child = models.ForeignKey(MissingChild, on_delete=models.CASCADE, related_name='alert_deliveries')
+    channel = models.CharField(max_length=5, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    claim_token = models.UUIDField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    provider_id = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['child', 'channel', 'recipient'], name='alertdelivery_unique_recipient'),
+        ]
+        indexes = [
+            # Drainers claim due rows per channel; the reaper finds stale claims
+            models.Index(fields=['channel', 'status', 'next_attempt_at']),
+            models.Index(fields=['status', 'claimed_at']),
+        ]
+
+class DeliveryAttempt(models.Model):
+    """One provider send, kept for delivery metrics (see metrics.py)"""
+    KIND_CHOICES = [
+        ('alert', 'Alert'),
+        ('digest', 'Digest'),
+    ]
+    
+    kind = models.CharField(max_length=6, choices=KIND_CHOICES, default='alert')
+    channel = models.CharField(max_length=5, choices=AlertDelivery.CHANNEL_CHOICES)
+    # Set for case alerts; digests cover many cases
+    child = models.ForeignKey(MissingChild, on_delete=models.CASCADE, null=True, blank=True, related_name='delivery_attempts')
+    delivery = models.ForeignKey(AlertDelivery, on_delete=models.SET_NULL, null=True, blank=True, related_name='provider_attempts')
+    success = models.BooleanField()
+    latency_ms = models.PositiveIntegerField(null=True, blank=True)
+    throttled = models.PositiveSmallIntegerField(default=0)
+    provider_id = models.CharField(max_length=64, blank=True)
+    error = models.CharField(max_length=200, blank=True)
+    attempted_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-attempted_at']
+        indexes = [
+            # Per-minute metrics scan a time range; per-alert metrics one case.
+            # The latency columns let the percentile windows read rows in order
+            models.Index(fields=['attempted_at', 'channel']),
+            models.Index(fields=['child', 'attempted_at']),
+            models.Index(fields=['child', 'kind', 'channel', 'latency_ms']),
+        ]
+
+class CaseNumberSequence(models.Model):
+    """Next free counter of one case number scope (see case_numbers.py)"""
+    scope = models.CharField(max_length=40, unique=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+    
+    def __str__(self):
+        return f"{self.scope}: {self.next_value}"
+
+class SightingCluster(models.Model):
+    """Verified sightings of one case in one area and time window (see clusters.py)"""
+    child = models.ForeignKey(MissingChild, on_delete=models.CASCADE, related_name='sighting_clusters')
+    # 'cell:<n>' for sightings with coordinates, 'place:<name>' for the rest
+    area = models.CharField(max_length=100)
+    window_start = models.DateTimeField()
+    # Location text of the latest sighting in the cluster
+    location = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    located = models.PositiveIntegerField(default=0)
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+    
+    class Meta:
+        ordering = ['-last_seen']
+        constraints = [
+            models.UniqueConstraint(fields=['child', 'area', 'window_start'], name='sightingcluster_unique_key'),
+        ]
+        indexes = [models.Index(fields=['child', 'last_seen'])]
+    
+    @property
+    def centroid(self):
+        """Mean position of the sightings that had coordinates, or None"""
+        if not self.located:
+            return None
+        return (self.latitude_sum / self.located, self.longitude_sum / self.located)
+    
+    def __str__(self):
+        return f"{self.location} ({self.count})"
+
+class PhotoHash(models.Model):
+    """Perceptual hashes of a case photo or lead image (see photo_hashes.py)"""
+    SOURCE_CHOICES = [
+        ('case', 'Case photo'),
+        ('lead', 'Lead evidence'),
+    ]
+    
+    source = models.CharField(max_length=4, choices=SOURCE_CHOICES)
+    # The case the photo belongs to; for lead evidence, the lead's case
+    child = models.ForeignKey(MissingChild, on_delete=models.CASCADE, related_name='photo_hashes')
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, null=True, blank=True, related_name='photo_hashes')
+    # Storage name of the file that was hashed
+    file = models.CharField(max_length=255)
+    # Unsigned 64-bit hashes stored as signed BIGINTs
+    phash = models.BigIntegerField()
+    dhash = models.BigIntegerField()
+    # 16-bit slices of phash, for multi-index lookups
+    band0 = models.PositiveIntegerField()
+    band1 = models.PositiveIntegerField()
+    band2 = models.PositiveIntegerField()
+    band3 = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['child'], condition=models.Q(source='case'), name='photohash_unique_case'),
+            models.UniqueConstraint(fields=['lead'], condition=models.Q(source='lead'), name='photohash_unique_lead'),
+        ]
+        indexes = [
+            models.Index(fields=['band0']),
+            models.Index(fields=['band1']),
+            models.Index(fields=['band2']),
+            models.Index(fields=['band3']),
+        ]
     
     def __str__(self):
-        return f"{self.phone_number} - {'Verified' if self.verified else 'Pending'}"
\ No newline at end of file
+        return f"{self.get_source_display()}: {self.file}"
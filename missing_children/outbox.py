@@ -0,0 +1,149 @@
+"""
+Transactional outbox and delivery ledger for subscriber alerts.
+
+record_case_alert() writes an AlertOutbox row inside the caller's
+transaction, so an alert request exists exactly when its case does. The
+relay (tasks.relay_alert_outbox, also run on a beat schedule) expands each
+pending request into AlertDelivery rows, one per (case, channel, recipient).
+The unique constraint on those three columns makes a repeated expansion a
+no-op.
+
+Drainers (tasks.drain_alert_deliveries) claim due rows in batches with a
+conditional UPDATE, send them and record each outcome. Failed sends are
+retried with exponential backoff, up to ALERT_MAX_ATTEMPTS. Claims left behind
+by a crashed drainer expire after ALERT_CLAIM_TIMEOUT_SECONDS and are sent
+again. Only messages in flight at the moment of the crash can go out twice:
+SMS outcomes are recorded one by one as the provider answers, email outcomes
+once per SMTP batch.
+"""
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import AlertOutbox, AlertDelivery, AlertSubscription, SMSSubscription
+from . import geo
+
+
+def record_case_alert(child):
+    """Queue alerts for `child` as part of the current transaction"""
+    entry = AlertOutbox.objects.create(child=child)
+
+    def relay():
+        from .tasks import enqueue, relay_alert_outbox
+
+        enqueue(relay_alert_outbox)
+
+    transaction.on_commit(relay)
+    return entry
+
+
+def channel_subscribers(channel):
+    """(subscribers alerted on `channel`, the field holding their address)"""
+    if channel == 'email':
+        return AlertSubscription.objects.filter(subscribed=True, verified=True), 'email'
+    return SMSSubscription.objects.filter(verified=True, active=True), 'phone_number'
+
+
+def values_after(queryset, field, last_pk, chunk_size):
+    """The next chunk of (pk, `field`) rows of `queryset` after `last_pk`"""
+    queryset = queryset.order_by('pk').values_list('pk', field)
+    if last_pk is not None:
+        queryset = queryset.filter(pk__gt=last_pk)
+    return queryset[:chunk_size]
+
+
+def iter_values(queryset, field, chunk_size):
+    """Stream one column of `queryset` in primary key chunks without loading the whole table"""
+    last_pk = None
+    while True:
+        chunk = list(values_after(queryset, field, last_pk, chunk_size))
+        if not chunk:
+            return
+        yield [value for _, value in chunk]
+        last_pk = chunk[-1][0]
+
+
+def recipient_chunks(child, chunk_size):
+    """
+    (channel, recipients) chunks: subscribers covering the last-seen point, or everyone.
+
+    Subscribers without a location get every alert, as they did before radius
+    targeting.
+    """
+    located = child.last_seen_latitude is not None and child.last_seen_longitude is not None
+    for channel in ('email', 'sms'):
+        subscribers, field = channel_subscribers(channel)
+        if located:
+            recipients = geo.subscribers_covering(
+                subscribers, child.last_seen_latitude, child.last_seen_longitude, field=field,
+            )
+            for i in range(0, len(recipients), chunk_size):
+                yield channel, recipients[i:i + chunk_size]
+            subscribers = geo.unplaced(subscribers)
+        for chunk in iter_values(subscribers, field, chunk_size):
+            yield channel, chunk
+
+
+def expand(entry, chunk_size=1000):
+    """Write the ledger rows for one outbox entry; returns recipients per channel"""
+    now = timezone.now()
+    counts = {'email': 0, 'sms': 0}
+    for channel, recipients in recipient_chunks(entry.child, chunk_size):
+        AlertDelivery.objects.bulk_create([
+            AlertDelivery(child_id=entry.child_id, channel=channel, recipient=r, next_attempt_at=now)
+            for r in recipients
+        ], ignore_conflicts=True)
+        counts[channel] += len(recipients)
+    AlertOutbox.objects.filter(pk=entry.pk).update(status='expanded', expanded_at=now)
+    return counts
+
+
+def release_stale_claims():
+    """Return rows claimed by a drainer that never reported back to the queue"""
+    cutoff = timezone.now() - timedelta(seconds=settings.ALERT_CLAIM_TIMEOUT_SECONDS)
+    return AlertDelivery.objects.filter(status='sending', claimed_at__lt=cutoff).update(
+        status='pending', claim_token=None,
+    )
+
+
+def due(channel):
+    return AlertDelivery.objects.filter(
+        channel=channel, status='pending', next_attempt_at__lte=timezone.now(),
+    ).order_by('next_attempt_at')
+
+
+def claim(channel, limit):
+    """
+    Take up to `limit` due deliveries for this worker.
+
+    The UPDATE only matches rows that are still pending, so two drainers
+    racing for the same rows each get a disjoint share.
+    """
+    ids = list(due(channel).values_list('pk', flat=True)[:limit])
+    if not ids:
+        return []
+    token = uuid.uuid4()
+    AlertDelivery.objects.filter(pk__in=ids, status='pending').update(
+        status='sending', claim_token=token, claimed_at=timezone.now(), attempts=F('attempts') + 1,
+    )
+    return list(AlertDelivery.objects.filter(pk__in=ids, claim_token=token).order_by('pk'))
+
+
+def mark_sent(ids, provider_id=''):
+    return AlertDelivery.objects.filter(pk__in=ids, status='sending').update(
+        status='sent', sent_at=timezone.now(), provider_id=provider_id, error='', claim_token=None,
+    )
+
+
+def mark_failed(delivery, error):
+    """Schedule a retry with backoff, or give up after ALERT_MAX_ATTEMPTS"""
+    if delivery.attempts >= settings.ALERT_MAX_ATTEMPTS:
+        updates = {'status': 'failed'}
+    else:
+        delay = settings.ALERT_RETRY_DELAY_SECONDS * 2 ** (delivery.attempts - 1)
+        updates = {'status': 'pending', 'next_attempt_at': timezone.now() + timedelta(seconds=delay)}
+    return AlertDelivery.objects.filter(pk=delivery.pk, status='sending').update(
+        error=error[:1000], claim_token=None, **updates,
+    )
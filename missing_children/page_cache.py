@@ -0,0 +1,110 @@
+"""
+Whole-response cache for the public pages, invalidated by model signals.
+
+Every cached page depends on one or more groups ('cases', 'case:<id>',
+'contacts'). Each group has a version number stored in the cache, and the
+versions are part of the page key. Bumping a group's version makes every page
+built from it unreachable at once. This works with any cache backend, because
+no key-pattern deletes are needed.
+
+Versions are bumped when a write happens and again when its transaction
+commits. Without the second bump, a request served in between would cache the
+old rows under the new version until PAGE_CACHE_TIMEOUT.
+
+The versions must be visible to every process that writes or serves pages,
+so production needs a shared cache backend (see checks.py).
+"""
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.db import transaction
+
+CASES = 'cases'
+CONTACTS = 'contacts'
+
+# Cached headline count on the case list; deleted alongside the CASES group
+ACTIVE_CASE_COUNT_KEY = 'active_case_count'
+
+
+def case_group(child_id):
+    return f'case:{child_id}'
+
+
+def _cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def _version_key(group):
+    return f'pagecache:v:{group}'
+
+
+def versions(groups):
+    cache = _cache()
+    keys = [_version_key(g) for g in groups]
+    found = cache.get_many(keys)
+    missing = {k: int(time.time() * 1000) for k in keys if k not in found}
+    if missing:
+        # A fresh clock-based version can never collide with one that was evicted
+        for key, value in missing.items():
+            cache.add(key, value, None)
+        found.update(cache.get_many(list(missing)))
+    return [found.get(k, missing.get(k)) for k in keys]
+
+
+def _bump(groups):
+    cache = _cache()
+    for group in groups:
+        key = _version_key(group)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), None)
+
+
+def invalidate(*groups):
+    """Bump the groups' versions now and once the current transaction commits"""
+    _bump(groups)
+    transaction.on_commit(lambda: _bump(groups))
+
+
+def page_key(view_name, request, groups):
+    url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    version = '.'.join(f'{g}={v}' for g, v in zip(groups, versions(groups)))
+    return f'pagecache:{view_name}:{request.method}:{url}:{version}'
+
+
+def _cacheable(request):
+    return request.method in ('GET', 'HEAD') and not len(get_messages(request))
+
+
+def cached_page(view_name, groups):
+    """
+    Serve `view_name` from the page cache.
+
+    `groups(request, *args, **kwargs)` lists the invalidation groups the page
+    depends on. Only anonymous-safe responses are stored: 200 responses to GET
+    requests with no flash messages pending.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.PAGE_CACHE_ENABLED or not _cacheable(request):
+                return view(request, *args, **kwargs)
+
+            cache = _cache()
+            key = page_key(view_name, request, groups(request, *args, **kwargs))
+            response = cache.get(key)
+            if response is not None:
+                response['X-Page-Cache'] = 'hit'
+                return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                response['X-Page-Cache'] = 'miss'
+                cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,220 @@
+import base64
+import json
+import uuid
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+def encode_cursor(payload):
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Payload dict of an opaque cursor token, or None if it is missing or malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+class CursorPage:
+    """One page of results plus opaque tokens for the neighbouring pages"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def count(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Newest-first pagination on (reported_date, id) without COUNT or OFFSET.
+
+    Each page is a range scan that starts just past the last row of the
+    previous page, so page N costs the same as page 1.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def _key(self, obj, direction):
+        return encode_cursor({'d': obj.reported_date.isoformat(), 'i': obj.pk.hex, 'r': direction})
+
+    def _parse(self, payload):
+        """(reported_date, pk) of a cursor payload, or (None, None) unless both are valid"""
+        date, pk = payload.get('d'), payload.get('i')
+        if not isinstance(date, str) or not isinstance(pk, str):
+            return None, None
+        try:
+            return parse_datetime(date), uuid.UUID(pk)
+        except (TypeError, ValueError, AttributeError):
+            return None, None
+
+    def get_page(self, cursor=None):
+        payload = decode_cursor(cursor) or {}
+        reported_date, pk = self._parse(payload)
+        if reported_date is None or pk is None:
+            return self._first_page()
+
+        if payload.get('r') == 'prev':
+            rows = list(self.queryset.filter(
+                Q(reported_date__gt=reported_date) |
+                Q(reported_date=reported_date, pk__gt=pk)
+            ).order_by('reported_date', 'pk')[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            if not rows:
+                return self._first_page()
+            return CursorPage(
+                rows,
+                next_cursor=self._key(rows[-1], 'next'),
+                previous_cursor=self._key(rows[0], 'prev') if has_more else None,
+            )
+
+        rows = list(self.queryset.filter(
+            Q(reported_date__lt=reported_date) |
+            Q(reported_date=reported_date, pk__lt=pk)
+        ).order_by('-reported_date', '-pk')[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows,
+            next_cursor=self._key(rows[-1], 'next') if has_more else None,
+            previous_cursor=self._key(rows[0], 'prev') if rows else None,
+        )
+
+    def _first_page(self):
+        rows = list(self.queryset.order_by('-reported_date', '-pk')[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(rows, next_cursor=self._key(rows[-1], 'next') if has_more else None)
+
+
+class RankedPaginator:
+    """
+    Pagination for relevance-ranked search results.
+
+    Rank order cannot be expressed as a keyset, so the result set is capped
+    at `limit` best matches and pages step through that bounded window.
+    """
+
+    def __init__(self, queryset, per_page, limit):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.limit = limit
+
+    def get_page(self, cursor=None):
+        payload = decode_cursor(cursor) or {}
+        offset = payload.get('o', 0)
+        if not isinstance(offset, int) or offset < 0 or offset >= self.limit:
+            offset = 0
+        end = min(offset + self.per_page, self.limit)
+        rows = list(self.queryset[offset:end + 1])
+        has_more = len(rows) > end - offset and end < self.limit
+        rows = rows[:end - offset]
+        return CursorPage(
+            rows,
+            next_cursor=encode_cursor({'o': end}) if has_more else None,
+            previous_cursor=encode_cursor({'o': max(offset - self.per_page, 0)}) if offset else None,
+        )
+
+
+class PrimaryKeyPaginator:
+    """
+    Oldest-first pagination on the primary key, for append-mostly tables
+    such as sightings. The cursor holds the last primary key returned.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, cursor=None):
+        payload = decode_cursor(cursor) or {}
+        queryset = self.queryset.order_by('pk')
+        try:
+            after = self.queryset.model._meta.pk.to_python(payload.get('a'))
+        except ValidationError:
+            after = None
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(rows, next_cursor=encode_cursor({'a': rows[-1].pk}) if has_more else None)
+
+
+def estimated_rows(model):
+    """Planner's row estimate for a model's table, or None if the database has none"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            # Filled in by ANALYZE; the first number of `stat` is the table's row count
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for very large admin changelists.
+
+    Every list runs a COUNT over at most ADMIN_EXACT_COUNT_LIMIT + 1 rows, so
+    the count is exact up to the limit. Past it, only an unfiltered list
+    reports an estimate (the planner's table statistics); a filtered list
+    reports limit + 1, which the changelist shows as a lower bound.
+    """
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        queryset = self.object_list
+        bounded = queryset.order_by()[:limit + 1].count()
+        if bounded <= limit:
+            return bounded
+        if not queryset.query.where:
+            return max(estimated_rows(queryset.model) or 0, bounded)
+        return bounded
@@ -0,0 +1,201 @@
+"""
+Perceptual hashes of case photos and lead images, for look-alike matching.
+
+Each image gets two 64-bit hashes, both computed with Pillow alone:
+
+- pHash: the signs of the low-frequency DCT coefficients of a 32x32
+  greyscale copy, against their median. It survives resizing,
+  recompression and small edits, so it is the hash matches are found by.
+- dHash: whether each pixel of a 9x8 greyscale copy is darker than its
+  right neighbour. It is shown beside the pHash distance as a second opinion.
+
+Near neighbours are found by multi-index hashing. The pHash is split into
+four 16-bit bands, each stored in its own indexed column. Two hashes within
+Hamming distance d agree to within d // 4 bits on at least one band, so a
+search looks up, per band, the few band values that close to the query's.
+Each of those lookups uses an index. Only the candidates they return are
+compared in full, so a search reads a small fraction of the table however
+many photos it holds.
+"""
+import math
+from itertools import combinations
+from django.conf import settings
+from django.db.models import Q
+from PIL import Image
+from .models import MissingChild, Lead, PhotoHash
+from . import imaging
+
+BANDS = 4
+BAND_BITS = 16
+BAND_MASK = (1 << BAND_BITS) - 1
+
+DCT_SIZE = 32
+HASH_SIDE = 8
+
+# cos((2x + 1) * u * pi / 2N) for the low frequencies the pHash keeps
+_COSINES = [
+    [math.cos((2 * x + 1) * u * math.pi / (2 * DCT_SIZE)) for x in range(DCT_SIZE)]
+    for u in range(HASH_SIDE)
+]
+
+
+def _bits(flags):
+    value = 0
+    for flag in flags:
+        value = (value << 1) | int(flag)
+    return value
+
+
+def dhash(image):
+    small = image.convert('L').resize((HASH_SIDE + 1, HASH_SIDE), Image.LANCZOS)
+    pixels = list(small.getdata())
+    width = HASH_SIDE + 1
+    return _bits(
+        pixels[row * width + col] < pixels[row * width + col + 1]
+        for row in range(HASH_SIDE) for col in range(HASH_SIDE)
+    )
+
+
+def phash(image):
+    small = image.convert('L').resize((DCT_SIZE, DCT_SIZE), Image.LANCZOS)
+    pixels = list(small.getdata())
+    rows = [pixels[y * DCT_SIZE:(y + 1) * DCT_SIZE] for y in range(DCT_SIZE)]
+    # Separable 2-D DCT, computed only for the top-left 8x8 coefficients
+    by_row = [[sum(c * p for c, p in zip(cosines, row)) for cosines in _COSINES] for row in rows]
+    coefficients = [
+        sum(cosines[y] * by_row[y][u] for y in range(DCT_SIZE))
+        for cosines in _COSINES for u in range(HASH_SIDE)
+    ]
+    # The DC term is the mean brightness; leave it out of the median
+    median = sorted(coefficients[1:])[len(coefficients) // 2 - 1]
+    return _bits(c > median for c in coefficients)
+
+
+def hashes(fileobj):
+    """(phash, dhash) of an image file, after EXIF rotation"""
+    image = imaging.load_normalized(fileobj)
+    return phash(image), dhash(image)
+
+
+def hash_file(name, storage):
+    with storage.open(name, 'rb') as f:
+        return hashes(f)
+
+
+def to_signed(value):
+    """64-bit hash as stored in a signed BIGINT column"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def bands(value):
+    """The BANDS 16-bit slices of a hash, most significant first"""
+    value = to_unsigned(value)
+    return [(value >> (BAND_BITS * (BANDS - 1 - i))) & BAND_MASK for i in range(BANDS)]
+
+
+def distance(a, b):
+    return (to_unsigned(a) ^ to_unsigned(b)).bit_count()
+
+
+def nearby(band, radius):
+    """Every band value within `radius` bits of `band`"""
+    values = [band]
+    for flips in range(1, radius + 1):
+        for positions in combinations(range(BAND_BITS), flips):
+            mask = 0
+            for position in positions:
+                mask |= 1 << position
+            values.append(band ^ mask)
+    return values
+
+
+def hash_fields(phash_value, dhash_value):
+    """PhotoHash field values for a pair of unsigned hashes"""
+    fields = {'phash': to_signed(phash_value), 'dhash': to_signed(dhash_value)}
+    for i, band in enumerate(bands(phash_value)):
+        fields[f'band{i}'] = band
+    return fields
+
+
+def candidates(phash_value, max_distance):
+    """PhotoHash rows sharing a band with `phash_value` closely enough to be within `max_distance`"""
+    radius = max_distance // BANDS
+    condition = Q()
+    for i, band in enumerate(bands(phash_value)):
+        condition |= Q(**{f'band{i}__in': nearby(band, radius)})
+    return PhotoHash.objects.filter(condition)
+
+
+def matches(phash_value, dhash_value=None, max_distance=None, limit=None, exclude_child=None):
+    """
+    [(phash distance, dhash distance, PhotoHash)] closest first.
+
+    Exact: every indexed photo within `max_distance` of the pHash is returned
+    (subject to `limit`). The dHash distance is None without `dhash_value`.
+    """
+    if max_distance is None:
+        max_distance = settings.PHOTO_MATCH_MAX_DISTANCE
+    rows = candidates(phash_value, max_distance)
+    if exclude_child is not None:
+        rows = rows.exclude(child_id=exclude_child)
+    # Compare the bare hashes first; only the matches are loaded as objects
+    close = []
+    for pk, row_phash, row_dhash in rows.values_list('pk', 'phash', 'dhash').iterator(chunk_size=2000):
+        apart = distance(phash_value, row_phash)
+        if apart <= max_distance:
+            second = None if dhash_value is None else distance(dhash_value, row_dhash)
+            close.append((apart, second or 0, pk, second))
+    close.sort()
+    if limit:
+        close = close[:limit]
+    loaded = PhotoHash.objects.select_related('child').in_bulk([pk for _, _, pk, _ in close])
+    return [(apart, second, loaded[pk]) for apart, _, pk, second in close]
+
+
+def look_alikes(photo_hash, limit=None):
+    """Indexed photos of other cases that resemble `photo_hash`"""
+    return matches(
+        photo_hash.phash, photo_hash.dhash, limit=limit or settings.PHOTO_MATCH_LIMIT,
+        exclude_child=photo_hash.child_id,
+    )
+
+
+def store(source, child_id, name, phash_value, dhash_value, lead_id=None):
+    """Create or replace the PhotoHash of one case photo or lead image"""
+    key = {'source': source, 'child_id': child_id}
+    if source == 'lead':
+        key = {'source': source, 'lead_id': lead_id}
+    photo_hash, _ = PhotoHash.objects.update_or_create(
+        **key, defaults={'child_id': child_id, 'file': name, **hash_fields(phash_value, dhash_value)},
+    )
+    return photo_hash
+
+
+def index_child(child_id):
+    """Hash a case photo if it is new or changed; returns the PhotoHash or None"""
+    child = MissingChild.objects.only('pk', 'photo').get(pk=child_id)
+    if not child.photo:
+        PhotoHash.objects.filter(source='case', child_id=child.pk).delete()
+        return None
+    current = PhotoHash.objects.filter(source='case', child_id=child.pk, file=child.photo.name).first()
+    if current:
+        return current
+    values = hash_file(child.photo.name, child.photo.storage)
+    return store('case', child.pk, child.photo.name, *values)
+
+
+def index_lead(lead_id):
+    """Hash a lead's evidence if it is a decodable image; returns the PhotoHash or None"""
+    lead = Lead.objects.only('pk', 'child_id', 'evidence_file', 'evidence_content_type').get(pk=lead_id)
+    if not lead.evidence_file or not lead.evidence_content_type.startswith('image/') \
+            or lead.evidence_content_type == 'image/heic':
+        return None
+    current = PhotoHash.objects.filter(source='lead', lead_id=lead.pk, file=lead.evidence_file.name).first()
+    if current:
+        return current
+    values = hash_file(lead.evidence_file.name, lead.evidence_file.storage)
+    return store('lead', lead.child_id, lead.evidence_file.name, *values, lead_id=lead.pk)
@@ -0,0 +1,234 @@
+"""
+EXPLAIN checks for the querysets on the hot paths.
+
+Each registered entry builds a queryset shaped like the one a view or task
+runs, with sample parameters. `check()` asks the database for its plan and
+reports every table it would read in full. Run it with
+`manage.py check_query_plans`; the test suite runs it as well, so a view
+change that drops an index fails the tests.
+"""
+import re
+import uuid
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, IntegerField, Max, Q, Value
+from django.utils import timezone
+from .models import MissingChild, LocationUpdate, AlertSubscription, SMSSubscription, ChangeEvent, AlertDelivery, DeliveryAttempt, DuplicateKey
+from . import digests, clusters, photo_hashes, duplicates, geo, outbox, metrics
+
+HOT_QUERIES = {}
+
+# SQLite: "SCAN missing_children_lead" with no index; PostgreSQL: "Seq Scan on ...".
+# "SCAN ... USING INDEX" is an ordered or partial-index walk and is accepted.
+_SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(?!.*\b(?:USING|VIRTUAL TABLE)\b)')
+_POSTGRES_SCAN = re.compile(r'\bSeq Scan on (\w+)')
+
+
+def hot_query(name, allow_scan=()):
+    """Register a queryset factory; `allow_scan` lists tables that may be scanned (e.g. tiny lookup tables)"""
+    def register(build):
+        HOT_QUERIES[name] = (build, set(allow_scan))
+        return build
+    return register
+
+
+def _sample_cursor():
+    return timezone.now(), uuid.uuid4()
+
+
+@hot_query('home.urgent_cases')
+def urgent_cases():
+    return MissingChild.objects.filter(status='missing', is_abducted=True).order_by('-reported_date')[:5]
+
+
+@hot_query('home.recent_cases')
+def recent_cases():
+    return MissingChild.objects.filter(status='missing').order_by('-reported_date')[:10]
+
+
+@hot_query('case_list.first_page')
+def case_list_first_page():
+    return MissingChild.objects.filter(status='missing').order_by('-reported_date', '-pk')[:21]
+
+
+@hot_query('case_list.next_page')
+def case_list_next_page():
+    reported_date, pk = _sample_cursor()
+    return MissingChild.objects.filter(status='missing').filter(
+        Q(reported_date__lt=reported_date) | Q(reported_date=reported_date, pk__lt=pk)
+    ).order_by('-reported_date', '-pk')[:21]
+
+
+@hot_query('case_list.active_count')
+def active_case_count():
+    return MissingChild.objects.filter(status='missing').order_by().values('pk')
+
+
+@hot_query('search_cases.browse')
+def search_browse():
+    return MissingChild.objects.order_by('-reported_date', '-pk')[:25]
+
+
+def _state(queryset):
+    """The SQL of api.latest_and_count: an aggregate over the whole queryset, with no GROUP BY"""
+    return queryset.order_by().annotate(all=Value(1, IntegerField())).values('all').annotate(
+        latest=Max('updated_at'), count=Count('*'),
+    ).values('latest', 'count')
+
+
+@hot_query('api.cases_state')
+def api_cases_state():
+    return _state(MissingChild.objects.all())
+
+
+@hot_query('api.sightings_state')
+def api_sightings_state():
+    return _state(LocationUpdate.objects.filter(child_id=uuid.uuid4(), verified=True))
+
+
+@hot_query('api.change_feed')
+def change_feed():
+    return ChangeEvent.objects.filter(id__gt=1000).order_by('id')[:101]
+
+
+@hot_query('case_detail.sightings')
+def case_detail_sightings():
+    return LocationUpdate.objects.filter(child_id=uuid.uuid4(), verified=True).order_by('-sighting_time')
+
+
+@hot_query('verify_email.token')
+def verify_email_token():
+    return AlertSubscription.objects.filter(verification_token=str(uuid.uuid4()))
+
+
+# The queries outbox.recipient_chunks runs: everyone for a case without a
+# position; otherwise the subscribers in its cell, then those without a location
+@hot_query('alerts.email_recipients')
+def email_recipients():
+    subscribers, field = outbox.channel_subscribers('email')
+    return outbox.values_after(subscribers, field, 1000, 500)
+
+
+@hot_query('alerts.email_covering')
+def email_covering():
+    subscribers, field = outbox.channel_subscribers('email')
+    return geo.candidates(subscribers, 39.78, -89.65, field)
+
+
+@hot_query('alerts.email_unplaced')
+def email_unplaced():
+    subscribers, field = outbox.channel_subscribers('email')
+    return outbox.values_after(geo.unplaced(subscribers), field, 1000, 500)
+
+
+@hot_query('alerts.sms_recipients')
+def sms_recipients():
+    subscribers, field = outbox.channel_subscribers('sms')
+    return outbox.values_after(subscribers, field, 1000, 500)
+
+
+@hot_query('alerts.sms_covering')
+def sms_covering():
+    subscribers, field = outbox.channel_subscribers('sms')
+    return geo.candidates(subscribers, 39.78, -89.65, field)
+
+
+@hot_query('alerts.sms_unplaced')
+def sms_unplaced():
+    subscribers, field = outbox.channel_subscribers('sms')
+    return outbox.values_after(geo.unplaced(subscribers), field, 1000, 500)
+
+
+@hot_query('alerts.claim_due_deliveries')
+def claim_due_deliveries():
+    return AlertDelivery.objects.filter(
+        channel='sms', status='pending', next_attempt_at__lte=timezone.now(),
+    ).order_by('next_attempt_at').values_list('pk', flat=True)[:200]
+
+
+@hot_query('alerts.stale_claims')
+def stale_claims():
+    return AlertDelivery.objects.filter(status='sending', claimed_at__lt=timezone.now())
+
+
+@hot_query('digests.new_cases')
+def digest_new_cases():
+    return MissingChild.objects.filter(
+        status='missing', reported_date__gte=timezone.now(), reported_date__lt=timezone.now(),
+    ).order_by('-reported_date')
+
+
+@hot_query('digests.email_regions')
+def digest_email_regions():
+    return digests.subscribers('email', 'daily').order_by().values_list('digest_region', flat=True).distinct()
+
+
+@hot_query('digests.sms_recipients')
+def digest_sms_recipients():
+    return digests.subscribers('sms', 'daily').filter(digest_region=0).order_by('pk').values_list(
+        'pk', 'phone_number',
+    )[:200]
+
+
+@hot_query('metrics.per_minute')
+def metrics_per_minute():
+    return DeliveryAttempt.objects.filter(attempted_at__gte=timezone.now(), attempted_at__lt=timezone.now())
+
+
+@hot_query('metrics.alert')
+def metrics_alert():
+    return DeliveryAttempt.objects.filter(child_id=uuid.uuid4(), kind='alert').order_by().values('channel').annotate(
+        sent=Count('pk'),
+    )
+
+
+# Django cannot EXPLAIN a query filtered on a window function, so these check
+# the windowed pass percentile_rows() filters; the filter adds no table reads.
+@hot_query('metrics.per_minute_percentiles')
+def metrics_per_minute_percentiles():
+    return metrics.ranked_latencies(metrics_per_minute(), ['channel'])
+
+
+@hot_query('metrics.alert_percentiles')
+def metrics_alert_percentiles():
+    return metrics.ranked_latencies(DeliveryAttempt.objects.filter(child_id=uuid.uuid4(), kind='alert'), ['channel'])
+
+
+@hot_query('clusters.for_case')
+def clusters_for_case():
+    return clusters.for_case(uuid.uuid4(), 11)
+
+
+@hot_query('clusters.window_sightings')
+def clusters_window_sightings():
+    window = clusters.window_for(timezone.now())
+    return LocationUpdate.objects.filter(child_id=uuid.uuid4(), verified=True, sighting_time__gte=window)
+
+
+@hot_query('photo_hashes.candidates')
+def photo_hash_candidates():
+    return photo_hashes.candidates(0x8F3A_51C2_0D7E_B964, settings.PHOTO_MATCH_MAX_DISTANCE)
+
+
+@hot_query('duplicates.candidates')
+def duplicate_candidates():
+    keys = duplicates.keys_for('Anna', 'Smith', 9, 'F', 'Springfield Park', 39.78, -89.65, ages=[8, 9, 10])
+    ranked = DuplicateKey.objects.filter(key__in=keys).values('child_id').annotate(matches=Count('id'))
+    return ranked.order_by('-matches', 'child_id')[:200]
+
+
+def full_scans(plan):
+    """Table names the plan reads in full"""
+    pattern = _POSTGRES_SCAN if connection.vendor == 'postgresql' else _SQLITE_SCAN
+    return sorted({match.group(1) for match in pattern.finditer(plan)})
+
+
+def check(names=None):
+    """[(name, plan, scanned tables)] for every registered query, in registration order"""
+    results = []
+    for name in names or HOT_QUERIES:
+        build, allowed = HOT_QUERIES[name]
+        plan = build().explain()
+        scans = [table for table in full_scans(plan) if table not in allowed]
+        results.append((name, plan, scans))
+    return results
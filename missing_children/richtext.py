@@ -0,0 +1,198 @@
+"""
+Sanitizing and pre-rendering of RichText (CKEditor) fields.
+
+RichText comes from public forms, so it is never shown as stored. Each field
+is cleaned once, when its row is saved, into sibling columns:
+
+- <field>_html: the HTML with every tag, attribute and URL scheme outside an
+  allowlist removed. Templates print it with |safe.
+- <field>_text: the plain text, for the API, the change journal, the search
+  index and alerts.
+
+Some fields also get a short plain-text snippet for lists (MissingChild.summary,
+LocationUpdate.description_snippet). Pages and alert fan-out read these columns
+and do no HTML processing of their own.
+"""
+import re
+from html import escape
+from html.parser import HTMLParser
+from django.db import transaction
+from django.utils.text import Truncator
+
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'caption', 'code', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr',
+    'i', 'li', 'ol', 'p', 'pre', 's', 'strike', 'strong', 'sub', 'sup', 'table', 'tbody', 'td',
+    'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'ol': {'start'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+ALLOWED_SCHEMES = {'http', 'https', 'mailto', 'tel'}
+VOID_TAGS = {'br', 'hr'}
+# Dropped along with everything inside them
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'svg', 'math', 'textarea'}
+# Tags that separate words in the plain text
+BLOCK_TAGS = {
+    'blockquote', 'br', 'caption', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'ol', 'p',
+    'pre', 'table', 'td', 'th', 'tr', 'ul',
+}
+
+SCHEME_RE = re.compile(r'^([a-z][a-z0-9+.-]*):', re.IGNORECASE)
+# Browsers ignore these inside a URL scheme ("java\nscript:")
+URL_NOISE_RE = re.compile(r'[\x00-\x20\x7f]+')
+
+# Length of MissingChild.summary, the excerpt shown on list cards
+SUMMARY_LENGTH = 160
+# Length of LocationUpdate.description_snippet
+SIGHTING_SNIPPET_LENGTH = 100
+
+# model name: the RichText fields that get _html and _text columns
+FIELDS = {
+    'MissingChild': ['last_seen_wearing', 'distinctive_features'],
+    'AbductorInformation': ['description', 'known_associates'],
+    'LocationUpdate': ['description'],
+    'Lead': ['information'],
+}
+# model name: (RichText field, snippet field, snippet length)
+SNIPPETS = {
+    'MissingChild': ('distinctive_features', 'summary', SUMMARY_LENGTH),
+    'LocationUpdate': ('description', 'description_snippet', SIGHTING_SNIPPET_LENGTH),
+}
+
+
+def safe_url(url):
+    """True for relative URLs and the allowed schemes; javascript:, data: and the like are refused"""
+    match = SCHEME_RE.match(URL_NOISE_RE.sub('', url))
+    return match is None or match.group(1).lower() in ALLOWED_SCHEMES
+
+
+class Sanitizer(HTMLParser):
+    """Rebuilds HTML from the allowlist, collecting its plain text on the way"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        kept = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name == 'href' and not safe_url(value):
+                continue
+            kept.append(f' {name}="{escape(value)}"')
+        if tag == 'a':
+            kept.append(' rel="nofollow noopener"')
+        self.html.append(f'<{tag}{"".join(kept)}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping -= 1
+        elif tag in self.open_tags and tag == self.open_tags[-1]:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        # Stray closing tags are dropped; ones closing an outer tag close the inner ones too
+        if tag not in self.open_tags:
+            return
+        while self.open_tags:
+            current = self.open_tags.pop()
+            self.html.append(f'</{current}>')
+            if current == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def result(self):
+        self.close()
+        self.html.extend(f'</{tag}>' for tag in reversed(self.open_tags))
+        self.open_tags = []
+        return ''.join(self.html).strip(), ' '.join(''.join(self.text).split())
+
+
+def render(html):
+    """(sanitized HTML, plain text) of a RichText value"""
+    if not html:
+        return '', ''
+    parser = Sanitizer()
+    parser.feed(html)
+    return parser.result()
+
+
+def sanitize(html):
+    return render(html)[0]
+
+
+def plain_text(html):
+    return render(html)[1]
+
+
+def snippet(text, length):
+    """Plain-text excerpt of at most `length` characters including the ellipsis"""
+    return Truncator(text).chars(length)
+
+
+def prerender(instance):
+    """Fill the sanitized, plain-text and snippet columns of a model instance; returns the fields set"""
+    name = type(instance).__name__
+    updated = []
+    rendered = {}
+    for field in FIELDS.get(name, []):
+        rendered[field] = render(getattr(instance, field))
+        setattr(instance, f'{field}_html', rendered[field][0])
+        setattr(instance, f'{field}_text', rendered[field][1])
+        updated += [f'{field}_html', f'{field}_text']
+    if name in SNIPPETS:
+        field, snippet_field, length = SNIPPETS[name]
+        setattr(instance, snippet_field, snippet(rendered[field][1], length))
+        updated.append(snippet_field)
+    return updated
+
+
+def backfill(model, batch_size=500):
+    """Re-render every row of `model`; returns the number of rows"""
+    fields = None
+    count = 0
+    batch = []
+    with transaction.atomic():
+        for row in model.objects.order_by('pk').only('pk', *FIELDS[model.__name__]).iterator(chunk_size=batch_size):
+            fields = prerender(row)
+            batch.append(row)
+            if len(batch) >= batch_size:
+                model.objects.bulk_update(batch, fields)
+                count += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, fields)
+            count += len(batch)
+    return count
@@ -0,0 +1,135 @@
+import re
+from django.db import connection
+from django.db.models import Q
+
+SEARCH_TABLE = 'missing_children_casesearch'
+
+# Columns of the FTS5 table, in order. child_id is stored but not tokenized.
+SEARCH_COLUMNS = ['first_name', 'last_name', 'case_number', 'last_seen_location', 'distinctive_features']
+
+# bm25 weights per column (child_id first): names and case numbers outrank free text.
+RANK_WEIGHTS = (0.0, 10.0, 10.0, 8.0, 4.0, 1.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_supported():
+    """FTS5 is SQLite-only; other backends fall back to icontains lookups"""
+    return connection.vendor == 'sqlite'
+
+
+def build_match_expression(q, fields=None):
+    """
+    Turn free user input into a safe FTS5 prefix query: `"anna"* "smi"*`.
+
+    With `fields`, the query is limited to those columns:
+    `{first_name last_name} : ("anna"* "smi"*)`.
+    """
+    tokens = TOKEN_RE.findall(q.lower())
+    expression = ' '.join(f'"{token}"*' for token in tokens)
+    if not expression or not fields:
+        return expression
+    unindexed = set(fields) - set(SEARCH_COLUMNS)
+    if unindexed:
+        raise ValueError(f'Not in the search index: {", ".join(sorted(unindexed))}')
+    return f'{{{" ".join(fields)}}} : ({expression})'
+
+
+def create_index(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        f"child_id UNINDEXED, {', '.join(SEARCH_COLUMNS)}, "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+    )
+    weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+    cursor.execute(
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES ('rank', %s)",
+        [f'bm25({weights})'],
+    )
+
+
+def drop_index(cursor):
+    cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def _insert_sql():
+    placeholders = ', '.join(['%s'] * (len(SEARCH_COLUMNS) + 1))
+    return f"INSERT INTO {SEARCH_TABLE}(child_id, {', '.join(SEARCH_COLUMNS)}) VALUES ({placeholders})"
+
+
+def _row(child):
+    return [
+        child.pk.hex,
+        child.first_name,
+        child.last_name,
+        child.case_number,
+        child.last_seen_location,
+        child.distinctive_features_text,
+    ]
+
+
+def index_child(child):
+    """Insert or replace the search row for a single case"""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE child_id = %s", [child.pk.hex])
+        cursor.execute(_insert_sql(), _row(child))
+
+
+def remove_child(child_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE child_id = %s", [child_id.hex])
+
+
+def rebuild_index(queryset, batch_size=1000):
+    """Re-populate the whole index from `queryset`; returns the number of rows indexed"""
+    if not is_supported():
+        return 0
+    count = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        batch = []
+        for child in queryset.iterator(chunk_size=batch_size):
+            batch.append(_row(child))
+            if len(batch) >= batch_size:
+                cursor.executemany(_insert_sql(), batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(_insert_sql(), batch)
+            count += len(batch)
+    return count
+
+
+def search_queryset(queryset, q, fields=None):
+    """
+    Restrict `queryset` to cases matching `q`, best matches first.
+
+    On SQLite this joins the FTS5 index and orders by bm25 rank; elsewhere it
+    falls back to an icontains OR over `fields`. Either way only `fields`
+    (default: every indexed column) are searched.
+    """
+    expression = build_match_expression(q, fields)
+    if not expression:
+        return queryset
+
+    if not is_supported():
+        fields = fields or SEARCH_COLUMNS
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': q})
+        return queryset.filter(condition)
+
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        tables=[SEARCH_TABLE],
+        where=[
+            f'{SEARCH_TABLE}.child_id = {table}.id',
+            f'{SEARCH_TABLE} MATCH %s',
+        ],
+        params=[expression],
+        select={'search_rank': f'{SEARCH_TABLE}.rank'},
+    ).order_by('search_rank', '-reported_date')
@@ -0,0 +1,222 @@
+"""
+Deterministic synthetic dataset for load testing and benchmarks.
+
+The same seed always produces the same rows, including primary keys, so
+benchmark runs on different machines or commits measure the same data.
+Rows are written with bulk_create in batches. Signal-maintained structures
+(the search index, coverage cells, sighting clusters and duplicate keys) are
+rebuilt in bulk afterwards.
+"""
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import (
+    MissingChild, LocationUpdate, Lead, AlertSubscription, SMSSubscription,
+    EmailCoverageCell, SMSCoverageCell,
+)
+from . import geo, search, digests, clusters, duplicates, richtext
+
+FIRST_NAMES = [
+    'Emma', 'Liam', 'Olivia', 'Noah', 'Ava', 'Elijah', 'Sophia', 'James', 'Isabella', 'Lucas',
+    'Mia', 'Mason', 'Amelia', 'Ethan', 'Harper', 'Logan', 'Evelyn', 'Aiden', 'Abigail', 'Jackson',
+    'Maya', 'Mateo', 'Aaliyah', 'Diego', 'Priya', 'Omar', 'Zoe', 'Kai', 'Lena', 'Jamal',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+    'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor',
+    'Moore', 'Jackson', 'Martin', 'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Nguyen', 'Patel',
+]
+# Digest frequencies handed out to subscribers in turn
+DIGEST_MIX = ['none', 'none', 'daily', 'weekly']
+
+# (name, latitude, longitude) centres that cases and subscribers cluster around
+CITIES = [
+    ('New York, NY', 40.7128, -74.0060), ('Los Angeles, CA', 34.0522, -118.2437),
+    ('Chicago, IL', 41.8781, -87.6298), ('Houston, TX', 29.7604, -95.3698),
+    ('Phoenix, AZ', 33.4484, -112.0740), ('Philadelphia, PA', 39.9526, -75.1652),
+    ('San Antonio, TX', 29.4241, -98.4936), ('San Diego, CA', 32.7157, -117.1611),
+    ('Dallas, TX', 32.7767, -96.7970), ('Atlanta, GA', 33.7490, -84.3880),
+    ('Seattle, WA', 47.6062, -122.3321), ('Denver, CO', 39.7392, -104.9903),
+    ('Miami, FL', 25.7617, -80.1918), ('Springfield, IL', 39.7817, -89.6501),
+]
+STREETS = ['Main St', 'Oak Ave', 'Park Rd', 'Elm St', 'Maple Dr', 'Cedar Ln', 'Lake Blvd', 'Hill St']
+FEATURES = [
+    'Scar above left eyebrow', 'Braces on teeth', 'Freckles across nose', 'Birthmark on right arm',
+    'Wears glasses', 'Pierced ears', 'Missing front tooth', 'Curly hair', 'Mole on cheek',
+]
+CLOTHING = ['red hoodie', 'blue jeans', 'yellow raincoat', 'green backpack', 'white sneakers', 'striped shirt']
+
+
+@contextmanager
+def without_auto_now(model, *field_names):
+    """Let bulk_create keep the synthetic timestamps instead of stamping now()"""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+class DatasetGenerator:
+    def __init__(self, seed=42, batch_size=5000, now=None, log=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.now = now or timezone.now().replace(microsecond=0)
+        self.log = log or (lambda message: None)
+        self.child_ids = []
+
+    def _uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _point(self):
+        name, lat, lng = self.rng.choice(CITIES)
+        return name, lat + self.rng.gauss(0, 0.25), lng + self.rng.gauss(0, 0.25)
+
+    def _past(self, days):
+        return self.now - timedelta(seconds=self.rng.randrange(days * 86400))
+
+    def _bulk(self, model, rows):
+        # bulk_create skips pre_save, which fills the rendered RichText columns
+        for row in rows:
+            richtext.prerender(row)
+        model.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    def _batches(self, total, build):
+        done = 0
+        while done < total:
+            size = min(self.batch_size, total - done)
+            yield [build(done + i) for i in range(size)]
+            done += size
+
+    def cases(self, total):
+        def build(i):
+            city, lat, lng = self._point()
+            reported = self._past(365 * 3)
+            status = self.rng.choices(['missing', 'found', 'located'], weights=[70, 25, 5])[0]
+            child_id = self._uuid()
+            self.child_ids.append(child_id)
+            return MissingChild(
+                id=child_id,
+                case_number=f'SEED-{i + 1:07d}',
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                age=self.rng.randint(1, 17),
+                gender=self.rng.choice('MFO'),
+                height=f'{self.rng.randint(80, 180)} cm',
+                weight=f'{self.rng.randint(10, 80)} kg',
+                eye_color=self.rng.choice(['Brown', 'Blue', 'Green', 'Hazel']),
+                hair_color=self.rng.choice(['Black', 'Brown', 'Blonde', 'Red']),
+                last_seen_date=reported - timedelta(hours=self.rng.randint(1, 72)),
+                last_seen_location=f'{self.rng.randint(1, 9999)} {self.rng.choice(STREETS)}, {city}',
+                last_seen_latitude=lat,
+                last_seen_longitude=lng,
+                last_seen_wearing=f'<p>{self.rng.choice(CLOTHING)} and {self.rng.choice(CLOTHING)}</p>',
+                distinctive_features=f'<p>{self.rng.choice(FEATURES)}. {self.rng.choice(FEATURES)}.</p>',
+                photo='missing_children/placeholder.jpg',
+                status=status,
+                is_abducted=self.rng.random() < 0.1,
+                reported_date=reported,
+                updated_at=reported,
+            )
+
+        with without_auto_now(MissingChild, 'reported_date', 'updated_at'):
+            for rows in self._batches(total, build):
+                self._bulk(MissingChild, rows)
+                self.log(f'cases: {len(self.child_ids)}/{total}')
+
+    def sightings(self, total):
+        def build(i):
+            city, lat, lng = self._point()
+            return LocationUpdate(
+                child_id=self.rng.choice(self.child_ids),
+                location=f'{self.rng.choice(STREETS)}, {city}',
+                latitude=lat,
+                longitude=lng,
+                sighting_time=self._past(365),
+                reported_by=f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}',
+                contact_number=f'555-{self.rng.randint(0, 9999):04d}',
+                description=f'<p>Seen wearing a {self.rng.choice(CLOTHING)}.</p>',
+                verified=self.rng.random() < 0.6,
+                reported_at=self._past(365),
+            )
+
+        with without_auto_now(LocationUpdate, 'reported_at'):
+            for n, rows in enumerate(self._batches(total, build), 1):
+                self._bulk(LocationUpdate, rows)
+                self.log(f'sightings: {min(n * self.batch_size, total)}/{total}')
+
+    def leads(self, total):
+        def build(i):
+            created = self._past(365)
+            return Lead(
+                child_id=self.rng.choice(self.child_ids),
+                reporter_name=f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}',
+                reporter_email=f'lead{i}@example.com',
+                reporter_phone=f'555-{self.rng.randint(0, 9999):04d}',
+                information=f'<p>Possible sighting near {self.rng.choice(STREETS)}.</p>',
+                status=self.rng.choice([c[0] for c in Lead.STATUS_CHOICES]),
+                created_at=created,
+                updated_at=created,
+            )
+
+        with without_auto_now(Lead, 'created_at', 'updated_at'):
+            for n, rows in enumerate(self._batches(total, build), 1):
+                self._bulk(Lead, rows)
+                self.log(f'leads: {min(n * self.batch_size, total)}/{total}')
+
+    def subscribers(self, total):
+        """Half email, half SMS subscribers, each with a location and radius; half take a digest"""
+        email_total = total // 2
+
+        def build_email(i):
+            city, lat, lng = self._point()
+            return AlertSubscription(
+                email=f'subscriber{i}@example.com', location=city, latitude=lat, longitude=lng,
+                radius_miles=self.rng.choice([5, 10, 10, 25, 50]), verified=self.rng.random() < 0.9,
+                verification_token=str(self._uuid()),
+                digest_frequency=DIGEST_MIX[i % len(DIGEST_MIX)], digest_region=digests.region_for(lat, lng),
+            )
+
+        def build_sms(i):
+            city, lat, lng = self._point()
+            return SMSSubscription(
+                phone_number=f'+1555{i:07d}', location=city, latitude=lat, longitude=lng,
+                radius_miles=self.rng.choice([5, 10, 10, 25, 50]), verified=self.rng.random() < 0.9,
+                digest_frequency=DIGEST_MIX[i % len(DIGEST_MIX)], digest_region=digests.region_for(lat, lng),
+            )
+
+        for model, cell_model, count, build in (
+            (AlertSubscription, EmailCoverageCell, email_total, build_email),
+            (SMSSubscription, SMSCoverageCell, total - email_total, build_sms),
+        ):
+            for n, rows in enumerate(self._batches(count, build), 1):
+                # bulk_create fills in primary keys on SQLite and PostgreSQL
+                created = model.objects.bulk_create(rows)
+                cells = [
+                    cell_model(subscription_id=sub.pk, cell=cell)
+                    for sub in created
+                    for cell in geo.cells_covering(sub.latitude, sub.longitude, sub.radius_miles)
+                ]
+                self._bulk(cell_model, cells)
+                self.log(f'{model.__name__}: {min(n * self.batch_size, count)}/{count}')
+
+    def generate(self, cases, sightings, leads, subscribers):
+        with transaction.atomic():
+            self.cases(cases)
+            if self.child_ids:
+                self.sightings(sightings)
+                self.leads(leads)
+            self.subscribers(subscribers)
+        self.log('rebuilding search index')
+        search.rebuild_index(MissingChild.objects.all(), batch_size=self.batch_size)
+        self.log('building sighting clusters')
+        clusters.rebuild_all()
+        self.log('building duplicate detection keys')
+        duplicates.rebuild_all(batch_size=self.batch_size)
@@ -0,0 +1,155 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import (
+    MissingChild, AlertSubscription, SMSSubscription, LocationUpdate,
+    AbductorInformation, EmergencyContact, ChangeEvent, Lead,
+)
+from . import search, geo, imaging, page_cache, changes, live, digests, case_numbers, clusters, duplicates, geocoder, richtext
+
+GEO_FIELDS = {'latitude', 'longitude', 'radius_miles'}
+
+
+@receiver(pre_save, sender=MissingChild)
+def assign_case_number(sender, instance, **kwargs):
+    """Every path that creates a case (admin, public report, API) gets a number here"""
+    if not instance.case_number:
+        instance.case_number = case_numbers.allocate()
+
+
+@receiver(pre_save, sender=MissingChild)
+@receiver(pre_save, sender=LocationUpdate)
+@receiver(pre_save, sender=AlertSubscription)
+@receiver(pre_save, sender=SMSSubscription)
+def geocode_location(sender, instance, **kwargs):
+    """Place free-text locations that came without coordinates, before anything reads them"""
+    geocoder.fill_coordinates(instance)
+
+
+@receiver(pre_save, sender=MissingChild)
+@receiver(pre_save, sender=AbductorInformation)
+@receiver(pre_save, sender=LocationUpdate)
+@receiver(pre_save, sender=Lead)
+def prerender_rich_text(sender, instance, **kwargs):
+    """Sanitize RichText and precompute its plain text and snippets once, so no page or alert has to"""
+    richtext.prerender(instance)
+
+
+@receiver(post_save, sender=MissingChild)
+def index_missing_child(sender, instance, **kwargs):
+    """Keep the full-text search index in sync with case edits"""
+    search.index_child(instance)
+
+
+@receiver(post_save, sender=MissingChild)
+def index_duplicate_keys(sender, instance, **kwargs):
+    """Later reports are checked against this case through its blocking keys"""
+    duplicates.index_child(instance)
+
+
+@receiver(post_save, sender=MissingChild)
+def queue_photo_derivatives(sender, instance, **kwargs):
+    """Render thumbnails and hash the photo in the background whenever a new photo is stored"""
+    if imaging.needs_derivatives(instance):
+        from .tasks import enqueue, generate_photo_derivatives, index_photo_hash
+
+        child_id = str(instance.pk)
+        transaction.on_commit(lambda: enqueue(generate_photo_derivatives, child_id))
+        transaction.on_commit(lambda: enqueue(index_photo_hash, 'case', child_id))
+
+
+@receiver(post_delete, sender=MissingChild)
+def unindex_missing_child(sender, instance, **kwargs):
+    search.remove_child(instance.pk)
+
+
+@receiver(pre_save, sender=AlertSubscription)
+@receiver(pre_save, sender=SMSSubscription)
+def place_digest_region(sender, instance, **kwargs):
+    """Bucket the subscriber with its neighbours so each region's digest is rendered once"""
+    instance.digest_region = digests.region_for(instance.latitude, instance.longitude)
+
+
+@receiver(post_save, sender=AlertSubscription)
+@receiver(post_save, sender=SMSSubscription)
+def index_subscription_coverage(sender, instance, update_fields=None, **kwargs):
+    """Re-bucket a subscriber when its location or radius may have changed"""
+    if update_fields is not None and not GEO_FIELDS & set(update_fields):
+        return
+    geo.index_subscription(instance)
+
+
+@receiver(post_save, sender=MissingChild)
+@receiver(post_delete, sender=MissingChild)
+def invalidate_case_pages(sender, instance, **kwargs):
+    """A case change affects the lists, the home page and its own detail page"""
+    cache.delete(page_cache.ACTIVE_CASE_COUNT_KEY)
+    transaction.on_commit(lambda: cache.delete(page_cache.ACTIVE_CASE_COUNT_KEY))
+    page_cache.invalidate(page_cache.CASES, page_cache.case_group(instance.pk))
+
+
+@receiver(post_save, sender=LocationUpdate)
+@receiver(post_delete, sender=LocationUpdate)
+@receiver(post_save, sender=AbductorInformation)
+@receiver(post_delete, sender=AbductorInformation)
+def invalidate_case_detail(sender, instance, **kwargs):
+    page_cache.invalidate(page_cache.case_group(instance.child_id))
+
+
+@receiver(post_save, sender=EmergencyContact)
+@receiver(post_delete, sender=EmergencyContact)
+def invalidate_contacts_page(sender, instance, **kwargs):
+    page_cache.invalidate(page_cache.CONTACTS)
+
+
+@receiver(pre_save, sender=MissingChild)
+@receiver(pre_save, sender=LocationUpdate)
+def remember_tracked_value(sender, instance, **kwargs):
+    """Stash the stored status / verified flag so the journal can spot transitions"""
+    instance._previous_tracked_value = changes.previous_value(instance)
+
+
+@receiver(post_save, sender=MissingChild)
+def journal_case_change(sender, instance, **kwargs):
+    changes.record_case(instance, getattr(instance, '_previous_tracked_value', None))
+
+
+@receiver(post_delete, sender=MissingChild)
+def journal_case_delete(sender, instance, **kwargs):
+    changes.record_case_deleted(instance)
+
+
+@receiver(post_save, sender=LocationUpdate)
+def journal_sighting_change(sender, instance, **kwargs):
+    changes.record_sighting(instance, getattr(instance, '_previous_tracked_value', None))
+
+
+@receiver(post_delete, sender=LocationUpdate)
+def journal_sighting_delete(sender, instance, **kwargs):
+    changes.record_sighting_deleted(instance)
+
+
+@receiver(pre_save, sender=LocationUpdate)
+def remember_sighting_cluster(sender, instance, **kwargs):
+    instance._previous_cluster = clusters.previous_key(instance)
+
+
+@receiver(post_save, sender=LocationUpdate)
+def cluster_sighting(sender, instance, **kwargs):
+    """Fold newly verified sightings into their case's clusters"""
+    clusters.sighting_saved(instance, getattr(instance, '_previous_cluster', None))
+
+
+@receiver(post_delete, sender=LocationUpdate)
+def uncluster_sighting(sender, instance, **kwargs):
+    if instance.verified:
+        clusters.rebuild(instance.child_id, {clusters.key_for(instance)})
+
+
+@receiver(post_save, sender=ChangeEvent)
+def broadcast_change(sender, instance, created, **kwargs):
+    """Push sightings and status changes to open live streams once committed"""
+    message = live.message_for(instance) if created else None
+    if message is not None:
+        transaction.on_commit(lambda: live.publish(message))
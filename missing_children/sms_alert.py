@@ -1,15 +1,130 @@
 import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 from django.conf import settings
 from .models import AlertSubscription, MissingChild
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
+# Twilio answers 429 / error 20429 when the account or sender is over its rate
+THROTTLE_STATUS = 429
+THROTTLE_CODES = {20429, 14107}
+
+
+def is_throttled(error):
+    return error.status == THROTTLE_STATUS or error.code in THROTTLE_CODES
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SMSDispatcher:
+    """
+    Send one body to many recipients through a bounded thread pool.
+
+    Every send first takes a token from a shared bucket sized to the provider's
+    per-second limit. Throttled sends are retried with full-jitter exponential
+    backoff; any other error, from the provider or the network, fails that
+    recipient only.
+    """
+
+    def __init__(self, client, from_number, rate_per_second=None, max_workers=None,
+                 max_retries=None, backoff_base=0.5, backoff_cap=30.0):
+        self.client = client
+        self.from_number = from_number
+        self.bucket = TokenBucket(rate_per_second or settings.SMS_RATE_LIMIT_PER_SECOND)
+        self.max_workers = max_workers or settings.SMS_MAX_WORKERS
+        self.max_retries = settings.SMS_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def send_one(self, body, phone_number):
+        result = {'phone': phone_number, 'success': False, 'attempts': 0, 'throttled': 0}
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            result['attempts'] += 1
+            started = time.monotonic()
+            try:
+                sms = self.client.messages.create(
+                    body=body,
+                    from_=self.from_number,
+                    to=phone_number
+                )
+            except TwilioRestException as e:
+                result['latency'] = time.monotonic() - started
+                result['error'] = str(e)
+                if is_throttled(e) and attempt < self.max_retries:
+                    result['throttled'] += 1
+                    time.sleep(self._backoff(attempt))
+                    continue
+                logger.error(f"Failed to send SMS to {phone_number}: {e}")
+                return result
+            except Exception as e:
+                # Network errors and timeouts fail this recipient only, so the batch still settles
+                result['latency'] = time.monotonic() - started
+                result['error'] = str(e)
+                logger.exception(f"Failed to send SMS to {phone_number}")
+                return result
+            result['latency'] = time.monotonic() - started
+            result['success'] = True
+            result['message_sid'] = sms.sid
+            result.pop('error', None)
+            return result
+        return result
+
+    def send(self, body, phone_numbers):
+        """Send `body` to every number; returns one result dict per recipient, in order"""
+        phone_numbers = list(phone_numbers)
+        if not phone_numbers:
+            return []
+        workers = min(self.max_workers, len(phone_numbers))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda phone: self.send_one(body, phone), phone_numbers))
+
+    def send_each(self, messages):
+        """Send (key, body, phone) triples concurrently; yields (key, result) as each one finishes"""
+        messages = list(messages)
+        if not messages:
+            return
+        workers = min(self.max_workers, len(messages))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self.send_one, body, phone): key for key, body, phone in messages}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+
 class SMSAlertSystem:
-    def __init__(self):
-        self.client = None
-        if all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN]):
+    def __init__(self, client=None):
+        self.client = client
+        if self.client is None and all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN]):
             try:
                 self.client = Client(
                     settings.TWILIO_ACCOUNT_SID,
@@ -22,34 +137,20 @@ class SMSAlertSystem:
         """Send SMS alerts for missing child"""
         if not self.client:
             logger.warning("Twilio client not configured")
-            return False
+            return []
         
         message = self._format_sms_message(child)
-        results = []
-        
-        for phone_number in phone_numbers:
-            try:
-                message = self.client.messages.create(
-                    body=message,
-                    from_=settings.TWILIO_PHONE_NUMBER,
-                    to=phone_number
-                )
-                results.append({
-                    'phone': phone_number,
-                    'success': True,
-                    'message_sid': message.sid
-                })
-                logger.info(f"SMS sent to {phone_number} for child {child.id}")
-            except TwilioRestException as e:
-                logger.error(f"Failed to send SMS to {phone_number}: {e}")
-                results.append({
-                    'phone': phone_number,
-                    'success': False,
-                    'error': str(e)
-                })
+        results = self.dispatcher().send(message, phone_numbers)
+        metrics.record([metrics.sms_attempt(result, child_id=child.pk) for result in results])
         
+        successful = len([r for r in results if r['success']])
+        logger.info(f"SMS alert for child {child.id}: {successful}/{len(results)} sent")
         return results
     
+    def dispatcher(self, **kwargs):
+        """Rate-limited concurrent sender bound to this system's client"""
+        return SMSDispatcher(self.client, settings.TWILIO_PHONE_NUMBER, **kwargs)
+    
     def send_verification_sms(self, phone_number):
         """Send verification code via SMS"""
         if not self.client:
@@ -0,0 +1,97 @@
+"""
+Server-Sent Events endpoints for live sightings and status changes.
+
+    GET /live/case/<id>/                   one case
+    GET /live/region/?lat=..&lng=..&radius=..   cases last seen within `radius` miles
+
+These are async views: serve them from the ASGI application (lost_kids/asgi.py)
+so each open stream is a coroutine rather than a worker thread. The routes are
+only registered when LIVE_STREAMS_ENABLED. A request that still arrives through
+WSGI gets a stream that ends after one heartbeat interval, so it frees the
+worker and the browser reconnects after the retry delay. Event ids are change
+feed sequence numbers, so a client that needs a gap-free history can catch up
+from /api/changes/ after reconnecting.
+"""
+import asyncio
+import json
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from .models import MissingChild
+from . import geo, live
+
+
+def format_event(message):
+    data = json.dumps({'case': message['case'], **message['data']}, cls=DjangoJSONEncoder)
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {data}\n\n"
+
+
+async def event_stream(topics, accept=None, duration=None):
+    """SSE chunks for `topics`; open-ended, or closed after `duration` seconds"""
+    await live.backend().start()
+    queue = live.hub.subscribe(topics)
+    loop = asyncio.get_running_loop()
+    deadline = None if duration is None else loop.time() + duration
+    try:
+        # Sent once subscribed, so nothing published after this line is missed
+        yield f'retry: {settings.LIVE_RETRY_MS}\n\n'
+        while True:
+            timeout = settings.LIVE_HEARTBEAT_SECONDS
+            if deadline is not None:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    return
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if deadline is not None:
+                    return
+                # Comment line: keeps proxies from closing an idle connection
+                yield ': keepalive\n\n'
+                continue
+            if accept is None or accept(message):
+                yield format_event(message)
+    finally:
+        live.hub.unsubscribe(queue, topics)
+
+
+def stream_duration(request):
+    """None (stay open) under ASGI; one heartbeat interval when a WSGI worker serves the stream"""
+    return None if isinstance(request, ASGIRequest) else settings.LIVE_HEARTBEAT_SECONDS
+
+
+def sse_response(stream):
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+async def case_stream(request, pk):
+    if not await MissingChild.objects.filter(pk=pk).aexists():
+        raise Http404('No such case')
+    return sse_response(event_stream([live.case_topic(pk)], duration=stream_duration(request)))
+
+
+@require_GET
+async def region_stream(request):
+    try:
+        lat = float(request.GET['lat'])
+        lng = float(request.GET['lng'])
+        radius = float(request.GET.get('radius', 10))
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest('lat and lng are required; radius is in miles')
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius <= 0:
+        return HttpResponseBadRequest('Coordinates out of range')
+    radius = min(radius, settings.GEO_MAX_RADIUS_MILES)
+
+    def within_radius(message):
+        point = message['point']
+        return point is not None and geo.distance_miles(lat, lng, *point) <= radius
+
+    topics = [live.cell_topic(cell) for cell in geo.cells_covering(lat, lng, radius)]
+    return sse_response(event_stream(topics, within_radius, duration=stream_duration(request)))
@@ -1,87 +1,315 @@
 from celery import shared_task
-from django.core.mail import send_mail
+from kombu.exceptions import OperationalError
+from django.core.mail import get_connection, EmailMessage
 from django.conf import settings
-from .models import MissingChild, SMSSubscription, AlertSubscription
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from .models import MissingChild, Lead, AlertOutbox
 from .sms_alert import SMSAlertSystem
+from . import imaging, uploads, outbox, digests, metrics, photo_hashes
 import logging
+import math
+import time
 
 logger = logging.getLogger(__name__)
 
+# What the email and SMS alert builders read; the RichText columns stay in the database
+ALERT_FIELDS = (
+    'id', 'case_number', 'first_name', 'last_name', 'age', 'last_seen_date', 'last_seen_location',
+    'is_abducted', 'distinctive_features_text',
+)
+
+
+def enqueue(task, *args):
+    """
+    Queue `task`, or log and return None if the broker is unreachable.
+
+    Nothing runs in the caller's process: the work is picked up again by the
+    beat-scheduled relay (alerts) or by the backfill commands (photos, evidence).
+    """
+    try:
+        return task.delay(*args)
+    except OperationalError as e:
+        logger.error(f"Broker unavailable ({e}); {task.name}{args} not queued")
+        return None
+
+
+def build_alert_email(child):
+    """Subject and body of the missing child alert email"""
+    subject = f'URGENT: Missing Child Alert - {child.first_name} {child.last_name}'
+    body = f'''
+            Missing Child Alert
+            
+            Name: {child.first_name} {child.last_name}
+            Age: {child.age}
+            Last Seen: {child.last_seen_location}
+            Date: {child.last_seen_date}
+            
+            Description: {child.distinctive_features_text}
+            
+            If you have any information, please contact authorities immediately.
+            
+            View details: [Link to case details]
+            '''
+    return subject, body
+
+
+def deliver_email_batch(deliveries):
+    """Send claimed email deliveries over one SMTP connection; returns (sent, failed)"""
+    children = MissingChild.objects.only(*ALERT_FIELDS).in_bulk({d.child_id for d in deliveries})
+    emails = {pk: build_alert_email(child) for pk, child in children.items()}
+    sent, failed, attempts = [], [], []
+    try:
+        with get_connection() as connection:
+            for delivery in deliveries:
+                subject, body = emails[delivery.child_id]
+                message = EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [delivery.recipient])
+                started = time.monotonic()
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    failed.append((delivery, str(e)))
+                    success, error = False, str(e)
+                else:
+                    sent.append(delivery.pk)
+                    success, error = True, ''
+                attempts.append(metrics.attempt(
+                    'email', success, time.monotonic() - started, child_id=delivery.child_id,
+                    delivery_id=delivery.pk, error=error,
+                ))
+    except Exception as e:
+        # Could not open (or close) the connection: retry whatever was not sent
+        settled = set(sent) | {d.pk for d, _ in failed}
+        unsent = [d for d in deliveries if d.pk not in settled]
+        failed += [(d, str(e)) for d in unsent]
+        attempts += [
+            metrics.attempt('email', False, child_id=d.child_id, delivery_id=d.pk, error=str(e)) for d in unsent
+        ]
+
+    outbox.mark_sent(sent)
+    for delivery, error in failed:
+        outbox.mark_failed(delivery, error)
+    metrics.record(attempts)
+    return len(sent), len(failed)
+
+
+def deliver_sms_batch(deliveries):
+    """Text claimed SMS deliveries, recording each outcome as the provider answers"""
+    sms_system = SMSAlertSystem()
+    if not sms_system.client:
+        for delivery in deliveries:
+            outbox.mark_failed(delivery, 'Twilio client not configured')
+        return 0, len(deliveries)
+
+    children = MissingChild.objects.only(*ALERT_FIELDS).in_bulk({d.child_id for d in deliveries})
+    bodies = {pk: sms_system._format_sms_message(child) for pk, child in children.items()}
+    sent = failed = 0
+    attempts = []
+    messages = ((d, bodies[d.child_id], d.recipient) for d in deliveries)
+    for delivery, result in sms_system.dispatcher().send_each(messages):
+        if result['success']:
+            outbox.mark_sent([delivery.pk], provider_id=result.get('message_sid', ''))
+            sent += 1
+        else:
+            outbox.mark_failed(delivery, result.get('error', 'Unknown error'))
+            failed += 1
+        attempts.append(metrics.sms_attempt(result, child_id=delivery.child_id, delivery_id=delivery.pk))
+    metrics.record(attempts)
+    return sent, failed
+
+
+DELIVERERS = {
+    'email': (deliver_email_batch, 'ALERT_EMAIL_BATCH_SIZE'),
+    'sms': (deliver_sms_batch, 'ALERT_SMS_BATCH_SIZE'),
+}
+
+
+@shared_task
+def drain_alert_deliveries(channel, max_batches=None):
+    """Claim, send and settle due deliveries on one channel until none are left"""
+    deliver, batch_setting = DELIVERERS[channel]
+    outbox.release_stale_claims()
+    totals = {'channel': channel, 'batches': 0, 'sent': 0, 'failed': 0}
+    while max_batches is None or totals['batches'] < max_batches:
+        deliveries = outbox.claim(channel, getattr(settings, batch_setting))
+        if not deliveries:
+            break
+        sent, failed = deliver(deliveries)
+        totals['batches'] += 1
+        totals['sent'] += sent
+        totals['failed'] += failed
+    if totals['failed']:
+        logger.warning(f"{channel} alerts: {totals['sent']} sent, {totals['failed']} failed")
+    else:
+        logger.info(f"{channel} alerts: {totals['sent']} sent")
+    return totals
+
+
+@shared_task
+def relay_alert_outbox():
+    """Expand pending alert requests into the delivery ledger and start the drainers"""
+    expanded = {'email': 0, 'sms': 0}
+    entries = AlertOutbox.objects.filter(status='pending').select_related('child')
+    for entry in entries:
+        counts = outbox.expand(entry)
+        logger.info(f"Alert for child {entry.child_id}: {counts['email']} emails, {counts['sms']} texts")
+        for channel in expanded:
+            expanded[channel] += counts[channel]
+
+    # One drainer per batch of due rows, up to ALERT_MAX_DRAINERS; their claims never overlap
+    for channel, (_, batch_setting) in DELIVERERS.items():
+        batches = math.ceil(outbox.due(channel).count() / getattr(settings, batch_setting))
+        for _ in range(min(batches, settings.ALERT_MAX_DRAINERS)):
+            enqueue(drain_alert_deliveries, channel)
+    return expanded
+
+
 @shared_task
 def send_missing_child_alerts(child_id):
     """Send alerts for new missing child case"""
     try:
         child = MissingChild.objects.get(id=child_id)
-        
-        # Send email alerts
-        email_subscribers = AlertSubscription.objects.filter(
-            subscribed=True, 
-            verified=True,
-            location__icontains=child.last_seen_location[:50]  # Simple location matching
-        )
-        
-        for subscriber in email_subscribers:
-            send_mail(
-                f'URGENT: Missing Child Alert - {child.first_name} {child.last_name}',
-                f'Missing child alert...',
-                settings.DEFAULT_FROM_EMAIL,
-                [subscriber.email],
-                fail_silently=False,
-            )
-        
-        # Send SMS alerts
-        sms_system = SMSAlertSystem()
-        sms_subscribers = SMSSubscription.objects.filter(
-            verified=True, 
-            active=True
-        )
-        
-        phone_numbers = [sub.phone_number for sub in sms_subscribers]
-        sms_results = sms_system.send_sms_alert(child, phone_numbers)
-        
-        # Log results
-        successful_sms = len([r for r in sms_results if r['success']])
-        logger.info(f"Sent {successful_sms}/{len(sms_results)} SMS alerts for child {child_id}")
-        
-        return {
-            'emails_sent': email_subscribers.count(),
-            'sms_sent': successful_sms,
-            'child_id': child_id
-        }
-        
     except MissingChild.DoesNotExist:
         logger.error(f"Child {child_id} not found")
         return {'error': 'Child not found'}
 
+    with transaction.atomic():
+        outbox.record_case_alert(child)
+    # The ledger skips recipients who already got this case's alert
+    expanded = relay_alert_outbox()
+    return {
+        'emails_queued': expanded['email'],
+        'sms_queued': expanded['sms'],
+        'child_id': child_id
+    }
+
+def send_email_digest(rendered, recipients):
+    """One message per recipient, all over one SMTP connection; returns the number sent"""
+    attempts = []
+    with get_connection() as connection:
+        for recipient in recipients:
+            message = EmailMessage(rendered['subject'], rendered['email'], settings.DEFAULT_FROM_EMAIL, [recipient])
+            started = time.monotonic()
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                attempts.append(metrics.attempt('email', False, time.monotonic() - started, kind='digest', error=str(e)))
+            else:
+                attempts.append(metrics.attempt('email', True, time.monotonic() - started, kind='digest'))
+    metrics.record(attempts)
+    return len([a for a in attempts if a.success])
+
+
+def send_sms_digest(rendered, recipients):
+    sms_system = SMSAlertSystem()
+    if not sms_system.client:
+        logger.warning("Twilio client not configured")
+        return 0
+    results = sms_system.dispatcher().send(rendered['sms'], recipients)
+    metrics.record([metrics.sms_attempt(result, kind='digest') for result in results])
+    return len([r for r in results if r['success']])
+
+
+DIGEST_SENDERS = {
+    'email': (send_email_digest, 'ALERT_EMAIL_BATCH_SIZE'),
+    'sms': (send_sms_digest, 'ALERT_SMS_BATCH_SIZE'),
+}
+
+
+@shared_task
+def send_digest_batch(channel, frequency, region, until, recipients):
+    """Send one region's cached digest to one batch of subscribers"""
+    rendered = digests.digest(frequency, region, parse_datetime(until))
+    if rendered is None:
+        return {'channel': channel, 'sent': 0}
+    send, _ = DIGEST_SENDERS[channel]
+    sent = send(rendered, recipients)
+    if sent < len(recipients):
+        logger.warning(f"{frequency} {channel} digest for region {region}: {sent}/{len(recipients)} sent")
+    return {'channel': channel, 'sent': sent}
+
+
+@shared_task
+def send_digests(frequency):
+    """Render each region's digest once and queue its recipient batches"""
+    until = digests.period_end()
+    cases = digests.new_cases(frequency, until)
+    totals = {'frequency': frequency, 'cases': len(cases), 'regions': 0, 'batches': 0}
+    if not cases:
+        return totals
+
+    for region in digests.regions(frequency):
+        if digests.digest(frequency, region, until, cases) is None:
+            continue
+        totals['regions'] += 1
+        for channel, (_, batch_setting) in DIGEST_SENDERS.items():
+            batches = digests.recipient_batches(channel, frequency, region, getattr(settings, batch_setting))
+            for recipients in batches:
+                enqueue(send_digest_batch, channel, frequency, region, until.isoformat(), recipients)
+                totals['batches'] += 1
+    logger.info(f"{frequency} digest: {totals['cases']} cases, {totals['regions']} regions, {totals['batches']} batches")
+    return totals
+
+
 @shared_task
 def send_daily_digest():
     """Send daily digest of missing children"""
-    from datetime import datetime, timedelta
-    
-    yesterday = datetime.now() - timedelta(days=1)
-    new_cases = MissingChild.objects.filter(
-        reported_date__gte=yesterday,
-        status='missing'
-    )
-    
-    if new_cases.exists():
-        message = "📋 Daily Missing Children Digest\n\n"
-        for case in new_cases:
-            message += f"• {case.first_name} {case.last_name}, {case.age}\n"
-            message += f"  Missing from: {case.last_seen_location}\n"
-            message += f"  Case #{case.case_number}\n\n"
-        
-        message += "Stay vigilant in your community.\nReport sightings to 911."
-        
-        # Send to SMS subscribers
-        sms_system = SMSAlertSystem()
-        subscribers = SMSSubscription.objects.filter(
-            verified=True, 
-            active=True,
-            digest_frequency='daily'
-        )
-        
-        for subscriber in subscribers:
-            sms_system.send_sms_alert(message, [subscriber.phone_number])
-    
-    return {'digest_sent': new_cases.count()}
\ No newline at end of file
+    return send_digests('daily')
+
+
+@shared_task
+def send_weekly_digest():
+    """Send weekly summary of missing children"""
+    return send_digests('weekly')
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def generate_photo_derivatives(self, child_id):
+    """Resize, re-encode and strip EXIF from a newly uploaded case photo"""
+    try:
+        widths = imaging.refresh_child_photo(child_id)
+    except MissingChild.DoesNotExist:
+        logger.error(f"Child {child_id} not found")
+        return {'error': 'Child not found'}
+    except OSError as e:
+        logger.error(f"Could not process photo for child {child_id}: {e}")
+        raise self.retry(exc=e)
+    return {'child_id': child_id, 'widths': widths}
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def process_lead_evidence(self, lead_id):
+    """Thumbnail, metadata and (if missing) content hash for a lead's evidence file"""
+    try:
+        metadata = uploads.process_evidence(lead_id)
+    except Lead.DoesNotExist:
+        logger.error(f"Lead {lead_id} not found")
+        return {'error': 'Lead not found'}
+    except OSError as e:
+        logger.error(f"Could not process evidence for lead {lead_id}: {e}")
+        raise self.retry(exc=e)
+    if metadata.get('kind') == 'image' and 'error' not in metadata:
+        enqueue(index_photo_hash, 'lead', lead_id)
+    return {'lead_id': lead_id, 'kind': metadata.get('kind')}
+
+
+PHOTO_INDEXERS = {'case': photo_hashes.index_child, 'lead': photo_hashes.index_lead}
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def index_photo_hash(self, source, object_id):
+    """Add a case photo or lead image to the look-alike index"""
+    try:
+        photo_hash = PHOTO_INDEXERS[source](object_id)
+    except (MissingChild.DoesNotExist, Lead.DoesNotExist):
+        logger.error(f"{source} {object_id} not found")
+        return {'error': 'Not found'}
+    except OSError as e:
+        logger.error(f"Could not hash {source} photo {object_id}: {e}")
+        raise self.retry(exc=e)
+    if photo_hash is None:
+        return {'source': source, 'id': object_id, 'indexed': False}
+    matches = photo_hashes.look_alikes(photo_hash)
+    if matches:
+        logger.info(f"{source} photo {object_id} resembles {len(matches)} photos of other cases")
+    return {'source': source, 'id': object_id, 'indexed': True, 'look_alikes': len(matches)}
@@ -0,0 +1,40 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+# Grey 4:3 box shown while a photo is being processed
+PENDING_PHOTO = (
+    "data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 4 3'%3E"
+    "%3Crect width='4' height='3' fill='%23dee2e6'/%3E%3C/svg%3E"
+)
+
+
+def _srcset(storage, variants, fmt):
+    return ', '.join(f"{storage.url(v[fmt])} {v['width']}w" for v in variants)
+
+
+@register.simple_tag
+def responsive_photo(photo, variants, sizes='100vw', **attrs):
+    """
+    <picture> with WebP and JPEG srcsets for a case photo.
+
+    `variants` is MissingChild.photo_variants. The original upload may still
+    carry EXIF (GPS) metadata, so until the background task has stripped it and
+    filled `variants` a blank placeholder is shown instead.
+    """
+    extra = format_html_join(' ', '{}="{}"', sorted(attrs.items()))
+    renditions = (variants or {}).get('variants')
+    if not renditions or (variants.get('source') != photo.name):
+        return format_html('<img src="{}" {}>', PENDING_PHOTO, extra)
+
+    storage = photo.storage
+    fallback = storage.url(renditions[-1]['jpeg'])
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" {} loading="lazy">'
+        '</picture>',
+        _srcset(storage, renditions, 'webp'), sizes,
+        fallback, _srcset(storage, renditions, 'jpeg'), sizes, extra,
+    )
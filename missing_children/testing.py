@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+from django.test import override_settings
+from .instrumentation import QueryRecorder
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin that fails when a block or view runs more SQL than budgeted.
+
+        with self.assertQueryBudget(3):
+            ...
+        self.assertViewQueryBudget(reverse('home'), 2)
+
+    Unlike assertNumQueries it allows fewer queries, and it reports repeated
+    statement shapes (N+1 patterns) in the failure message.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget, allow_duplicates=False):
+        with QueryRecorder() as queries:
+            yield queries
+        problems = []
+        if queries.count > budget:
+            problems.append(f'{queries.count} queries, budget is {budget}')
+        if not allow_duplicates and queries.duplicates():
+            problems.append(f'{len(queries.duplicates())} statements repeated with identical parameters')
+        if problems:
+            details = '\n'.join(f'  x{n} {sql}' for sql, n in queries.similar().items())
+            listing = '\n'.join(f"  {q['sql']}" for q in queries.queries)
+            self.fail('; '.join(problems) + f'\nRepeated:\n{details}\nAll queries:\n{listing}')
+
+    def assertViewQueryBudget(self, url, budget, allow_duplicates=False, **params):
+        """GET `url` with the page cache off and check its query budget; returns the response"""
+        with override_settings(PAGE_CACHE_ENABLED=False):
+            with self.assertQueryBudget(budget, allow_duplicates):
+                response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
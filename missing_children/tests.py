@@ -1,3 +1,1430 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from unittest import mock
+from PIL import Image
+from asgiref.sync import sync_to_async
+from celery import current_app
+from kombu.exceptions import OperationalError
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+from .models import (
+    MissingChild, AlertSubscription, SMSSubscription, LocationUpdate, EmergencyContact, Lead,
+    AlertOutbox, AlertDelivery, DeliveryAttempt, CaseNumberSequence, SightingCluster,
+    PhotoHash, DuplicateKey, AbductorInformation, ChangeEvent,
+)
+from .fake_twilio import FakeTwilioClient
+from .sms_alert import SMSAlertSystem, SMSDispatcher
+from . import urls, checks, search, geo, imaging, benchmarks, query_plans, live, streams, uploads, outbox, tasks, digests, metrics, case_numbers, clusters, photo_hashes, duplicates, geocoder, richtext, changes
+from .pagination import KeysetPaginator, EstimatedCountPaginator, encode_cursor
+from .seeding import DatasetGenerator
+from .testing import QueryBudgetMixin
 
-# Create your tests here.
+
+# ROOT_URLCONF for tests of the live streams, which are not routed by default
+urlpatterns = [
+    path('', include(urls.urlpatterns + urls.live_urlpatterns)),
+]
+
+
+def make_child(**kwargs):
+    defaults = {
+        'first_name': 'Anna',
+        'last_name': 'Smith',
+        'age': 9,
+        'gender': 'F',
+        'last_seen_date': timezone.now() - timedelta(hours=3),
+        'last_seen_location': 'Springfield Park',
+    }
+    defaults.update(kwargs)
+    return MissingChild.objects.create(**defaults)
+
+
+class CaseSearchIndexTests(TestCase):
+    def test_prefix_match_ranks_names_above_free_text(self):
+        by_feature = make_child(first_name='Maya', last_name='Jones', distinctive_features='<p>Scar shaped like a <b>kite</b></p>')
+        by_name = make_child(first_name='Kitel', last_name='Brown')
+        results = list(search.search_queryset(MissingChild.objects.all(), 'kit'))
+        self.assertEqual(results, [by_name, by_feature])
+
+    def test_html_is_stripped_before_indexing(self):
+        make_child(distinctive_features='<span class="bold">freckles</span>')
+        self.assertFalse(search.search_queryset(MissingChild.objects.all(), 'span').exists())
+        self.assertTrue(search.search_queryset(MissingChild.objects.all(), 'freck').exists())
+
+    def test_fields_limit_the_searched_columns(self):
+        make_child(first_name='Maya', distinctive_features='<p>Scar shaped like a kite</p>')
+        names = ['first_name', 'last_name']
+        self.assertFalse(search.search_queryset(MissingChild.objects.all(), 'kite', fields=names).exists())
+        self.assertTrue(search.search_queryset(MissingChild.objects.all(), 'kite').exists())
+        self.assertTrue(search.search_queryset(MissingChild.objects.all(), 'may', fields=names).exists())
+
+    def test_index_follows_updates_and_deletes(self):
+        child = make_child(first_name='Oliver')
+        child.first_name = 'Noah'
+        child.save()
+        self.assertFalse(search.search_queryset(MissingChild.objects.all(), 'oliver').exists())
+        self.assertTrue(search.search_queryset(MissingChild.objects.all(), 'noah').exists())
+        child.delete()
+        self.assertFalse(search.search_queryset(MissingChild.objects.all(), 'noah').exists())
+
+    def test_case_list_uses_index(self):
+        make_child(first_name='Zed', case_number='MC-20260101-0042')
+        response = self.client.get(reverse('case_list'), {'q': 'MC-2026'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 1)
+
+
+# Cases here stand for reports with no known position
+@override_settings(GEOCODER_ENABLED=False)
+class AlertOutboxTests(TestCase):
+    def setUp(self):
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', False)
+        self.client_sms = FakeTwilioClient(latency=0, fail_numbers={'+15550009'})
+        patcher = mock.patch.object(tasks, 'SMSAlertSystem', lambda: SMSAlertSystem(client=self.client_sms))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_emails_go_out_in_batches_over_one_connection_each(self):
+        for i in range(5):
+            AlertSubscription.objects.create(email=f'sub{i}@example.com', verified=True)
+        AlertSubscription.objects.create(email='pending@example.com', verified=False)
+        child = make_child()
+
+        with override_settings(ALERT_EMAIL_BATCH_SIZE=2), \
+                mock.patch.object(tasks, 'get_connection', wraps=tasks.get_connection) as connections:
+            result = tasks.send_missing_child_alerts.delay(str(child.pk)).get()
+
+        self.assertEqual(result['emails_queued'], 5)
+        self.assertEqual(connections.call_count, 3)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f'sub{i}@example.com' for i in range(5)])
+        self.assertEqual(AlertDelivery.objects.filter(status='sent').count(), 5)
+
+    def test_relay_starts_a_drainer_per_batch_up_to_the_cap(self):
+        for i in range(5):
+            SMSSubscription.objects.create(phone_number=f'+155500{i:02d}', verified=True)
+        with transaction.atomic():
+            outbox.record_case_alert(make_child())
+        with override_settings(ALERT_SMS_BATCH_SIZE=2), mock.patch.object(tasks, 'enqueue') as enqueue:
+            tasks.relay_alert_outbox()
+            self.assertEqual(enqueue.call_count, 3)
+            with override_settings(ALERT_MAX_DRAINERS=2):
+                enqueue.reset_mock()
+                tasks.relay_alert_outbox()
+                self.assertEqual(enqueue.call_count, 2)
+        enqueue.assert_called_with(tasks.drain_alert_deliveries, 'sms')
+
+    def test_outbox_row_rolls_back_with_the_case(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            outbox.record_case_alert(make_child())
+            raise RuntimeError('form save failed')
+        self.assertFalse(AlertOutbox.objects.exists())
+
+    def test_crashed_drainer_resumes_without_duplicate_texts(self):
+        phones = ['+15550001', '+15550002', '+15550003']
+        for phone in phones:
+            SMSSubscription.objects.create(phone_number=phone, verified=True)
+        child = make_child()
+        with transaction.atomic():
+            entry = outbox.record_case_alert(child)
+        outbox.expand(entry)
+
+        # A drainer claims two rows and dies before sending them
+        stranded = outbox.claim('sms', 2)
+        AlertDelivery.objects.filter(pk__in=[d.pk for d in stranded]).update(
+            claimed_at=timezone.now() - timedelta(hours=1),
+        )
+        tasks.drain_alert_deliveries('sms')
+        tasks.send_missing_child_alerts(str(child.pk))
+        tasks.drain_alert_deliveries('sms')
+
+        self.assertEqual(sorted(m.to for m in self.client_sms.sent), phones)
+        self.assertEqual(AlertDelivery.objects.filter(channel='sms', status='sent').count(), 3)
+
+    def test_network_errors_fail_one_recipient_and_settle_the_rest(self):
+        for phone in ['+15550001', '+15550002', '+15550003']:
+            SMSSubscription.objects.create(phone_number=phone, verified=True)
+        with transaction.atomic():
+            outbox.expand(outbox.record_case_alert(make_child()))
+        create = self.client_sms.create_message
+
+        def flaky(body, from_, to):
+            if to == '+15550002':
+                raise ConnectionError('Read timed out')
+            return create(body, from_, to)
+
+        with mock.patch.object(self.client_sms, 'create_message', flaky), \
+                self.assertLogs('missing_children.sms_alert', 'ERROR'):
+            totals = tasks.drain_alert_deliveries('sms')
+        self.assertEqual((totals['sent'], totals['failed']), (2, 1))
+        failed = AlertDelivery.objects.get(recipient='+15550002')
+        self.assertEqual((failed.status, failed.error), ('pending', 'Read timed out'))
+        self.assertFalse(AlertDelivery.objects.filter(status='sending').exists())
+
+    def test_failed_sends_back_off_then_give_up(self):
+        SMSSubscription.objects.create(phone_number='+15550009', verified=True)
+        child = make_child()
+        with transaction.atomic():
+            outbox.expand(outbox.record_case_alert(child))
+
+        tasks.drain_alert_deliveries('sms')
+        delivery = AlertDelivery.objects.get()
+        self.assertEqual((delivery.status, delivery.attempts), ('pending', 1))
+        self.assertGreater(delivery.next_attempt_at, timezone.now())
+
+        AlertDelivery.objects.update(next_attempt_at=timezone.now())
+        with override_settings(ALERT_MAX_ATTEMPTS=2):
+            tasks.drain_alert_deliveries('sms')
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.status, delivery.attempts), ('failed', 2))
+        self.assertIn('Invalid To number', delivery.error)
+
+
+# Cases here stand for reports with no known position
+@override_settings(GEOCODER_ENABLED=False)
+class DeliveryMetricsTests(TestCase):
+    def setUp(self):
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', False)
+        client = FakeTwilioClient(latency=0, fail_numbers={'+15550009'})
+        patcher = mock.patch.object(tasks, 'SMSAlertSystem', lambda: SMSAlertSystem(client=client))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_alert_sends_are_recorded_and_summarized(self):
+        for phone in ['+15550001', '+15550002', '+15550009']:
+            SMSSubscription.objects.create(phone_number=phone, verified=True)
+        AlertSubscription.objects.create(email='a@example.com', verified=True)
+        child = make_child()
+
+        with override_settings(ALERT_MAX_ATTEMPTS=1):
+            tasks.send_missing_child_alerts(str(child.pk))
+
+        report = metrics.alert(child.pk)
+        sms, email = report['channels']['sms'], report['channels']['email']
+        self.assertEqual((sms['sent'], sms['failed'], email['sent']), (2, 1, 1))
+        self.assertIsNotNone(sms['p95_ms'])
+        self.assertGreaterEqual(sms['completed_in_seconds'], 0)
+        self.assertEqual(DeliveryAttempt.objects.exclude(provider_id='').count(), 2)
+
+        out = io.StringIO()
+        call_command('delivery_metrics', case=child.case_number, stdout=out)
+        self.assertIn('sms   sent 2  failed 1', out.getvalue())
+
+    def test_per_minute_buckets_and_percentiles(self):
+        minute = timezone.now().replace(second=0, microsecond=0) - timedelta(minutes=5)
+        DeliveryAttempt.objects.bulk_create([
+            DeliveryAttempt(
+                channel='sms', success=i != 1, latency_ms=i, throttled=i % 10 == 0,
+                attempted_at=minute + timedelta(seconds=i % 60),
+            )
+            for i in range(1, 101)
+        ] + [DeliveryAttempt(channel='email', success=True, latency_ms=7, attempted_at=minute + timedelta(minutes=1))])
+
+        # Counters in one grouped query, both percentiles from one windowed pass
+        with self.assertNumQueries(2):
+            rows = metrics.per_minute()
+        self.assertEqual([(r['channel'], r['sent'], r['failed']) for r in rows], [('sms', 99, 1), ('email', 1, 0)])
+        self.assertEqual((rows[0]['p50_ms'], rows[0]['p95_ms'], rows[0]['throttled']), (50, 95, 10))
+
+        out = io.StringIO()
+        call_command('delivery_metrics', '--json', '--channel', 'email', stdout=out)
+        self.assertEqual(len(json.loads(out.getvalue())), 1)
+
+    def test_admin_pages_show_metrics(self):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+        DeliveryAttempt.objects.create(channel='sms', success=True, latency_ms=12, attempted_at=timezone.now())
+        response = self.client.get(reverse('admin:missing_children_deliveryattempt_changelist'))
+        self.assertContains(response, 'Last hour, per minute')
+        response = self.client.get(reverse('admin:missing_children_missingchild_change', args=[make_child().pk]))
+        self.assertContains(response, 'No delivery attempts recorded')
+
+
+class SMSDispatchTests(TestCase):
+    def test_every_recipient_gets_the_alert_body(self):
+        client = FakeTwilioClient(latency=0)
+        results = SMSAlertSystem(client=client).send_sms_alert(make_child(), ['+15550001', '+15550002', '+15550003'])
+        self.assertTrue(all(r['success'] for r in results))
+        self.assertEqual({m.body for m in client.sent}, {client.sent[0].body})
+        self.assertIn('MISSING CHILD ALERT', client.sent[0].body)
+
+    def test_throttled_sends_are_retried_and_failures_reported_per_recipient(self):
+        client = FakeTwilioClient(latency=0, max_per_second=5, fail_numbers={'+15550009'})
+        dispatcher = SMSDispatcher(client, '+15550000', rate_per_second=1000, max_workers=4,
+                                   max_retries=20, backoff_base=0.05, backoff_cap=0.5)
+        phones = [f'+155500{i:02d}' for i in range(10)]
+        results = dispatcher.send('alert', phones)
+        self.assertEqual([r['phone'] for r in results], phones)
+        self.assertEqual([r['phone'] for r in results if not r['success']], ['+15550009'])
+        self.assertGreater(sum(r['throttled'] for r in results), 0)
+
+
+class RadiusTargetingTests(TestCase):
+    def test_only_subscribers_whose_radius_covers_the_point(self):
+        # Springfield, IL and points roughly 5, 30 and 400 miles away
+        near = SMSSubscription.objects.create(phone_number='+1555100', latitude=39.85, longitude=-89.65, radius_miles=10)
+        wide = SMSSubscription.objects.create(phone_number='+1555200', latitude=40.15, longitude=-89.30, radius_miles=50)
+        SMSSubscription.objects.create(phone_number='+1555300', latitude=40.15, longitude=-89.30, radius_miles=10)
+        SMSSubscription.objects.create(phone_number='+1555400', latitude=41.88, longitude=-83.0, radius_miles=50)
+        SMSSubscription.objects.create(phone_number='+1555500')
+
+        phones = geo.subscribers_covering(SMSSubscription.objects.all(), 39.78, -89.65, field='phone_number')
+        self.assertEqual(sorted(phones), [near.phone_number, wide.phone_number])
+
+    def test_moving_a_subscriber_rebuckets_it(self):
+        sub = AlertSubscription.objects.create(email='a@example.com', latitude=39.78, longitude=-89.65)
+        sub.latitude, sub.longitude = 34.05, -118.24
+        sub.save()
+        self.assertEqual(geo.subscribers_covering(AlertSubscription.objects.all(), 39.78, -89.65), [])
+        self.assertEqual(geo.subscribers_covering(AlertSubscription.objects.all(), 34.06, -118.25), [sub.pk])
+
+    def test_unplaced_subscribers_still_get_located_alerts(self):
+        SMSSubscription.objects.create(phone_number='+1555100', latitude=39.85, longitude=-89.65, radius_miles=10, verified=True)
+        SMSSubscription.objects.create(phone_number='+1555400', latitude=41.88, longitude=-83.0, radius_miles=50, verified=True)
+        unplaced = SMSSubscription.objects.create(phone_number='+1555500', verified=True)
+        self.assertEqual(list(unplaced.coverage_cells.values_list('cell', flat=True)), [geo.UNPLACED_CELL])
+        with override_settings(GEOCODER_ENABLED=False):
+            child = make_child(last_seen_latitude=39.78, last_seen_longitude=-89.65)
+        phones = [phone for channel, chunk in outbox.recipient_chunks(child, 2) if channel == 'sms' for phone in chunk]
+        self.assertEqual(sorted(phones), ['+1555100', '+1555500'])
+
+        # Once placed far away, the subscriber only hears about nearby cases
+        unplaced.latitude, unplaced.longitude = 45.0, -100.0
+        unplaced.save()
+        phones = [phone for channel, chunk in outbox.recipient_chunks(child, 2) if channel == 'sms' for phone in chunk]
+        self.assertEqual(phones, ['+1555100'])
+
+    def test_cells_wrap_across_the_antimeridian(self):
+        cells = geo.cells_covering(0.0, 179.99, 20)
+        self.assertIn(geo.cell_for(0.0, -179.9), cells)
+
+
+# Cases here stand for reports with no known position
+@override_settings(GEOCODER_ENABLED=False)
+class DigestTests(TestCase):
+    def setUp(self):
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', False)
+        cache.clear()
+        self.client_sms = FakeTwilioClient(latency=0)
+        patcher = mock.patch.object(tasks, 'SMSAlertSystem', lambda: SMSAlertSystem(client=self.client_sms))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_each_region_is_rendered_once_and_sent_in_batches(self):
+        # Springfield, IL and Los Angeles subscribers, plus one without a location
+        for i in range(3):
+            AlertSubscription.objects.create(
+                email=f'spi{i}@example.com', latitude=39.8, longitude=-89.6, verified=True, digest_frequency='daily',
+            )
+        for i in range(2):
+            SMSSubscription.objects.create(
+                phone_number=f'+155500{i}', latitude=39.7, longitude=-89.7, verified=True, digest_frequency='daily',
+            )
+        AlertSubscription.objects.create(
+            email='la@example.com', latitude=34.05, longitude=-118.24, verified=True, digest_frequency='daily',
+        )
+        AlertSubscription.objects.create(email='anywhere@example.com', verified=True, digest_frequency='daily')
+        AlertSubscription.objects.create(email='weekly@example.com', verified=True, digest_frequency='weekly')
+        AlertSubscription.objects.create(email='alerts@example.com', verified=True)
+
+        make_child(first_name='Spring', last_seen_latitude=39.78, last_seen_longitude=-89.65)
+        make_child(first_name='Angel', last_seen_latitude=34.06, last_seen_longitude=-118.25)
+        make_child(first_name='Nowhere')
+        make_child(first_name='Old')
+        MissingChild.objects.update(reported_date=timezone.now() - timedelta(hours=2))
+        MissingChild.objects.filter(first_name='Old').update(reported_date=timezone.now() - timedelta(days=3))
+
+        with override_settings(ALERT_EMAIL_BATCH_SIZE=2), \
+                mock.patch.object(digests, 'render', wraps=digests.render) as render:
+            totals = tasks.send_daily_digest.delay().get()
+
+        # Springfield, Los Angeles and nationwide: three renders for seven recipients
+        self.assertEqual(render.call_count, 3)
+        self.assertEqual((totals['cases'], totals['regions'], totals['batches']), (3, 3, 5))
+        bodies = {m.to[0]: m.body for m in mail.outbox}
+        self.assertEqual(len(bodies), 5)
+        self.assertIn('Spring Smith', bodies['spi0@example.com'])
+        self.assertIn('Nowhere Smith', bodies['spi2@example.com'])
+        self.assertNotIn('Angel Smith', bodies['spi1@example.com'])
+        self.assertNotIn('Spring Smith', bodies['la@example.com'])
+        self.assertIn('Angel Smith', bodies['anywhere@example.com'])
+        self.assertNotIn('Old Smith', bodies['anywhere@example.com'])
+        self.assertEqual(sorted(m.to for m in self.client_sms.sent), ['+1555000', '+1555001'])
+        self.assertIn('Spring Smith', self.client_sms.sent[0].body)
+
+    def test_nothing_new_sends_nothing(self):
+        AlertSubscription.objects.create(email='a@example.com', verified=True, digest_frequency='daily')
+        self.assertEqual(tasks.send_daily_digest()['batches'], 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_regions_include_neighbouring_cells(self):
+        size = settings.DIGEST_REGION_SIZE_DEGREES
+        region = digests.region_for(39.99, -89.01)
+        self.assertIn(digests.region_for(40.01, -88.99), geo.neighbours(region, size))
+        self.assertNotIn(digests.region_for(42.5, -89.0), geo.neighbours(region, size))
+
+
+class CaseNumberTests(TestCase):
+    def setUp(self):
+        case_numbers.reset()
+        self.addCleanup(case_numbers.reset)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def report(self, first_name):
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 40)).save(buffer, 'PNG')
+        return self.client.post(reverse('report_missing_child'), {
+            'first_name': first_name, 'last_name': 'Doe', 'age': 8, 'gender': 'M',
+            'last_seen_date': '2026-10-17T09:30', 'last_seen_location': 'Main St',
+            'photo': SimpleUploadedFile('kid.png', buffer.getvalue(), content_type='image/png'),
+        })
+
+    def test_public_reports_get_distinct_numbers(self):
+        self.assertEqual(self.report('Sam').status_code, 302)
+        self.assertEqual(self.report('Max').status_code, 302)
+        numbers = sorted(MissingChild.objects.values_list('case_number', flat=True))
+        day = timezone.localdate().strftime('%Y%m%d')
+        # Each report reserved a fresh block: its on-commit callback never runs inside TestCase
+        self.assertEqual(numbers, [f'MC-{day}-0001', f'MC-{day}-0011'])
+
+    @override_settings(CASE_NUMBER_BLOCK_SIZE=5)
+    def test_blocks_are_served_from_memory_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = case_numbers.allocate()
+        with self.assertNumQueries(0):
+            rest = [case_numbers.allocate() for _ in range(4)]
+        self.assertEqual([n[-4:] for n in [first] + rest], ['0001', '0002', '0003', '0004', '0005'])
+
+        # Another process reserves the next block from the shared row
+        case_numbers.reset()
+        self.assertTrue(case_numbers.allocate().endswith('-0006'))
+
+    @override_settings(CASE_NUMBER_BLOCK_SIZE=5)
+    def test_rolled_back_reservation_is_not_cached(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                case_numbers.allocate()
+                raise RuntimeError('save failed')
+        self.assertFalse(CaseNumberSequence.objects.exists())
+        self.assertTrue(case_numbers.allocate().endswith('-0001'))
+
+    def test_bulk_and_regional_numbers(self):
+        day = timezone.localdate()
+        numbers = case_numbers.allocate_many(3, day=day, region='il')
+        self.assertEqual(numbers[-1], f"MC-IL-{day:%Y%m%d}-0003")
+        self.assertEqual(case_numbers.allocate(day=day, region='IL'), f"MC-IL-{day:%Y%m%d}-0004")
+
+
+class DuplicateDetectionTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.existing = make_child(first_name='Katelyn', last_name='Smith', age=9)
+
+    def report(self, first_name, last_name, age, gender='F', **extra):
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 40)).save(buffer, 'PNG')
+        return self.client.post(reverse('report_missing_child'), {
+            'first_name': first_name, 'last_name': last_name, 'age': age, 'gender': gender,
+            'last_seen_date': timezone.localtime().strftime('%Y-%m-%dT%H:%M'), 'last_seen_location': 'Springfield Park',
+            'photo': SimpleUploadedFile('kid.png', buffer.getvalue(), content_type='image/png'), **extra,
+        })
+
+    def test_soundex(self):
+        codes = [duplicates.soundex(name) for name in ['Robert', 'Rupert', 'Ashcraft', 'Tymczak', 'Pfister', 'Lee']]
+        self.assertEqual(codes, ['R163', 'R163', 'A261', 'T522', 'P236', 'L000'])
+
+    def test_likely_duplicate_is_flagged_before_saving(self):
+        response = self.report('Caitlin', 'Smyth', 10)
+        self.assertEqual(response.status_code, 200)
+        ((match, case),) = response.context['possible_duplicates']
+        self.assertEqual(case['case_number'], self.existing.case_number)
+        self.assertGreaterEqual(match['total'], settings.DUPLICATE_MIN_SCORE)
+        self.assertEqual(MissingChild.objects.count(), 1)
+
+        response = self.report('Caitlin', 'Smyth', 10, not_duplicate='1')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(MissingChild.objects.count(), 2)
+
+    def test_unrelated_report_goes_straight_through(self):
+        self.assertEqual(self.report('Marcus', 'Lee', 14, gender='M').status_code, 302)
+
+    def test_cost_does_not_grow_with_the_case_table(self):
+        probe = MissingChild(
+            first_name='Caitlin', last_name='Smyth', age=10, gender='F',
+            last_seen_date=timezone.now(), last_seen_location='Springfield Park',
+        )
+        with self.assertNumQueries(2):
+            self.assertEqual(len(duplicates.likely_duplicates(probe)), 1)
+        for i in range(40):
+            make_child(first_name=f'Other{i}', last_name=f'Family{i}', age=3 + i % 10, last_seen_location=f'Town {i}')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(duplicates.likely_duplicates(probe)), 1)
+        self.assertEqual(len(queries), 2)
+        self.assertLess(len(duplicates.candidates(probe)), 5)
+
+    def test_cap_keeps_the_cases_sharing_most_keys(self):
+        # Same surname and age band only: one shared key each, created after the real match
+        for i in range(5):
+            make_child(first_name=f'Zed{i}', last_name='Smith', age=9, gender='M', last_seen_location=f'Town {i}')
+        probe = MissingChild(
+            first_name='Katelyn', last_name='Smith', age=9, gender='F',
+            last_seen_date=timezone.now(), last_seen_location='Springfield Park',
+        )
+        with override_settings(DUPLICATE_MAX_CANDIDATES=2):
+            self.assertEqual(duplicates.candidates(probe)[0], self.existing.pk)
+
+    def test_keys_follow_edits_and_admin_shows_matches(self):
+        twin = make_child(first_name='Katelynn', last_name='Smith', age=9)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get(reverse('admin:missing_children_missingchild_change', args=[twin.pk]))
+        self.assertContains(response, self.existing.case_number)
+
+        twin.first_name, twin.last_name, twin.age, twin.last_seen_location = 'Omar', 'Haddad', 15, 'Harbor'
+        twin.save()
+        self.assertEqual(duplicates.likely_duplicates(twin), [])
+        self.assertEqual(duplicates.rebuild_all(), DuplicateKey.objects.count())
+
+
+class AdminScaleTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        self.anna = make_child()
+        self.zed = make_child(first_name='Zed', last_name='Quinn')
+
+    def add_leads(self, child, count):
+        Lead.objects.bulk_create([
+            Lead(child=child, reporter_name='R', reporter_email=f'r{i}@example.com', reporter_phone='1', information='x')
+            for i in range(count)
+        ])
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(ctx)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:missing_children_lead_changelist')
+        self.add_leads(self.anna, 3)
+        few = self.changelist_queries(url)
+        self.add_leads(self.zed, 40)
+        self.assertEqual(self.changelist_queries(url), few)
+
+    def test_search_goes_through_the_case_index_and_exact_fields(self):
+        self.add_leads(self.anna, 2)
+        self.add_leads(self.zed, 3)
+        url = reverse('admin:missing_children_lead_changelist')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'q': 'zed'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        # Only the lead's own reporter_name is matched with LIKE, never the joined case
+        self.assertFalse([q for q in ctx.captured_queries if re.search(r'missingchild"\."\w+" LIKE', q['sql'])])
+        response = self.client.get(url, {'q': 'r1@example.com'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        Lead.objects.filter(child=self.zed).update(reporter_name='Maria Lopez')
+        self.assertEqual(self.client.get(url, {'q': 'maria'}).context['cl'].result_count, 3)
+
+        LocationUpdate.objects.create(
+            child=self.anna, location='Elm Street', sighting_time=timezone.now(), reported_by='x', description='x',
+        )
+        url = reverse('admin:missing_children_locationupdate_changelist')
+        self.assertEqual(self.client.get(url, {'q': 'elm'}).context['cl'].result_count, 1)
+
+    def test_child_is_picked_with_autocomplete(self):
+        response = self.client.get(reverse('admin:missing_children_locationupdate_add'))
+        self.assertContains(response, 'admin-autocomplete')
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'missing_children', 'model_name': 'lead', 'field_name': 'child', 'term': 'qui',
+        })
+        self.assertEqual([r['id'] for r in response.json()['results']], [str(self.zed.pk)])
+
+    def test_count_is_bounded(self):
+        self.add_leads(self.anna, 12)
+        with override_settings(ADMIN_EXACT_COUNT_LIMIT=5):
+            self.assertEqual(EstimatedCountPaginator(Lead.objects.all(), 10).count, 6)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.assertEqual(EstimatedCountPaginator(Lead.objects.all(), 10).count, 12)
+            self.assertEqual(EstimatedCountPaginator(Lead.objects.filter(status='new'), 10).count, 6)
+        self.assertEqual(EstimatedCountPaginator(Lead.objects.all(), 10).count, 12)
+
+
+class SightingClusterTests(TestCase):
+    def setUp(self):
+        self.child = make_child()
+        self.noon = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+    def sight(self, minutes=0, lat=39.78, lng=-89.65, verified=True, location='Main St'):
+        return LocationUpdate.objects.create(
+            child=self.child, location=location, latitude=lat, longitude=lng, verified=verified,
+            sighting_time=self.noon + timedelta(minutes=minutes), reported_by='Tester', description='x',
+        )
+
+    def snapshot(self):
+        return sorted(
+            (c.area, c.window_start, c.count, c.first_seen, c.last_seen, c.location, c.located)
+            for c in SightingCluster.objects.filter(child=self.child)
+        )
+
+    def test_verified_sightings_fold_into_area_and_window(self):
+        self.sight(0)
+        self.sight(30, lat=39.781, lng=-89.651, location='Oak Ave')
+        self.sight(-20, lat=None, lng=None, location='  main   ST ')
+        self.sight(10, lat=41.88, lng=-87.63)
+        pending = self.sight(45, verified=False)
+
+        pending.verified = True
+        pending.save()
+
+        near = SightingCluster.objects.get(child=self.child, area__startswith='cell:', count=3)
+        self.assertEqual((near.first_seen, near.last_seen), (self.noon, self.noon + timedelta(minutes=45)))
+        self.assertEqual(near.location, 'Main St')
+        self.assertAlmostEqual(near.centroid[0], (39.78 * 2 + 39.781) / 3)
+        self.assertEqual(SightingCluster.objects.get(area='place:main st').centroid, None)
+        self.assertEqual(SightingCluster.objects.filter(child=self.child).count(), 3)
+
+        folded = self.snapshot()
+        clusters.rebuild(self.child.pk)
+        self.assertEqual(self.snapshot(), folded)
+
+    def test_unverify_move_and_delete_rebuild_only_what_changed(self):
+        first = self.sight(0)
+        second = self.sight(5)
+        other = self.sight(-600, location='Far Away', lat=40.5, lng=-88.9)
+
+        second.sighting_time = self.noon - timedelta(days=2)
+        second.save()
+        first.verified = False
+        first.save()
+        other.delete()
+
+        self.assertEqual(
+            [(c.count, c.first_seen) for c in SightingCluster.objects.filter(child=self.child)],
+            [(1, self.noon - timedelta(days=2))],
+        )
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_case_page_cost_does_not_grow_with_sightings(self):
+        url = reverse('case_detail', args=[self.child.pk])
+        self.sight(0)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for i in range(30):
+            self.sight(i * 400, lat=39 + i / 10)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(len(response.context['sighting_clusters']), settings.SIGHTING_CLUSTERS_ON_PAGE)
+
+    def test_investigator_view(self):
+        url = reverse('case_sighting_clusters', args=[self.child.pk])
+        self.sight(0)
+        self.sight(5)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user('staff', password='pw', is_staff=True))
+        cluster = SightingCluster.objects.get(child=self.child)
+        response = self.client.get(url, {'cluster': cluster.pk})
+        self.assertEqual(len(response.context['sightings']), 2)
+
+
+class GeocoderTests(TestCase):
+    def setUp(self):
+        geocoder.reset()
+        self.addCleanup(geocoder.reset)
+
+    def place(self, text):
+        found = geocoder.geocode(text)
+        return found and found.name
+
+    def test_normalization_and_disambiguation(self):
+        self.assertEqual(geocoder.normalize('123 Main St., Springfield, IL 62701'), (['123', 'main', 'saint', 'springfield'], 'IL'))
+        self.assertEqual(geocoder.normalize('Helena, MT'), (['helena'], 'MT'))
+        self.assertEqual(self.place('Oak Ave & 5th, Springfield, Massachusetts'), 'Springfield, MA')
+        self.assertEqual(self.place('springfield'), 'Springfield, MO')
+        self.assertEqual(self.place('Portland, ME 04101'), 'Portland, ME')
+        self.assertEqual(self.place('Portland'), 'Portland, OR')
+        self.assertEqual(self.place('Ft. Worth'), 'Fort Worth, TX')
+        self.assertEqual(self.place('Forest Park, St Louis'), 'St. Louis, MO')
+        self.assertEqual(self.place('Lower East Side, New York'), 'New York City, NY')
+        self.assertEqual(self.place('Kansas City, Kansas'), 'Kansas City, KS')
+        self.assertIsNone(self.place('Nowhere Ville'))
+
+    def test_repeated_lookups_hit_the_caches(self):
+        # First sight of a text: one cache read, one cache write
+        with self.assertNumQueries(4):
+            self.assertEqual(self.place('Denver, CO'), 'Denver, CO')
+            self.assertIsNone(self.place('Atlantis'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.place('  denver   co '), 'Denver, CO')
+            self.assertIsNone(self.place('Atlantis'))
+
+        # A fresh process reads the shared table and never loads the gazetteer
+        geocoder.reset()
+        with self.assertNumQueries(1):
+            found = geocoder.geocode_many(['Denver, CO', 'Atlantis'])
+        self.assertEqual(found['Denver, CO'].name, 'Denver, CO')
+        self.assertIsNone(found['Atlantis'])
+        self.assertIsNone(geocoder._gazetteer)
+
+    def test_saves_fill_missing_coordinates_only(self):
+        child = make_child(last_seen_location='Pike Place Market, Seattle WA')
+        self.assertAlmostEqual(child.last_seen_latitude, 47.60621)
+        placed = make_child(last_seen_location='Seattle', last_seen_latitude=47.0, last_seen_longitude=-122.0)
+        self.assertEqual(placed.last_seen_latitude, 47.0)
+        sighting = LocationUpdate.objects.create(
+            child=child, location='Bus station, Boise', sighting_time=timezone.now(), reported_by='x', description='x',
+        )
+        self.assertAlmostEqual(sighting.longitude, -116.20345)
+
+    def test_backfill_command(self):
+        with override_settings(GEOCODER_ENABLED=False):
+            child = make_child(last_seen_location='Near the river, Memphis, TN')
+            subscription = AlertSubscription.objects.create(email='a@example.com', location='Nashville', verified=True)
+            make_child(last_seen_location='Unknown')
+        self.assertIsNone(child.last_seen_latitude)
+        out = io.StringIO()
+        call_command('geocode_locations', stdout=out)
+        self.assertIn('MissingChild: 1 rows geocoded, 1 locations not found', out.getvalue())
+
+        child.refresh_from_db()
+        subscription.refresh_from_db()
+        self.assertAlmostEqual(child.last_seen_latitude, 35.14953)
+        self.assertEqual(subscription.digest_region, digests.region_for(36.16589, -86.78444))
+        self.assertTrue(subscription.coverage_cells.exists())
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_location_filter_matches_nearby_cases(self):
+        nearby = make_child(first_name='Near', last_seen_location='Wrigleyville', last_seen_latitude=41.947, last_seen_longitude=-87.656)
+        make_child(first_name='Far', last_seen_location='Somewhere', last_seen_latitude=40.0, last_seen_longitude=-80.0)
+        response = self.client.get(reverse('case_list'), {'location': 'Chicago, IL'})
+        self.assertEqual(list(response.context['page_obj']), [nearby])
+
+
+class RichTextTests(TestCase):
+    def test_sanitizer_keeps_formatting_only(self):
+        self.assertEqual(
+            richtext.sanitize('<p onclick="steal()" style="color:red">Hi <b>there</b><script>alert(1)</script></p>'),
+            '<p>Hi <b>there</b></p>',
+        )
+        self.assertEqual(richtext.sanitize('<img src=x onerror=alert(1)>text<iframe src="//evil"></iframe>'), 'text')
+        self.assertEqual(richtext.sanitize('<a href="javascript:alert(1)">x</a>'), '<a rel="nofollow noopener">x</a>')
+        self.assertEqual(richtext.sanitize('<a href=" java\nscript:alert(1)">x</a>'), '<a rel="nofollow noopener">x</a>')
+        self.assertEqual(
+            richtext.sanitize('<a href="https://example.com/?a=1&b=2" target="_blank">x</a>'),
+            '<a href="https://example.com/?a=1&amp;b=2" rel="nofollow noopener">x</a>',
+        )
+        self.assertEqual(richtext.sanitize('</p>stray <b>open &lt;script&gt;'), 'stray <b>open &lt;script&gt;</b>')
+        self.assertEqual(richtext.plain_text('<p>One</p><p>Two &amp; <em>three</em></p>'), 'One Two & three')
+
+    def test_saves_fill_rendered_columns(self):
+        child = make_child(
+            last_seen_wearing='<p>Red coat</p>',
+            distinctive_features='<p>Scar &amp; <b>freckles</b><script>x()</script> ' + 'word ' * 60 + '</p>',
+        )
+        self.assertEqual(child.last_seen_wearing_html, '<p>Red coat</p>')
+        self.assertTrue(child.distinctive_features_html.startswith('<p>Scar &amp; <b>freckles</b> word'))
+        self.assertNotIn('x()', child.distinctive_features_text)
+        self.assertTrue(child.summary.startswith('Scar & freckles word'))
+
+        abductor = AbductorInformation.objects.create(child=child, description='<p onmouseover="x()">Tall man</p>')
+        self.assertEqual(abductor.description_html, '<p>Tall man</p>')
+        sighting = LocationUpdate.objects.create(
+            child=child, location='Park', sighting_time=timezone.now(), reported_by='x',
+            description='<p>Near the <i>swings</i> ' + 'again ' * 40 + '</p>',
+        )
+        self.assertTrue(sighting.description_snippet.startswith('Near the swings again'))
+        self.assertLessEqual(len(sighting.description_snippet), richtext.SIGHTING_SNIPPET_LENGTH)
+        lead = Lead.objects.create(
+            child=child, reporter_name='x', reporter_email='x@example.com', reporter_phone='555',
+            information='<p>Saw her <u>today</u></p>',
+        )
+        self.assertEqual(lead.information_text, 'Saw her today')
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_case_detail_shows_sanitized_html(self):
+        child = make_child(distinctive_features='<p>Mole<script>alert(1)</script></p>')
+        AbductorInformation.objects.create(child=child, description='<p>Beard<img src=x onerror=alert(2)></p>')
+        response = self.client.get(reverse('case_detail', args=[child.pk]))
+        self.assertContains(response, '<p>Mole</p>')
+        self.assertContains(response, '<p>Beard</p>')
+        self.assertNotContains(response, 'alert(')
+        self.assertIn('distinctive_features', response.context['child'].get_deferred_fields())
+
+    def test_alert_email_is_plain_text(self):
+        child = make_child(distinctive_features='<p>Scar &amp; <b>freckles</b></p>')
+        subject, body = tasks.build_alert_email(child)
+        self.assertIn('Description: Scar & freckles', body)
+        self.assertNotIn('<', body)
+
+    def test_render_command_backfills_bulk_writes(self):
+        child = make_child(distinctive_features='<p>Old</p>')
+        MissingChild.objects.filter(pk=child.pk).update(distinctive_features='<p>New <script>x</script></p>')
+        out = io.StringIO()
+        call_command('render_rich_text', model=['MissingChild'], stdout=out)
+        self.assertIn('MissingChild: 1 rows rendered', out.getvalue())
+        child.refresh_from_db()
+        self.assertEqual(child.distinctive_features_html, '<p>New </p>')
+        self.assertEqual(child.summary, 'New')
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.children = []
+        for i in range(7):
+            child = make_child(first_name=f'Child{i}')
+            # Two cases share a timestamp to exercise the id tie-breaker
+            MissingChild.objects.filter(pk=child.pk).update(reported_date=now - timedelta(minutes=min(i, 5)))
+            self.children.append(child)
+        self.expected = list(MissingChild.objects.order_by('-reported_date', '-pk'))
+
+    def test_walk_forward_and_back(self):
+        paginator = KeysetPaginator(MissingChild.objects.all(), 3)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([c for page in pages for c in page], self.expected)
+        self.assertFalse(pages[0].has_previous)
+
+        back = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[-2]))
+        first = paginator.get_page(back.previous_cursor)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous)
+
+    def test_garbage_cursor_falls_back_to_first_page(self):
+        page = KeysetPaginator(MissingChild.objects.all(), 3).get_page('not-a-cursor')
+        self.assertEqual(list(page), self.expected[:3])
+        # Well-formed tokens carrying the wrong types, or an impossible date
+        for payload in ({'d': 1, 'i': []}, {'d': None, 'i': {}}, {'d': '2024-13-45T00:00:00', 'i': uuid.uuid4().hex}):
+            page = KeysetPaginator(MissingChild.objects.all(), 3).get_page(encode_cursor(payload))
+            self.assertEqual(list(page), self.expected[:3])
+            for url in (reverse('case_list'), reverse('search_cases')):
+                self.assertEqual(self.client.get(url, {'cursor': encode_cursor(payload)}).status_code, 200)
+
+    def test_search_view_is_bounded(self):
+        response = self.client.get(reverse('search_cases'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cases']), 7)
+        with mock.patch('missing_children.views.SEARCH_RESULTS_PER_PAGE', 4):
+            response = self.client.get(reverse('search_cases'))
+        self.assertEqual(len(response.context['cases']), 4)
+        self.assertTrue(response.context['cases'].has_next)
+
+
+class PhotoDerivativeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PHOTO_DERIVATIVE_WIDTHS=[320, 640, 1280])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, size=(800, 400), orientation=None):
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        if orientation:
+            exif[0x0112] = orientation
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('kid.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_variants_are_resized_rotated_and_stripped(self):
+        child = make_child(photo=self.upload(orientation=6))
+        self.assertTrue(imaging.needs_derivatives(child))
+        self.assertEqual(imaging.refresh_child_photo(child.pk), 1)
+
+        child.refresh_from_db()
+        self.assertFalse(imaging.needs_derivatives(child))
+        # 800x400 rotated by EXIF orientation 6 is 400 wide, so only the 320 rendition fits
+        (variant,) = child.photo_variants['variants']
+        self.assertEqual(variant['width'], 320)
+        for fmt in ('webp', 'jpeg'):
+            with child.photo.storage.open(variant[fmt]) as f, Image.open(f) as image:
+                self.assertEqual(image.size, (320, 640))
+                self.assertEqual(len(image.getexif()), 0)
+        # The original is rewritten upright and without metadata too
+        with child.photo.open() as f, Image.open(f) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (400, 800)))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_template_tag_renders_srcset(self):
+        child = make_child(photo=self.upload(size=(1400, 900)))
+        imaging.refresh_child_photo(child.pk)
+        child.refresh_from_db()
+        html = Template(
+            '{% load photo_tags %}{% responsive_photo child.photo child.photo_variants sizes="50vw" class="card-img-top" alt=child.first_name %}'
+        ).render(Context({'child': child}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('_w320.webp 320w', html)
+        self.assertIn('_w1280.jpg 1280w', html)
+        self.assertIn('class="card-img-top"', html)
+
+    def test_original_is_never_linked_before_it_is_stripped(self):
+        child = make_child(photo=self.upload())
+        html = Template(
+            '{% load photo_tags %}{% responsive_photo child.photo child.photo_variants %}'
+        ).render(Context({'child': child}))
+        self.assertNotIn(child.photo.url, html)
+        self.assertIn('src="data:image/svg+xml', html)
+        url = reverse('api_case_detail', args=[child.pk])
+        self.assertIsNone(self.client.get(url).json()['photo'])
+
+        imaging.refresh_child_photo(child.pk)
+        child.refresh_from_db()
+        photo = self.client.get(url).json()['photo']
+        self.assertTrue(photo.endswith(child.photo_variants['variants'][-1]['jpeg']))
+        # Mirrors learn the public photo from the feed
+        event = ChangeEvent.objects.filter(kind='case', object_id=str(child.pk)).latest('id')
+        self.assertTrue(event.data['photo'].endswith('_w640.jpg'))
+
+
+class PhotoHashTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, EVIDENCE_UPLOAD_TEMP_DIR=f'{media_root}/leads/.incoming')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', False)
+
+    def picture(self, seed, size=(256, 256), fmt='JPEG', quality=90):
+        """A blocky random picture; the same seed gives the same scene"""
+        rng = random.Random(seed)
+        image = Image.new('RGB', (8, 8))
+        image.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(64)])
+        buffer = io.BytesIO()
+        image.resize(size, Image.BILINEAR).save(buffer, fmt, quality=quality)
+        return buffer.getvalue()
+
+    def test_hashes_survive_resizing_but_separate_different_scenes(self):
+        original = photo_hashes.hashes(io.BytesIO(self.picture(1)))
+        smaller = photo_hashes.hashes(io.BytesIO(self.picture(1, size=(120, 120), quality=40)))
+        other = photo_hashes.hashes(io.BytesIO(self.picture(2)))
+        self.assertLessEqual(photo_hashes.distance(original[0], smaller[0]), 4)
+        self.assertLessEqual(photo_hashes.distance(original[1], smaller[1]), 6)
+        self.assertGreater(photo_hashes.distance(original[0], other[0]), settings.PHOTO_MATCH_MAX_DISTANCE)
+        self.assertEqual(photo_hashes.to_unsigned(photo_hashes.to_signed(2 ** 64 - 1)), 2 ** 64 - 1)
+
+    def test_band_lookup_finds_exactly_the_hashes_within_distance(self):
+        rng = random.Random(7)
+        child = make_child()
+        probe = rng.getrandbits(64)
+        values = [rng.getrandbits(64) for _ in range(200)]
+        # Plus some within and just outside the match distance
+        for flips in (1, 4, 7, 10, 11, 14):
+            for _ in range(3):
+                mask = sum(1 << bit for bit in rng.sample(range(64), flips))
+                values.append(probe ^ mask)
+        PhotoHash.objects.bulk_create(
+            PhotoHash(source='lead', child=child, file=f'{i}.jpg', **photo_hashes.hash_fields(value, value))
+            for i, value in enumerate(values)
+        )
+        expected = sorted(d for d in (photo_hashes.distance(probe, v) for v in values) if d <= 10)
+        found = photo_hashes.matches(probe, max_distance=10)
+        self.assertEqual([apart for apart, _, _ in found], expected)
+        self.assertGreaterEqual(len(expected), 12)
+        self.assertLess(photo_hashes.candidates(probe, 10).count(), len(values) // 4)
+
+    def test_uploads_are_indexed_and_matched_across_cases(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = make_child(photo=SimpleUploadedFile('a.jpg', self.picture(3), content_type='image/jpeg'))
+            make_child(first_name='Other', photo=SimpleUploadedFile('b.jpg', self.picture(4), content_type='image/jpeg'))
+        self.assertEqual(PhotoHash.objects.filter(source='case').count(), 2)
+
+        second = make_child(first_name='Bea')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('submit_lead', args=[second.pk]), {
+                'reporter_name': 'Witness', 'reporter_email': 'w@example.com', 'reporter_phone': '555',
+                'information': '<p>Saw her</p>',
+                'evidence_file': SimpleUploadedFile('clip.jpg', self.picture(3, size=(300, 300), quality=50), content_type='image/jpeg'),
+            })
+        lead_hash = PhotoHash.objects.get(source='lead')
+        self.assertEqual(lead_hash.child, second)
+        (match,) = photo_hashes.look_alikes(lead_hash)
+        self.assertEqual(match[2].child, first)
+
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:missing_children_photohash_change', args=[lead_hash.pk]))
+        self.assertContains(response, first.case_number)
+        response = self.client.post(reverse('admin:missing_children_photohash_match'), {
+            'photo': SimpleUploadedFile('probe.png', self.picture(4, fmt='PNG'), content_type='image/png'),
+        })
+        self.assertContains(response, '0 bits')
+
+    def test_command_indexes_existing_photos(self):
+        for seed in range(3):
+            make_child(photo=SimpleUploadedFile(f'{seed}.jpg', self.picture(seed), content_type='image/jpeg'))
+        PhotoHash.objects.all().delete()
+        out = io.StringIO()
+        call_command('build_photo_index', '--workers', '2', stdout=out, stderr=io.StringIO())
+        self.assertIn('Indexed 3 photos, 0 failed', out.getvalue())
+        call_command('build_photo_index', stdout=out)
+        self.assertIn('No photos to index', out.getvalue())
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.child = make_child()
+        self.other = make_child(first_name='Ben')
+
+    def test_case_detail_is_served_from_cache_until_a_sighting_is_saved(self):
+        url = reverse('case_detail', args=[self.child.pk])
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+
+        other_url = reverse('case_detail', args=[self.other.pk])
+        self.client.get(other_url)
+        LocationUpdate.objects.create(
+            child=self.child, location='Main St', sighting_time=timezone.now(),
+            reported_by='Witness', description='Seen', verified=True,
+        )
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Main St')
+        self.assertEqual(self.client.get(other_url)['X-Page-Cache'], 'hit')
+
+    def test_deploy_check_requires_a_shared_cache(self):
+        self.assertEqual([e.id for e in checks.check_page_cache_backend(None)], ['missing_children.E001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(checks.check_page_cache_backend(None), [])
+        with override_settings(PAGE_CACHE_ENABLED=False):
+            self.assertEqual(checks.check_page_cache_backend(None), [])
+
+    def test_case_changes_refresh_home_and_list(self):
+        self.client.get(reverse('home'))
+        self.client.get(reverse('case_list'))
+        make_child(first_name='Priya')
+        for name in ('home', 'case_list'):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response['X-Page-Cache'], 'miss')
+            self.assertContains(response, 'Priya')
+
+    def test_pages_cached_before_commit_are_dropped_after_it(self):
+        url = reverse('case_detail', args=[self.child.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.child.first_name = 'Annabel'
+            self.child.save()
+            # A concurrent request caching the page before the writer commits
+            self.client.get(url)
+            self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+
+    def test_contacts_page_invalidated_by_contact_save(self):
+        url = reverse('emergency_contacts')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+        EmergencyContact.objects.create(name='Sheriff', organization='County', phone='555', email='s@example.com', region='North')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+
+    def test_pages_with_pending_messages_bypass_the_cache(self):
+        url = reverse('case_detail', args=[self.child.pk])
+        self.client.get(url)
+        self.client.post(reverse('submit_location_update', args=[self.child.pk]), {
+            'location': 'Elm St', 'sighting_time': '2026-01-01T10:00', 'reported_by': 'Sam',
+            'description': 'Near the school',
+        })
+        response = self.client.get(url)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, 'Location update submitted')
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.children = [make_child(first_name=f'Kid{i}', is_abducted=i % 2 == 0) for i in range(6)]
+        for i in range(5):
+            LocationUpdate.objects.create(
+                child=self.children[0], location=f'Street {i}', sighting_time=timezone.now(),
+                reported_by='Witness', description='<p>Seen</p>', verified=True,
+            )
+
+    def test_home(self):
+        self.assertViewQueryBudget(reverse('home'), 2)
+
+    def test_case_list(self):
+        self.assertViewQueryBudget(reverse('case_list'), 2)
+        self.assertViewQueryBudget(reverse('case_list'), 2, q='kid')
+
+    def test_case_detail(self):
+        # Child, latest sightings and sighting clusters
+        self.assertViewQueryBudget(reverse('case_detail', args=[self.children[0].pk]), 3)
+
+    def test_search(self):
+        self.assertViewQueryBudget(reverse('search_cases'), 1)
+
+    def test_emergency_contacts(self):
+        self.assertViewQueryBudget(reverse('emergency_contacts'), 1)
+
+    def test_instrumentation_middleware_reports_headers(self):
+        middleware = ['missing_children.instrumentation.QueryInstrumentationMiddleware'] + settings.MIDDLEWARE
+        with override_settings(MIDDLEWARE=middleware, PAGE_CACHE_ENABLED=False):
+            response = self.client.get(reverse('case_detail', args=[self.children[0].pk]))
+        self.assertEqual(response['X-SQL-Count'], '3')
+        self.assertEqual(response['X-SQL-Duplicates'], '0')
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def test_seed_is_deterministic(self):
+        now = timezone.now().replace(microsecond=0)
+        first = DatasetGenerator(seed=7, now=now)
+        first.generate(cases=20, sightings=30, leads=10, subscribers=10)
+        ids = set(MissingChild.objects.values_list('pk', flat=True))
+        names = sorted(MissingChild.objects.values_list('first_name', 'last_name'))
+        self.assertEqual(len(ids), 20)
+        self.assertEqual(LocationUpdate.objects.count(), 30)
+        self.assertTrue(AlertSubscription.objects.filter(coverage_cells__isnull=False).exists())
+
+        MissingChild.objects.all().delete()
+        DatasetGenerator(seed=7, now=now).cases(20)
+        self.assertEqual(set(MissingChild.objects.values_list('pk', flat=True)), ids)
+        self.assertEqual(sorted(MissingChild.objects.values_list('first_name', 'last_name')), names)
+
+    def test_benchmarks_run_and_compare(self):
+        DatasetGenerator(seed=1).generate(cases=10, sightings=10, leads=5, subscribers=4)
+        results = benchmarks.run(['case_list', 'case_detail', 'send_missing_child_alerts'], repeat=2, warmup=0)
+        self.assertEqual(results['case_list']['runs'], 2)
+        self.assertGreater(results['case_detail']['queries'], 0)
+        self.assertNotIn('error', results['send_missing_child_alerts'])
+
+        current = {'results': results}
+        slower = {'results': {name: dict(r, median_ms=r['median_ms'] / 2) for name, r in results.items()}}
+        self.assertEqual(benchmarks.compare(current, current), [])
+        self.assertEqual(len(benchmarks.compare(current, slower, threshold=0.5)), 3)
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        scanned = {name: scans for name, plan, scans in query_plans.check() if scans}
+        self.assertEqual(scanned, {})
+
+    def test_urgent_cases_use_the_partial_index(self):
+        ((name, plan, scans),) = query_plans.check(['home.urgent_cases'])
+        self.assertIn('child_urgent_date_idx', plan)
+
+    def test_command_fails_on_full_scan(self):
+        query_plans.HOT_QUERIES['test.unindexed'] = (
+            lambda: MissingChild.objects.order_by().filter(hair_color='Red'), set(),
+        )
+        try:
+            with self.assertRaises(CommandError):
+                call_command('check_query_plans', stdout=io.StringIO())
+            call_command('check_query_plans', 'home.recent_cases', stdout=io.StringIO())
+        finally:
+            del query_plans.HOT_QUERIES['test.unindexed']
+
+
+class CaseCardTests(TestCase):
+    def test_summary_is_plain_text_snippet(self):
+        child = make_child(distinctive_features='<p>Scar &amp; <b>freckles</b> ' + 'word ' * 60 + '</p>')
+        self.assertTrue(child.summary.startswith('Scar & freckles word'))
+        self.assertLessEqual(len(child.summary), richtext.SUMMARY_LENGTH)
+
+    def test_list_pages_defer_rich_text(self):
+        make_child(distinctive_features='<p>Birthmark</p>')
+        response = self.client.get(reverse('case_list'))
+        child = response.context['page_obj'].object_list[0]
+        self.assertTrue({'distinctive_features', 'last_seen_wearing'} <= child.get_deferred_fields())
+        self.assertContains(response, 'Birthmark')
+
+
+class JSONAPITests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.children = [make_child(first_name=f'Kid{i}') for i in range(3)]
+        make_child(first_name='Found', status='found')
+
+    def test_case_list_fields_and_cursor(self):
+        url = reverse('api_case_list')
+        response = self.client.get(url, {'fields': 'id,first_name', 'limit': 2})
+        data = response.json()
+        self.assertEqual([set(row) for row in data['results']], [{'id', 'first_name'}] * 2)
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+        rest = self.client.get(data['next']).json()
+        names = [row['first_name'] for row in data['results'] + rest['results']]
+        self.assertEqual(sorted(names), ['Kid0', 'Kid1', 'Kid2'])
+        self.assertIsNone(rest['next'])
+
+        self.assertEqual(self.client.get(url, {'fields': 'id,secret'}).status_code, 400)
+        self.assertEqual(len(self.client.get(url, {'status': 'all'}).json()['results']), 4)
+
+    def test_conditional_get_skips_the_queryset(self):
+        url = reverse('api_case_detail', args=[self.children[0].pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['first_name'], 'Kid0')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+        with self.assertQueryBudget(1):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+        # A write no signal or cache saw, as from another process, still changes the ETag
+        MissingChild.objects.filter(pk=self.children[0].pk).update(
+            first_name='Kid0b', updated_at=timezone.now() + timedelta(seconds=1),
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        sightings_url = reverse('api_case_sightings', args=[self.children[0].pk])
+        etag = self.client.get(sightings_url)['ETag']
+        first, _ = [LocationUpdate.objects.create(
+            child=self.children[0], location=location, sighting_time=timezone.now(),
+            reported_by='Witness', description='<p>Seen</p>', verified=True,
+        ) for location in ('Mall', 'Park')]
+        response = self.client.get(sightings_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['results'][0]['description'], 'Seen')
+        # Deleting the older row changes the count while the latest updated_at stays put
+        etag = response['ETag']
+        first.delete()
+        self.assertEqual(self.client.get(sightings_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_contacts(self):
+        EmergencyContact.objects.create(
+            name='Hotline', organization='NCMEC', phone='1-800', email='a@example.com', region='US',
+        )
+        response = self.client.get(reverse('api_emergency_contacts'), {'fields': 'name'})
+        self.assertEqual(response.json(), {'results': [{'name': 'Hotline'}]})
+        again = self.client.get(reverse('api_emergency_contacts'), {'fields': 'name'},
+                                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+
+class ChangeFeedTests(TestCase):
+    def feed(self, cursor=None):
+        params = {'cursor': cursor} if cursor else {}
+        return self.client.get(reverse('api_change_feed'), params).json()
+
+    def test_replica_follows_changes_and_tombstones(self):
+        child = make_child(first_name='Anna')
+        sighting = LocationUpdate.objects.create(
+            child=child, location='Mall', sighting_time=timezone.now(),
+            reported_by='Witness', description='<p>Seen</p>', verified=False,
+        )
+        page = self.feed()
+        self.assertEqual([(e['kind'], e['action']) for e in page['results']], [('case', 'upsert')])
+        self.assertEqual(page['results'][0]['data']['first_name'], 'Anna')
+        cursor = page['cursor']
+
+        sighting.verified = True
+        sighting.save()
+        child.status = 'found'
+        child.save()
+        page = self.feed(cursor)
+        self.assertEqual(
+            [(e['kind'], e['action']) for e in page['results']],
+            [('sighting', 'upsert'), ('case', 'status'), ('case', 'delete')],
+        )
+        self.assertEqual(page['results'][1]['data'], {'from': 'missing', 'to': 'found'})
+        self.assertEqual(page['results'][2]['data'], {'reason': 'found'})
+
+        # Resuming from the latest cursor yields nothing new
+        self.assertEqual(self.feed(page['cursor'])['results'], [])
+        self.assertEqual(self.feed('now')['cursor'], page['cursor'])
+
+        child.delete()
+        actions = [(e['kind'], e['action']) for e in self.feed(page['cursor'])['results']]
+        self.assertEqual(actions, [('sighting', 'delete'), ('case', 'delete')])
+
+    def test_pages_and_expired_cursor(self):
+        for i in range(5):
+            make_child(first_name=f'Kid{i}')
+        first = self.client.get(reverse('api_change_feed'), {'limit': 3}).json()
+        self.assertTrue(first['has_more'])
+        rest = self.client.get(reverse('api_change_feed'), {'limit': 3, 'cursor': first['cursor']}).json()
+        self.assertFalse(rest['has_more'])
+        seqs = [e['seq'] for e in first['results'] + rest['results']]
+        self.assertEqual(seqs, sorted(seqs))
+        self.assertEqual(len(seqs), 5)
+
+        # An idle feed keeps its cursors however old the last event is
+        with override_settings(CHANGE_FEED_RETENTION_DAYS=0):
+            self.assertEqual(self.client.get(reverse('api_change_feed'), {'cursor': first['cursor']}).status_code, 200)
+            self.assertEqual(changes.prune(timezone.now() + timedelta(days=1)), 4)
+        # Pruning past a cursor expires it; the head cursor still works
+        response = self.client.get(reverse('api_change_feed'), {'cursor': first['cursor']})
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(self.feed(rest['cursor'])['results'], [])
+        self.assertEqual(self.feed('now')['cursor'], rest['cursor'])
+
+
+@override_settings(ROOT_URLCONF='missing_children.tests', LIVE_STREAMS_ENABLED=True)
+class LiveStreamTests(TestCase):
+    def message(self, child, **kwargs):
+        message = {
+            'id': 1, 'event': 'sighting', 'case': str(child.pk), 'point': (40.0, -75.0),
+            'topics': [live.case_topic(child.pk), live.cell_topic(geo.cell_for(40.0, -75.0))],
+            'data': {'location': 'Mall'},
+        }
+        message.update(kwargs)
+        return message
+
+    def test_verified_sighting_is_published(self):
+        child = make_child(last_seen_latitude=40.0, last_seen_longitude=-75.0)
+        with mock.patch.object(live, 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            LocationUpdate.objects.create(
+                child=child, location='Unverified', sighting_time=timezone.now(),
+                reported_by='Witness', description='<p>?</p>',
+            )
+            LocationUpdate.objects.create(
+                child=child, location='Mall', sighting_time=timezone.now(),
+                reported_by='Witness', description='<p>Seen</p>', verified=True,
+            )
+        publish.assert_called_once()
+        message = publish.call_args[0][0]
+        self.assertEqual(message['event'], 'sighting')
+        self.assertEqual(message['topics'], self.message(child)['topics'])
+
+    async def test_case_stream_fans_out_and_unsubscribes(self):
+        child = await sync_to_async(make_child)()
+        response = await self.async_client.get(reverse('case_stream', args=[child.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        first = streams.event_stream([live.case_topic(child.pk)])
+        second = streams.event_stream([live.case_topic(child.pk)])
+        self.assertTrue((await anext(first)).startswith('retry:'))
+        await anext(second)
+        live.publish(self.message(child))
+        for stream in (first, second):
+            chunk = await asyncio.wait_for(anext(stream), 1)
+            self.assertIn('event: sighting', chunk)
+            self.assertIn('"location": "Mall"', chunk)
+            await stream.aclose()
+        self.assertEqual(live.hub.topics.get(live.case_topic(child.pk)), None)
+
+    async def test_region_stream_filters_by_distance(self):
+        child = await sync_to_async(make_child)()
+        topics = [live.cell_topic(cell) for cell in geo.cells_covering(40.0, -75.0, 5)]
+        stream = streams.event_stream(topics, lambda m: geo.distance_miles(40.0, -75.0, *m['point']) <= 5)
+        await anext(stream)
+        live.publish(self.message(child, id=1, point=(40.5, -75.0), topics=topics[:1]))
+        live.publish(self.message(child, id=2))
+        chunk = await asyncio.wait_for(anext(stream), 1)
+        self.assertTrue(chunk.startswith('id: 2'))
+        await stream.aclose()
+
+        response = await self.async_client.get(reverse('region_stream'), {'lat': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(LIVE_HEARTBEAT_SECONDS=0.05)
+    def test_wsgi_streams_end_after_one_interval(self):
+        child = make_child()
+        response = self.client.get(reverse('case_stream', args=[child.pk]))
+        # What a WSGI server does: drain the whole async iterator in the worker
+        with self.assertWarnsMessage(Warning, 'must consume asynchronous iterators'):
+            body = b''.join(response).decode()
+        self.assertEqual(body, f'retry: {settings.LIVE_RETRY_MS}\n\n')
+        self.assertEqual(live.hub.listener_count, 0)
+
+    def test_case_page_subscribes_only_when_streams_are_enabled(self):
+        child = make_child()
+        self.assertContains(self.client.get(reverse('case_detail', args=[child.pk])), 'EventSource')
+        with override_settings(LIVE_STREAMS_ENABLED=False):
+            cache.clear()
+            self.assertNotContains(self.client.get(reverse('case_detail', args=[child.pk])), 'EventSource')
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+class EvidenceUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.override = override_settings(
+            MEDIA_ROOT=self.media, EVIDENCE_UPLOAD_TEMP_DIR=f'{self.media}/leads/.incoming',
+            EVIDENCE_MAX_BYTES=200_000,
+        )
+        self.override.enable()
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', False)
+        self.child = make_child()
+        self.url = reverse('submit_lead', args=[self.child.pk])
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def post(self, upload):
+        return self.client.post(self.url, {
+            'reporter_name': 'Witness', 'reporter_email': 'w@example.com', 'reporter_phone': '555',
+            'information': '<p>Saw her</p>', 'evidence_file': upload,
+        })
+
+    def test_evidence_is_streamed_hashed_and_processed(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600), 'red').save(buffer, 'JPEG')
+        data = buffer.getvalue()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(SimpleUploadedFile('clip.jpg', data, content_type='image/jpeg'))
+        self.assertRedirects(response, reverse('case_detail', args=[self.child.pk]))
+
+        lead = self.child.leads.get()
+        self.assertEqual(lead.evidence_sha256, hashlib.sha256(data).hexdigest())
+        self.assertEqual(lead.evidence_size, len(data))
+        self.assertEqual(lead.evidence_content_type, 'image/jpeg')
+        self.assertEqual(lead.evidence_metadata['width'], 800)
+        self.assertTrue(lead.evidence_file.storage.exists(lead.evidence_metadata['thumbnail']))
+        self.assertEqual(os.listdir(f'{self.media}/leads/.incoming'), [])
+
+    def test_evidence_left_unqueued_is_backfilled(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), 'blue').save(buffer, 'JPEG')
+        broker_down = OperationalError('Connection refused')
+        with mock.patch.object(tasks.process_lead_evidence, 'delay', side_effect=broker_down), \
+                self.assertLogs('missing_children.tasks', 'ERROR'):
+            with mock.patch.object(uploads, 'process_evidence') as process, self.captureOnCommitCallbacks(execute=True):
+                self.post(SimpleUploadedFile('clip.jpg', buffer.getvalue(), content_type='image/jpeg'))
+        # Nothing ran inside the request; the backfill command picks it up
+        process.assert_not_called()
+        self.assertEqual(self.child.leads.get().evidence_metadata, {})
+        call_command('backfill_lead_evidence', stdout=io.StringIO())
+        self.assertEqual(self.child.leads.get().evidence_metadata['width'], 400)
+
+    def test_spoofed_type_and_oversized_files_are_refused(self):
+        response = self.post(SimpleUploadedFile('clip.mp4', b'MZ\x90\x00' * 100, content_type='video/mp4'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('evidence_file', response.context['form'].errors)
+
+        # Over the cap: cut off mid-stream, or refused outright from Content-Length
+        too_big = b'\xff\xd8\xff' + b'0' * 250_000
+        response = self.post(SimpleUploadedFile('big.jpg', too_big, content_type='image/jpeg'))
+        self.assertIn('evidence_file', response.context['form'].errors)
+        response = self.post(SimpleUploadedFile('huge.jpg', too_big * 6, content_type='image/jpeg'))
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(self.child.leads.exists())
+
+    def test_sniffing(self):
+        self.assertEqual(uploads.sniff_content_type(b'\x00\x00\x00\x18ftypqt  \x00'), 'video/quicktime')
+        self.assertEqual(uploads.sniff_content_type(b'\x00\x00\x00\x18ftypisom\x00'), 'video/mp4')
+        self.assertEqual(uploads.sniff_content_type(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'image/webp')
+        self.assertIsNone(uploads.sniff_content_type(b'#!/bin/sh'))
@@ -0,0 +1,217 @@
+"""
+Streaming evidence uploads for leads.
+
+EvidenceUploadHandler receives Lead.evidence_file chunk by chunk while
+Django parses the multipart body. Each chunk is hashed and written to a
+temporary file in EVIDENCE_UPLOAD_TEMP_DIR; nothing is buffered in memory.
+That directory sits on the same volume as MEDIA_ROOT, so saving the file to
+FileSystemStorage is a rename rather than a second copy. Oversized bodies are
+refused from their Content-Length before any parsing. Files whose declared or
+sniffed type is not allowed are dropped at their first chunk. Thumbnails and
+metadata are produced afterwards by tasks.process_lead_evidence.
+"""
+import hashlib
+import os
+import tempfile
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload, StopFutureHandlers
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, UnidentifiedImageError
+from .models import Lead
+from . import imaging
+
+EVIDENCE_FIELD = 'evidence_file'
+
+# Room for the text fields of the lead form on top of the file itself
+FORM_OVERHEAD_BYTES = 1024 * 1024
+
+# Tags in the Exif sub-IFD
+EXIF_IFD = 0x8769
+DATETIME_ORIGINAL = 36867
+
+_MAGIC = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+    (b'\x1aE\xdf\xa3', 'video/webm'),
+]
+_HEIF_BRANDS = {b'heic', b'heix', b'mif1', b'msf1'}
+
+
+def sniff_content_type(head):
+    """Content type from a file's leading bytes, or None if unrecognised"""
+    for prefix, content_type in _MAGIC:
+        if head.startswith(prefix):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand in _HEIF_BRANDS:
+            return 'image/heic'
+        return 'video/quicktime' if brand == b'qt  ' else 'video/mp4'
+    return None
+
+
+def too_large_message():
+    return f'Evidence files are limited to {filesizeformat(settings.EVIDENCE_MAX_BYTES)}.'
+
+
+def type_message():
+    return 'Evidence must be a photo (JPEG, PNG, GIF, WebP, HEIC), a video (MP4, MOV, WebM) or a PDF.'
+
+
+def declared_too_large(request):
+    """True if the request body is bigger than any acceptable lead submission"""
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return False
+    return length > settings.EVIDENCE_MAX_BYTES + FORM_OVERHEAD_BYTES
+
+
+class EvidenceFile(UploadedFile):
+    """Upload streamed to a temp file beside MEDIA_ROOT, plus its SHA-256"""
+
+    def __init__(self, name, content_type, charset, content_type_extra=None):
+        os.makedirs(settings.EVIDENCE_UPLOAD_TEMP_DIR, exist_ok=True)
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix=f'.upload{ext}', dir=settings.EVIDENCE_UPLOAD_TEMP_DIR)
+        super().__init__(file, name, content_type, 0, charset, content_type_extra)
+        self.sha256 = None
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # Already moved into storage
+            pass
+
+
+class EvidenceUploadHandler(FileUploadHandler):
+    """
+    Stream, hash and vet the evidence file of a lead submission.
+
+    A rejected file is left out of request.FILES and the reason is kept in
+    `error` for the view to show on the form.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.error = None
+        self.upload = None
+        self.digest = None
+        self.received = 0
+
+    def _reject(self, message):
+        self.error = message
+        if self.upload is not None:
+            self.upload.close()
+            self.upload = None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        if field_name != EVIDENCE_FIELD:
+            raise SkipFile()
+        if content_type not in settings.EVIDENCE_ALLOWED_TYPES and content_type != 'application/octet-stream':
+            self._reject(type_message())
+            raise SkipFile()
+        if content_length and content_length > settings.EVIDENCE_MAX_BYTES:
+            self._reject(too_large_message())
+            raise StopUpload(connection_reset=True)
+        self.upload = EvidenceFile(file_name, content_type, charset, content_type_extra)
+        self.digest = hashlib.sha256()
+        self.received = 0
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.upload is None:
+            return None
+        if start == 0:
+            sniffed = sniff_content_type(raw_data[:16])
+            if sniffed not in settings.EVIDENCE_ALLOWED_TYPES:
+                self._reject(type_message())
+                raise SkipFile()
+            # Trust the bytes, not the browser's guess
+            self.upload.content_type = sniffed
+        self.received += len(raw_data)
+        if self.received > settings.EVIDENCE_MAX_BYTES:
+            self._reject(too_large_message())
+            raise StopUpload(connection_reset=True)
+        self.digest.update(raw_data)
+        self.upload.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.upload is None:
+            return None
+        upload, self.upload = self.upload, None
+        upload.seek(0)
+        upload.size = file_size
+        upload.sha256 = self.digest.hexdigest()
+        return upload
+
+    def upload_interrupted(self):
+        if self.upload is not None:
+            self.upload.close()
+            self.upload = None
+
+
+def stored_digest(field_file):
+    """(sha256, size) of a file already in storage, read in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    with field_file.storage.open(field_file.name, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def image_metadata(field_file):
+    """Dimensions, format and capture time of an image, plus a JPEG thumbnail"""
+    with field_file.storage.open(field_file.name, 'rb') as f:
+        with Image.open(f) as image:
+            metadata = {'width': image.width, 'height': image.height, 'format': image.format}
+            taken_at = image.getexif().get_ifd(EXIF_IFD).get(DATETIME_ORIGINAL)
+            if taken_at:
+                metadata['taken_at'] = str(taken_at)
+        f.seek(0)
+        thumbnail = imaging.load_normalized(f)
+
+    _, data = imaging.render(thumbnail, settings.EVIDENCE_THUMBNAIL_WIDTH, 'jpeg')
+    stem, _ = os.path.splitext(os.path.basename(field_file.name))
+    metadata['thumbnail'] = field_file.storage.save(f'leads/thumbnails/{stem}.jpg', ContentFile(data))
+    return metadata
+
+
+def process_evidence(lead_id):
+    """Fill in hash, size and metadata for a lead's evidence; returns the metadata"""
+    lead = Lead.objects.get(pk=lead_id)
+    if not lead.evidence_file:
+        return {}
+    updates = {}
+    if not lead.evidence_sha256:
+        updates['evidence_sha256'], updates['evidence_size'] = stored_digest(lead.evidence_file)
+    if not lead.evidence_content_type:
+        with lead.evidence_file.storage.open(lead.evidence_file.name, 'rb') as f:
+            updates['evidence_content_type'] = sniff_content_type(f.read(16)) or ''
+    content_type = updates.get('evidence_content_type', lead.evidence_content_type)
+
+    metadata = {'kind': content_type.split('/')[0] if content_type else 'unknown'}
+    if content_type.startswith('image/') and content_type != 'image/heic':
+        try:
+            metadata.update(image_metadata(lead.evidence_file))
+        except (UnidentifiedImageError, OSError) as e:
+            metadata['error'] = str(e)
+    updates['evidence_metadata'] = metadata
+    # update() rather than save(): no signals, no updated_at bump
+    Lead.objects.filter(pk=lead.pk).update(**updates)
+    return metadata
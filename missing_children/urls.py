@@ -1,10 +1,12 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, api, streams
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('cases/', views.case_list, name='case_list'),
     path('case/<uuid:pk>/', views.case_detail, name='case_detail'),
+    path('case/<uuid:pk>/clusters/', views.case_sighting_clusters, name='case_sighting_clusters'),
     path('report/', views.report_missing_child, name='report_missing_child'),
     path('lead/<uuid:child_id>/', views.submit_lead, name='submit_lead'),
     path('subscribe/', views.subscribe_alerts, name='subscribe_alerts'),
@@ -12,4 +14,18 @@ urlpatterns = [
     path('verify-email/<str:token>/', views.verify_email, name='verify_email'),
     path('location-update/<uuid:child_id>/', views.submit_location_update, name='submit_location_update'),
     path('search/', views.search_cases, name='search_cases'),
-]
\ No newline at end of file
+    path('api/cases/', api.case_list, name='api_case_list'),
+    path('api/cases/<uuid:pk>/', api.case_detail, name='api_case_detail'),
+    path('api/cases/<uuid:pk>/sightings/', api.case_sightings, name='api_case_sightings'),
+    path('api/contacts/', api.emergency_contacts, name='api_emergency_contacts'),
+    path('api/changes/', api.change_feed, name='api_change_feed'),
+]
+
+# Only served where LIVE_STREAMS_ENABLED (under ASGI)
+live_urlpatterns = [
+    path('live/case/<uuid:pk>/', streams.case_stream, name='case_stream'),
+    path('live/region/', streams.region_stream, name='region_stream'),
+]
+
+if settings.LIVE_STREAMS_ENABLED:
+    urlpatterns += live_urlpatterns
\ No newline at end of file
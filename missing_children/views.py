@@ -1,20 +1,50 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from django.core.paginator import Paginator
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 import uuid
 from .models import MissingChild, Lead, AlertSubscription, LocationUpdate, EmergencyContact
 from .forms import MissingChildForm, LeadForm, AlertSubscriptionForm, LocationUpdateForm, SearchForm
+from . import search, page_cache, uploads, outbox, clusters, duplicates, geocoder
+from .pagination import KeysetPaginator, RankedPaginator
+from .tasks import enqueue, process_lead_evidence
 
+CASES_PER_PAGE = 20
+SEARCH_RESULTS_PER_PAGE = 24
+# Ranked (full-text) searches only ever page through this many best matches
+SEARCH_RESULT_LIMIT = 500
+
+def active_case_count():
+    """Headline number for the case list; recounted only after a case changes"""
+    if not settings.PAGE_CACHE_ENABLED:
+        return MissingChild.objects.filter(status='missing').count()
+    return cache.get_or_set(
+        page_cache.ACTIVE_CASE_COUNT_KEY,
+        lambda: MissingChild.objects.filter(status='missing').count(),
+        settings.PAGE_CACHE_TIMEOUT,
+    )
+
+def paginate_cases(request, cases, per_page, ranked):
+    """Keyset pages for browsing, bounded offset pages for ranked search results"""
+    if ranked:
+        paginator = RankedPaginator(cases, per_page, SEARCH_RESULT_LIMIT)
+    else:
+        paginator = KeysetPaginator(cases, per_page)
+    return paginator.get_page(request.GET.get('cursor'))
+
+@page_cache.cached_page('home', lambda request: [page_cache.CASES])
 def home(request):
-    urgent_cases = MissingChild.objects.filter(
+    urgent_cases = MissingChild.objects.cards().filter(
         status='missing', 
         is_abducted=True
     ).order_by('-reported_date')[:5]
     
-    recent_cases = MissingChild.objects.filter(status='missing').order_by('-reported_date')[:10]
+    recent_cases = MissingChild.objects.cards().filter(status='missing').order_by('-reported_date')[:10]
     
     context = {
         'urgent_cases': urgent_cases,
@@ -22,9 +52,11 @@ def home(request):
     }
     return render(request, 'missing_children/home.html', context)
 
+@page_cache.cached_page('case_list', lambda request: [page_cache.CASES])
 def case_list(request):
     form = SearchForm(request.GET)
-    cases = MissingChild.objects.filter(status='missing').order_by('-reported_date')
+    cases = MissingChild.objects.cards().filter(status='missing').order_by('-reported_date')
+    ranked = False
     
     if form.is_valid():
         q = form.cleaned_data.get('q')
@@ -35,13 +67,8 @@ def case_list(request):
         location = form.cleaned_data.get('location')
         
         if q:
-            cases = cases.filter(
-                Q(first_name__icontains=q) |
-                Q(last_name__icontains=q) |
-                Q(case_number__icontains=q) |
-                Q(last_seen_location__icontains=q) |
-                Q(distinctive_features__icontains=q)
-            )
+            cases = search.search_queryset(cases, q)
+            ranked = search.is_supported()
         
         if age_min:
             cases = cases.filter(age__gte=age_min)
@@ -52,58 +79,124 @@ def case_list(request):
         if status:
             cases = cases.filter(status=status)
         if location:
-            cases = cases.filter(last_seen_location__icontains=location)
+            cases = cases.filter(location_filter(location))
     
-    paginator = Paginator(cases, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate_cases(request, cases, CASES_PER_PAGE, ranked)
     
     context = {
         'page_obj': page_obj,
         'form': form,
+        'active_case_count': active_case_count(),
     }
     return render(request, 'missing_children/case_list.html', context)
 
+def location_filter(location):
+    """Cases whose location text mentions `location`, or that were last seen near where it geocodes to"""
+    condition = Q(last_seen_location__icontains=location)
+    nearby = geocoder.near(location, 'last_seen_latitude', 'last_seen_longitude')
+    return condition | nearby if nearby is not None else condition
+
+@page_cache.cached_page('case_detail', lambda request, pk: [page_cache.case_group(pk)])
 def case_detail(request, pk):
-    child = get_object_or_404(MissingChild, pk=pk)
-    location_updates = child.location_updates.filter(verified=True).order_by('-sighting_time')
+    # select_related caches a missing abductor too, so the template's repeated
+    # child.abductor lookups don't each hit the database. The page shows the
+    # sanitized _html columns, so the raw RichText is left unloaded.
+    child = get_object_or_404(
+        MissingChild.objects.select_related('abductor').defer(
+            'last_seen_wearing', 'distinctive_features', 'abductor__description', 'abductor__known_associates',
+        ),
+        pk=pk,
+    )
+    location_updates = list(child.location_updates.filter(verified=True).order_by('-sighting_time')[:3])
+    # Sightings are summarized by area and time window, never listed in full
+    sighting_clusters = list(clusters.for_case(child.pk, settings.SIGHTING_CLUSTERS_ON_PAGE + 1))
     context = {
         'child': child,
         'location_updates': location_updates,
+        'sighting_clusters': sighting_clusters[:settings.SIGHTING_CLUSTERS_ON_PAGE],
+        'more_clusters': len(sighting_clusters) > settings.SIGHTING_CLUSTERS_ON_PAGE,
+        'live_updates': settings.LIVE_STREAMS_ENABLED,
     }
     return render(request, 'missing_children/case_detail.html', context)
 
+@staff_member_required
+def case_sighting_clusters(request, pk):
+    """Investigator view: every cluster of a case, and the sightings of one of them"""
+    child = get_object_or_404(MissingChild.objects.only('pk', 'case_number', 'first_name', 'last_name'), pk=pk)
+    case_clusters = clusters.for_case(child.pk)
+    selected = None
+    sightings = []
+    if request.GET.get('cluster'):
+        selected = get_object_or_404(case_clusters, pk=request.GET['cluster'])
+        sightings = clusters.sightings_in(selected)
+    context = {
+        'child': child,
+        'clusters': case_clusters,
+        'selected': selected,
+        'sightings': sightings,
+    }
+    return render(request, 'missing_children/case_clusters.html', context)
+
 def report_missing_child(request):
+    possible_duplicates = []
     if request.method == 'POST':
         form = MissingChildForm(request.POST, request.FILES)
         if form.is_valid():
             child = form.save(commit=False)
-            child.status = 'missing'
-            child.reported_by = request.user if request.user.is_authenticated else None
-            child.save()
-            
-            # Send alert to subscribers
-            send_alert_to_subscribers(child)
-            
-            messages.success(request, 'Missing child report submitted successfully!')
-            return redirect('case_detail', pk=child.pk)
+            # Checked before anything is stored; the reporter confirms to file anyway
+            possible_duplicates = [] if request.POST.get('not_duplicate') else duplicates.likely_duplicates(child)
+            if not possible_duplicates:
+                child.status = 'missing'
+                child.reported_by = request.user if request.user.is_authenticated else None
+                with transaction.atomic():
+                    child.save()
+                    # The alert request commits or rolls back together with the case
+                    send_alert_to_subscribers(child)
+                
+                messages.success(request, 'Missing child report submitted successfully!')
+                return redirect('case_detail', pk=child.pk)
     else:
         form = MissingChildForm()
     
-    context = {'form': form}
+    context = {'form': form, 'possible_duplicates': possible_duplicates}
     return render(request, 'missing_children/report_missing.html', context)
 
+@csrf_exempt
 def submit_lead(request, child_id):
+    """Swap in the streaming evidence handler before the body is parsed (CSRF is checked below)"""
+    if request.method == 'POST':
+        if uploads.declared_too_large(request):
+            child = get_object_or_404(MissingChild, pk=child_id)
+            messages.error(request, uploads.too_large_message())
+            context = {'form': LeadForm(), 'child': child}
+            return render(request, 'missing_children/submit_lead.html', context, status=413)
+        request.upload_handlers = [uploads.EvidenceUploadHandler(request)]
+    return _submit_lead(request, child_id)
+
+@csrf_protect
+def _submit_lead(request, child_id):
     child = get_object_or_404(MissingChild, pk=child_id)
     
     if request.method == 'POST':
         form = LeadForm(request.POST, request.FILES)
-        if form.is_valid():
+        form.is_valid()
+        rejected = request.upload_handlers[0].error if request.upload_handlers else None
+        if rejected:
+            form.add_error('evidence_file', rejected)
+        if not form.errors:
             lead = form.save(commit=False)
             lead.child = child
             if request.user.is_authenticated:
                 lead.reported_by = request.user
+            evidence = request.FILES.get('evidence_file')
+            if evidence is not None:
+                lead.evidence_sha256 = getattr(evidence, 'sha256', None) or ''
+                lead.evidence_size = evidence.size
+                lead.evidence_content_type = evidence.content_type
             lead.save()
+            if lead.evidence_file:
+                lead_id = lead.pk
+                transaction.on_commit(lambda: enqueue(process_lead_evidence, lead_id))
             
             messages.success(request, 'Thank you for submitting a lead. Authorities have been notified.')
             return redirect('case_detail', pk=child_id)
@@ -171,8 +264,9 @@ def submit_location_update(request, child_id):
         'form': form,
         'child': child,
     }
-    return render(request, 'missing_children/location_update.html', context)
+    return render(request, 'missing_children/submit_location_update.html', context)
 
+@page_cache.cached_page('emergency_contacts', lambda request: [page_cache.CONTACTS])
 def emergency_contacts(request):
     contacts = EmergencyContact.objects.filter(active=True).order_by('order', 'name')
     context = {'contacts': contacts}
@@ -180,7 +274,8 @@ def emergency_contacts(request):
 
 def search_cases(request):
     form = SearchForm(request.GET)
-    cases = MissingChild.objects.all().order_by('-reported_date')
+    cases = MissingChild.objects.cards().order_by('-reported_date')
+    ranked = False
     
     if form.is_valid():
         q = form.cleaned_data.get('q')
@@ -190,12 +285,10 @@ def search_cases(request):
         location = form.cleaned_data.get('location')
         
         if q:
-            cases = cases.filter(
-                Q(first_name__icontains=q) |
-                Q(last_name__icontains=q) |
-                Q(case_number__icontains=q) |
-                Q(last_seen_location__icontains=q)
+            cases = search.search_queryset(
+                cases, q, fields=['first_name', 'last_name', 'case_number', 'last_seen_location']
             )
+            ranked = search.is_supported()
         
         if age_min:
             cases = cases.filter(age__gte=age_min)
@@ -204,35 +297,18 @@ def search_cases(request):
         if gender:
             cases = cases.filter(gender=gender)
         if location:
-            cases = cases.filter(last_seen_location__icontains=location)
+            cases = cases.filter(location_filter(location))
+    
+    page_obj = paginate_cases(request, cases, SEARCH_RESULTS_PER_PAGE, ranked)
     
     context = {
-        'cases': cases,
+        'cases': page_obj,
+        'page_obj': page_obj,
+        'abduction_count': len([c for c in page_obj if c.is_abducted]),
         'form': form,
     }
     return render(request, 'missing_children/search.html', context)
 
 def send_alert_to_subscribers(child):
-    subscriptions = AlertSubscription.objects.filter(subscribed=True, verified=True)
-    
-    for subscription in subscriptions:
-        send_mail(
-            f'URGENT: Missing Child Alert - {child.first_name} {child.last_name}',
-            f'''
-            Missing Child Alert
-            
-            Name: {child.first_name} {child.last_name}
-            Age: {child.age}
-            Last Seen: {child.last_seen_location}
-            Date: {child.last_seen_date}
-            
-            Description: {child.distinctive_features}
-            
-            If you have any information, please contact authorities immediately.
-            
-            View details: [Link to case details]
-            ''',
-            settings.DEFAULT_FROM_EMAIL,
-            [subscription.email],
-            fail_silently=True,
-        )
\ No newline at end of file
+    """Record the alert in the outbox; the relay sends it once the case is committed"""
+    outbox.record_case_alert(child)